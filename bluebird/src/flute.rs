@@ -1,13 +1,22 @@
 use pyo3::prelude::*;
 
+use std::collections::{HashMap, HashSet};
 use std::error::Error;
 use std::fmt;
+use std::sync::atomic::{AtomicU64, Ordering};
+use std::sync::Arc;
+use std::time::Instant;
 
 use serde::{Deserialize, Serialize};
 
 use crate::tools::{
-    db::{MusicSheetDB, Shortcut, UserSheet},
-    exec::{convert_shortcut_to_keycode, execute_shortcut_enigo},
+    db::{MusicSheetDB, Shortcut, ShortcutColumns, ShortcutColumnsTuple, UserSheet},
+    exec::{execute_shortcut_enigo, KeyProgram},
+    frecency::{now_secs, Frecency},
+    import::{parse_in_parallel, ImportMsg, ImportProgress},
+    journal::{write_atomic, JournalOp},
+    metrics::CommandTimings,
+    storage::Storage,
     rhythm::{parse_rhythm, Rhythm},
     utils::{generate_id, id_to_string, string_to_id, create_liz_folder},
 };
@@ -132,6 +141,13 @@ impl std::convert::From<FluteExecuteError> for PyErr {
 pub struct Flute {
     pub music_sheet: MusicSheetDB,
     pub rhythm: Rhythm,
+    pub execute_cancels: Arc<AtomicU64>, // Times cancel_execute was played, stops the executes submitted before
+    pub storage: Storage,             // Where mutations of music_sheet are saved
+    pub frecency: Frecency,           // When the shortcuts were hit, for ranking
+    pending_usage: Option<Vec<u8>>,   // Usage file for flush_storage to write
+    pub import_progress: Arc<ImportProgress>, // Of the running (or last) import
+    programs: HashMap<u128, Arc<KeyProgram>>, // Compiled shortcuts by id, filled by execute
+    timings: CommandTimings,          // How long play() took per action
 }
 
 #[pymethods]
@@ -148,13 +164,25 @@ impl Flute {
             std::process::exit(1);
         }
     
-        let music_sheet_path = &rhythm.music_sheet_path;
+        let (mut storage, music_sheet) = Storage::open(&rhythm);
+        let mut frecency = Frecency::open(
+            Frecency::usage_path(&rhythm.music_sheet_path),
+            rhythm.frecency_half_life_days,
+        );
+        // Made after the snapshot, and after the usage file unless it outlived the snapshot
+        for (seq, id, at) in storage.take_replayed_hits() {
+            frecency.replay_hit(seq, id, at);
+        }
         let mut flute: Flute = Flute {
-            music_sheet: MusicSheetDB::import_from_json(music_sheet_path).unwrap_or_else(|_| {
-                eprintln!("Failed to load music sheet from {}", music_sheet_path);
-                MusicSheetDB::new() // Return a default instance if loading fails
-            }),
+            music_sheet,
             rhythm: rhythm,
+            execute_cancels: Arc::new(AtomicU64::new(0)),
+            storage,
+            frecency,
+            pending_usage: None,
+            import_progress: Arc::new(ImportProgress::default()),
+            programs: HashMap::new(),
+            timings: CommandTimings::default(),
         };
         flute.calibrate();
         flute.music_sheet.read_keymap(&flute.rhythm.keymap_path);
@@ -169,28 +197,106 @@ impl Flute {
         return self.rhythm.theme.clone();
     }
 
-    pub fn play(&mut self, cmd: &LizCommand) -> BlueBirdResponse {
+    pub fn get_search_debounce_ms(&self) -> u64 {
+        return self.rhythm.search_debounce_ms;
+    }
+
+    pub fn get_log_level(&self) -> String {
+        return self.rhythm.log_level.clone();
+    }
+
+    /// All shortcuts matching the query (or all of them) as a tuple of column lists:
+    /// (ids, hit_numbers, shortcuts, applications, descriptions, comments, frecencies)
+    #[pyo3(signature = (query=None))]
+    pub fn fetch_columns(&self, query: Option<String>) -> ShortcutColumnsTuple {
+        let shortcuts = match query.as_deref() {
+            // The full text index only narrows the rows down, they are matched like
+            // fuzzy_search does so both storages return the same shortcuts
+            Some(query) => match self.storage.search_ids(query) {
+                Some(ids) => self.music_sheet.fuzzy_search_among(query, &ids.into_iter().collect()),
+                None => self.music_sheet.fuzzy_search(query),
+            },
+            None => self.music_sheet.retrieve_all(),
+        };
+        ShortcutColumns::from_shortcuts(&shortcuts, |sc| self.frecency.score(sc)).into_tuple()
+    }
+
+    /// Revision of the shortcuts, read it before a full fetch to ask for changes later
+    pub fn get_revision(&self) -> u64 {
+        self.music_sheet.revision()
+    }
+
+    /// What changed after revision `since`: (current revision, columns of the created
+    /// or updated shortcuts, ids of the deleted ones)
+    pub fn fetch_changes(&self, since: u64) -> (u64, ShortcutColumnsTuple, Vec<String>) {
+        let (upserted, deleted) = self.music_sheet.changes_since(since);
+        (
+            self.music_sheet.revision(),
+            ShortcutColumns::from_shortcuts(&upserted, |sc| self.frecency.score(sc)).into_tuple(),
+            deleted.into_iter().map(id_to_string).collect(),
+        )
+    }
+
+    /// Progress of the running (or last) import:
+    /// (files done, files total, shortcuts read, shortcuts added)
+    pub fn get_import_progress(&self) -> (usize, usize, usize, usize) {
+        self.import_progress.snapshot()
+    }
+
+    /// How many times cancel_execute was played, read when queueing an execute and
+    /// passed along with it (args[1]) so a cancel played meanwhile stops it too
+    pub fn get_execute_cancels(&self) -> u64 {
+        self.execute_cancels.load(Ordering::SeqCst)
+    }
+
+    /// How long the commands took so far, per action:
+    /// [(action, count, p50, p95, p99, max)], times in ms
+    pub fn get_command_timings(&self) -> Vec<(String, u64, f64, f64, f64, f64)> {
+        self.timings.summaries()
+    }
+
+    pub fn play(slf: &Bound<'_, Self>, cmd: &LizCommand) -> BlueBirdResponse {
+        let start = Instant::now();
+        let response = match cmd.action.as_str() {
+            // Sends the keys without holding the Flute borrow or the GIL,
+            // so other threads keep using the Flute meanwhile
+            "execute" => Flute::command_execute(slf, cmd),
+            "cancel_execute" => slf.borrow().command_cancel_execute(cmd),
+            // Only borrows the Flute to add each parsed batch
+            "import_shortcuts" => Flute::command_import_shortcuts(slf, cmd),
+            "cancel_import" => slf.borrow().command_cancel_import(cmd),
+            // Writes the checkpoint with the GIL released, and reports whether it failed
+            "persist" => Flute::command_persist(slf, cmd),
+            _ => slf.borrow_mut().dispatch(cmd),
+        };
+        // Whatever the command queued, e.g. the journal entry and its fdatasync
+        if let Err(e) = Flute::flush_storage(slf) {
+            eprintln!("Failed to write the storage: {}", e);
+        }
+        slf.borrow().timings.record(&cmd.action, start.elapsed());
+        response
+    }
+}
+
+impl Flute {
+
+    fn dispatch(&mut self, cmd: &LizCommand) -> BlueBirdResponse {
         match cmd.action.as_str() {
             // "get_shortcuts" => self.command_get_shortcuts(cmd),
             // "reload" => self.command_reload(cmd),
-            "execute" => self.command_execute(cmd),
-            "persist" => self.command_persist(cmd),
             "info" => self.command_info(cmd),
             "get_shortcut_details" => self.command_get_shortcut_details(cmd),
             "new_id" => self.command_new_id(cmd),
+            "compile_shortcut" => self.command_compile_shortcut(cmd),
             "create_shortcuts" => self.command_create_shortcuts(cmd),
             "update_shortcuts" => self.command_update_shortcuts(cmd),
             "delete_shortcuts" => self.command_delete_shortcuts(cmd),
             "get_deleted_shortcut_details" => self.command_get_deleted_shortcut_details(cmd),
             "export_shortcuts" => self.command_export_shortcuts(cmd),
-            "import_shortcuts" => self.command_import_shortcuts(cmd),
             "update_rhythm" => self.command_update_rhythm(cmd),
             _ => self.command_default(cmd),
         }
     }
-}
-
-impl Flute {
 
     fn calibrate(&mut self) {
         self.update_rank();
@@ -201,6 +307,44 @@ impl Flute {
         self.music_sheet.sort_by_column("hit_number", false);
     }
 
+    /// Apply a mutation described by op to the music sheet and queue saving it to the
+    /// storage, play() flushes it once the command is done
+    fn mutate<R>(&mut self, op: JournalOp, apply: impl FnOnce(&mut MusicSheetDB) -> R) -> R {
+        let hit = matches!(op, JournalOp::HitUp { .. });
+        let result = self.storage.mutate(&mut self.music_sheet, op, apply);
+        // The usage goes with the snapshot, or with the hit if its time isn't stored
+        if self.storage.compact_if_due(&mut self.music_sheet) || (hit && !self.storage.keeps_hit_times()) {
+            self.queue_usage();
+        }
+        result
+    }
+
+    /// Take the usage file as it is now, flush_storage writes it
+    fn queue_usage(&mut self) {
+        match self.frecency.to_json_bytes(&self.music_sheet, self.storage.journal_seq()) {
+            Ok(usage) => self.pending_usage = Some(usage),
+            Err(e) => eprintln!("Failed to save the shortcut usage: {}", e),
+        }
+    }
+
+    /// Do the storage writes queued so far with the GIL released (and the Flute not
+    /// borrowed), so the other threads go on while waiting for the disk
+    fn flush_storage(slf: &Bound<'_, Self>) -> Result<(), Box<dyn Error + Send + Sync>> {
+        let (writer, usage) = {
+            let mut flute = slf.borrow_mut();
+            let usage = flute.pending_usage.take().map(|usage| (flute.frecency.path().to_path_buf(), usage));
+            (flute.storage.writer(), usage)
+        };
+        slf.py().allow_threads(move || {
+            // Only once the hits it counts are stored, the next usage queued has them all
+            writer.flush()?;
+            if let Some((path, usage)) = usage {
+                write_atomic(&path, &usage)?;
+            }
+            Ok(())
+        })
+    }
+
     fn _get_sc_by_id(&self, id_str: &str) -> Result<Shortcut, Box<dyn Error>> {
         let id: u128 = string_to_id(id_str)?;
         let r: &Shortcut = self
@@ -216,8 +360,10 @@ impl Flute {
             Some((first.clone(), rest.to_vec())) // Clone to return owned values
         }
         if let Some((file_path, id_list)) = split_vec(&cmd.args) {
+            let mut seen: HashSet<&str> = HashSet::with_capacity(id_list.len());
             let sc_to_export: Result<Vec<Shortcut>, _> = id_list
                 .iter()
+                .filter(|id_str| seen.insert(id_str.as_str()))
                 .map(|id_str| self._get_sc_by_id(&id_str))
                 .collect();
             match sc_to_export {
@@ -253,7 +399,11 @@ impl Flute {
         }
     }
 
-    fn command_import_shortcuts(&mut self, cmd: &LizCommand) -> BlueBirdResponse {
+    /// Import the shortcuts of the given files and directories.
+    /// The files are parsed in parallel without the GIL; their shortcuts are added batch
+    /// by batch as they come, duplicates dropped through the content index of the sheet.
+    /// The shortcuts that don't compile are imported too, and listed in the results.
+    fn command_import_shortcuts(slf: &Bound<'_, Self>, cmd: &LizCommand) -> BlueBirdResponse {
         if cmd.args.is_empty() {
             eprintln!("BUG: Empty args, expect one file_path");
             return BlueBirdResponse {
@@ -262,29 +412,67 @@ impl Flute {
             };
         }
         println!("Import from {:?}", cmd.args);
+        let progress = slf.borrow().import_progress.clone();
+        let mut rx = parse_in_parallel(&cmd.args, progress.clone());
         let mut failed_paths: Vec<String> = Vec::new();
-        for file in cmd.args.iter() {
-            match UserSheet::import_from(file) {
-                Ok(sheet) => {
-                    sheet.transform_to_db(&mut self.music_sheet);
+        let mut invalid: Vec<String> = Vec::new(); // Shortcuts that don't compile
+        let writer = slf.borrow().storage.writer();
+        let writer = &writer;
+        loop {
+            let (next, msg) = slf.py().allow_threads(move || {
+                // What the last batch queued is written while the next one is parsed
+                if let Err(e) = writer.flush() {
+                    eprintln!("Import Shortcuts: Failed to write the storage: {}", e);
                 }
-                Err(e) => {
-                    let err_str = format!("Failed to import file {}: {}", file, e);
-                    eprintln!("Export Shortcuts: {}", err_str);
-                    failed_paths.push(file.clone());
+                let msg = rx.recv();
+                (rx, msg)
+            });
+            rx = next;
+            match msg {
+                Ok(ImportMsg::Batch(batch)) => {
+                    let mut flute = slf.borrow_mut();
+                    let added = flute.music_sheet.unseen(batch);
+                    progress.add(added.len());
+                    // Imported anyway, but reported now rather than when first executed
+                    for sc in &added {
+                        if let Err(e) = KeyProgram::compile(&sc.shortcut, &flute.music_sheet.keymap) {
+                            invalid.push(format!("{} > {} ({}): {}", sc.application, sc.description, sc.shortcut, e));
+                        }
+                    }
+                    if !added.is_empty() {
+                        flute.mutate(JournalOp::Create { shortcuts: added.clone() }, |db| db.append_unique(added));
+                    }
                 }
+                Ok(ImportMsg::Failed { path, error }) => {
+                    eprintln!("Import Shortcuts: Failed to import file {}: {}", path, error);
+                    failed_paths.push(path);
+                }
+                Err(_) => break, // Every file is done
             }
         }
-        if failed_paths.is_empty() {
-            BlueBirdResponse::success()
-        } else {
+
+        if progress.cancelled() {
             BlueBirdResponse {
                 code: StateCode::FAIL,
+                results: vec!["Import cancelled".to_string()],
+            }
+        } else {
+            // Results are the files that failed (if any), then the invalid shortcuts
+            let code = if failed_paths.is_empty() { StateCode::OK } else { StateCode::FAIL };
+            failed_paths.extend(invalid);
+            BlueBirdResponse {
+                code,
                 results: failed_paths,
             }
         }
     }
 
+    /// Stop the running import, the shortcuts it added so far are kept
+    fn command_cancel_import(&self, _cmd: &LizCommand) -> BlueBirdResponse {
+        self.import_progress.cancel();
+        BlueBirdResponse::success()
+    }
+
     // fn command_get_shortcuts(&self, cmd: &LizCommand) -> BlueBirdResponse {
     //     let fmt = &self.rhythm.shortcut_print_fmt;
     //     let shortcuts = if cmd.args.is_empty() {
@@ -340,6 +528,28 @@ impl Flute {
         }
     }
 
+    /// Compile the shortcut string in args[0] without saving it, results are its steps
+    /// in readable form, or the error that keeps it from being executed
+    fn command_compile_shortcut(&self, cmd: &LizCommand) -> BlueBirdResponse {
+        if cmd.args.is_empty() {
+            eprintln!("BUG: Empty args, expect one shortcut");
+            return BlueBirdResponse {
+                code: StateCode::BUG,
+                results: vec!["Empty args, expect one shortcut".to_string()],
+            };
+        }
+        match KeyProgram::compile(&cmd.args[0], &self.music_sheet.keymap) {
+            Ok(program) => BlueBirdResponse {
+                code: StateCode::OK,
+                results: program.describe(),
+            },
+            Err(e) => BlueBirdResponse {
+                code: StateCode::FAIL,
+                results: vec![e],
+            },
+        }
+    }
+
     fn _args_to_shortcut_vec(&self, cmd: &LizCommand) -> Result<Vec<Shortcut>, String> {
         let shortcuts: Result<Vec<Shortcut>, _> = cmd
             .args
@@ -358,7 +568,9 @@ impl Flute {
     fn command_create_shortcuts(&mut self, cmd: &LizCommand) -> BlueBirdResponse {
         match self._args_to_shortcut_vec(cmd) {
             Ok(shortcuts) => {
-                self.music_sheet.add_shortcuts(shortcuts, None);
+                self.mutate(JournalOp::Create { shortcuts: shortcuts.clone() }, |db| {
+                    db.add_shortcuts(shortcuts, None)
+                });
                 BlueBirdResponse::success()
             }
             Err(e) => {
@@ -374,7 +586,13 @@ impl Flute {
     fn command_update_shortcuts(&mut self, cmd: &LizCommand) -> BlueBirdResponse {
         match self._args_to_shortcut_vec(cmd) {
             Ok(shortcuts) => {
-                let unmatched: Vec<Shortcut> = self.music_sheet.update_shortcuts(shortcuts);
+                for sc in &shortcuts {
+                    self.programs.remove(&sc.id);
+                }
+                let unmatched: Vec<Shortcut> = self.mutate(
+                    JournalOp::Update { shortcuts: shortcuts.clone() },
+                    |db| db.update_shortcuts(shortcuts),
+                );
                 let unmatched: Vec<String> =
                     unmatched.iter().map(|sc| sc.to_json_string()).collect();
                 if unmatched.is_empty() {
@@ -408,7 +626,12 @@ impl Flute {
             .collect();
         match id_to_delete {
             Ok(id_to_delete) => {
-                self.music_sheet.delete_shortcuts(id_to_delete);
+                for id in &id_to_delete {
+                    self.programs.remove(id);
+                }
+                self.mutate(JournalOp::Delete { ids: cmd.args.clone() }, |db| {
+                    db.delete_shortcuts(id_to_delete)
+                });
                 BlueBirdResponse::success()
             }
             Err(e) => {
@@ -434,7 +657,7 @@ impl Flute {
         match new_rhythm {
             Ok(new_rhythm) => {
                 let saved_path = new_rhythm.save_rhythm(None); // Save to the default path
-                self.rhythm = new_rhythm;
+                self.apply_rhythm(new_rhythm);
                 match saved_path {
                     Ok(saved_path) => BlueBirdResponse {
                         code: StateCode::OK,
@@ -461,38 +684,75 @@ impl Flute {
         }
     }
 
-    /// Execute the shortcut of given id
-    fn _execute(&mut self, id_str: &str) -> Result<&Shortcut, FluteExecuteError> {
-        match string_to_id(id_str) {
-            Ok(id) => {
-                let sc = self.music_sheet.retrieve(id, None);
-                if sc.is_none() {
-                    return Err(FluteExecuteError::new(
-                        &format!("No keycode found for id {}", id_str),
-                        StateCode::BUG,
-                    ));
-                }
-                let sc: &Shortcut = sc.unwrap();
-                let keycode = convert_shortcut_to_keycode(&sc.shortcut, &self.music_sheet.keymap);
-                println!("Execute: {}: {}", id_str, keycode);
-                if let Err(e) = execute_shortcut_enigo(&keycode, self.rhythm.interval_ms) {
-                    let err_str =
-                        format!("Enigo fails to execute shortcut {}: {}", sc.shortcut, e);
-                    return Err(FluteExecuteError::new(&err_str, StateCode::FAIL));
-                }
-                let _ = self.music_sheet.hit_num_up(id);
-                self.update_rank();
-                let sc = self.music_sheet.retrieve(id, None).unwrap();
-                Ok(sc)
-            }
-            Err(e) => {
-                let err_str = format!("BUG: Failed to parse ID {}: {}", id_str, e);
-                Err(FluteExecuteError::new(&err_str, StateCode::BUG))
-            }
-        }
+    /// Use new settings. The keymap is read again even when its path is the same,
+    /// the file may have been edited since, and the shortcuts compiled with the old
+    /// one are dropped.
+    fn apply_rhythm(&mut self, rhythm: Rhythm) {
+        self.rhythm = rhythm;
+        self.music_sheet.read_keymap(&self.rhythm.keymap_path);
+        self.programs.clear();
     }
 
-    fn command_execute(&mut self, cmd: &LizCommand) -> BlueBirdResponse {
+    /// The compiled shortcut of given id, compiled on first use and kept until the
+    /// shortcut is updated or deleted, or the settings are applied
+    fn program_of(&mut self, id: u128) -> Result<Arc<KeyProgram>, FluteExecuteError> {
+        if let Some(program) = self.programs.get(&id) {
+            return Ok(program.clone());
+        }
+        let sc: &Shortcut = self.music_sheet.retrieve(id, None).ok_or_else(|| {
+            FluteExecuteError::new(&format!("No keycode found for id {}", id_to_string(id)), StateCode::BUG)
+        })?;
+        let program = KeyProgram::compile(&sc.shortcut, &self.music_sheet.keymap).map_err(|e| {
+            FluteExecuteError::new(&format!("Invalid shortcut {}: {}", sc.shortcut, e), StateCode::FAIL)
+        })?;
+        let program = Arc::new(program);
+        self.programs.insert(id, program.clone());
+        Ok(program)
+    }
+
+    /// Execute the shortcut of given id, returns it with its new frecency.
+    /// It is cancelled by any cancel_execute played after `cancels_seen` was read from
+    /// get_execute_cancels, so a cancel played while it was still queued isn't lost;
+    /// None to only be cancelled by those played from now on.
+    /// The Flute is only borrowed to look the shortcut up and to count the hit,
+    /// the keys are sent with the GIL released.
+    fn _execute(slf: &Bound<'_, Self>, id_str: &str, cancels_seen: Option<u64>) -> Result<(Shortcut, f64), FluteExecuteError> {
+        let id = string_to_id(id_str).map_err(|e| {
+            let err_str = format!("BUG: Failed to parse ID {}: {}", id_str, e);
+            FluteExecuteError::new(&err_str, StateCode::BUG)
+        })?;
+
+        let (program, raw_shortcut, interval_ms, cancels) = {
+            let mut flute = slf.borrow_mut();
+            let program = flute.program_of(id)?;
+            let raw_shortcut = flute.music_sheet.retrieve(id, None).map(|sc| sc.shortcut.clone()).unwrap_or_default();
+            (program, raw_shortcut, flute.rhythm.interval_ms, flute.execute_cancels.clone())
+        };
+        let cancels_seen = cancels_seen.unwrap_or_else(|| cancels.load(Ordering::SeqCst));
+
+        println!("Execute: {}: {:?}", id_str, program.describe());
+        slf.py()
+            .allow_threads(|| {
+                execute_shortcut_enigo(&program, interval_ms, &cancels, cancels_seen).map_err(|e| e.to_string())
+            })
+            .map_err(|e| {
+                let err_str = format!("Enigo fails to execute shortcut {}: {}", raw_shortcut, e);
+                FluteExecuteError::new(&err_str, StateCode::FAIL)
+            })?;
+
+        let mut flute = slf.borrow_mut();
+        let at = now_secs();
+        flute.frecency.record_hit(id, at); // First, the usage saved by mutate must have it
+        let _ = flute.mutate(JournalOp::HitUp { id: id_to_string(id), at }, |db| db.hit_num_up(id));
+        flute.music_sheet.rank_up(id); // Only this shortcut can move up, no full sort needed
+        let sc = flute.music_sheet.retrieve(id, None).cloned().ok_or_else(|| {
+            FluteExecuteError::new(&format!("Shortcut {} was deleted while executing", id_str), StateCode::FAIL)
+        })?;
+        let frecency = flute.frecency.score(&sc);
+        Ok((sc, frecency))
+    }
+
+    fn command_execute(slf: &Bound<'_, Self>, cmd: &LizCommand) -> BlueBirdResponse {
         if cmd.args.is_empty() {
             eprintln!("BUG: Empty args, expect one index on args[0]");
             return BlueBirdResponse {
@@ -500,12 +760,15 @@ impl Flute {
                 results: vec!["Empty args, expect one shortcut id".to_string()],
             };
         }
-        match self._execute(cmd.args[0].as_str()) {
-            Ok(sc) => {
+        // args[1], if given, is what get_execute_cancels returned when the execute was queued
+        let cancels_seen = cmd.args.get(1).and_then(|seen| seen.parse().ok());
+        match Flute::_execute(slf, cmd.args[0].as_str(), cancels_seen) {
+            Ok((sc, frecency)) => {
                 BlueBirdResponse {
                     code: StateCode::OK,
                     results: vec![
-                        sc.to_json_string()
+                        sc.to_json_string(),
+                        frecency.to_string(),
                     ]
                 }
             },
@@ -519,13 +782,23 @@ impl Flute {
         }
     }
 
-    fn persist(&self) -> Result<(), Box<dyn std::error::Error>> {
-        self.music_sheet
-            .export_to_json(&self.rhythm.music_sheet_path)
+    /// Stop the shortcut being executed after its current block, and the ones
+    /// submitted before but not started yet
+    fn command_cancel_execute(&self, _cmd: &LizCommand) -> BlueBirdResponse {
+        self.execute_cancels.fetch_add(1, Ordering::SeqCst);
+        BlueBirdResponse::success()
+    }
+
+    /// Queue the usage and the checkpoint of the storage, flush_storage writes them
+    fn persist(&mut self) -> Result<(), Box<dyn std::error::Error>> {
+        self.queue_usage();
+        self.storage.persist(&mut self.music_sheet)
     }
 
-    fn command_persist(&self, _cmd: &LizCommand) -> BlueBirdResponse {
-        match self.persist() {
+    fn command_persist(slf: &Bound<'_, Self>, _cmd: &LizCommand) -> BlueBirdResponse {
+        let queued = slf.borrow_mut().persist().map_err(|e| e.to_string());
+        let persisted = queued.and_then(|()| Flute::flush_storage(slf).map_err(|e| e.to_string()));
+        match persisted {
             Ok(()) => BlueBirdResponse::success(),
             Err(e) => {
                 eprintln!("BUG: Failed to persist music_sheet, error: {}", e);
@@ -566,3 +839,40 @@ impl Flute {
 //         }
 //     }
 // }
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    #[test]
+    fn test_applying_settings_reloads_the_keymap() {
+        let dir = std::env::temp_dir().join(format!("liz-flute-{}", id_to_string(generate_id())));
+        std::fs::create_dir_all(&dir).unwrap();
+        let keymap_path = dir.join("keymap.json");
+        std::fs::write(&keymap_path, r#"{"jump": "pageup"}"#).unwrap();
+        let rhythm = Rhythm {
+            liz_path: dir.to_str().unwrap().to_string(),
+            music_sheet_path: dir.join("music_sheet.lock").to_str().unwrap().to_string(),
+            keymap_path: keymap_path.to_str().unwrap().to_string(),
+            ..Rhythm::default()
+        };
+        let rhythm_path = dir.join("rhythm.toml");
+        rhythm.save_rhythm(Some(rhythm_path.clone())).unwrap();
+
+        let mut flute = Flute::create_flute(Some(rhythm_path.to_str().unwrap().to_string())).unwrap();
+        let shortcut = Shortcut { shortcut: "jump".to_string(), ..Default::default() };
+        let id = shortcut.id;
+        flute.music_sheet.add_shortcuts(vec![shortcut], None);
+        let before = flute.program_of(id).unwrap();
+        assert_eq!(*before, KeyProgram::compile("pageup", &HashMap::new()).unwrap());
+
+        // Same settings, same keymap path, edited file
+        std::fs::write(&keymap_path, r#"{"jump": "pagedown"}"#).unwrap();
+        flute.apply_rhythm(flute.rhythm.clone());
+        let after = flute.program_of(id).unwrap();
+        assert_eq!(*after, KeyProgram::compile("pagedown", &HashMap::new()).unwrap());
+        assert_ne!(before, after);
+
+        let _ = std::fs::remove_dir_all(dir);
+    }
+}
@@ -1,8 +1,10 @@
 use serde::de;
 use serde::{Deserialize, Serialize};
+use std::collections::hash_map::DefaultHasher;
 use std::collections::{HashMap, HashSet};
 use std::error::Error;
-use std::fs::{self, File, OpenOptions};
+use std::fs::{File, OpenOptions};
+use std::hash::{Hash, Hasher};
 use std::io::Read;
 
 use super::utils::{generate_id, id_to_string, string_to_id};
@@ -97,30 +99,98 @@ impl Shortcut {
         formatted_str
     }
 
+    /// Hash of the fields two shortcuts are compared on to find duplicates, id and hit_number left out
+    pub fn content_hash(&self) -> u64 {
+        let mut hasher = DefaultHasher::new();
+        (&self.shortcut, &self.application, &self.description, &self.comment).hash(&mut hasher);
+        hasher.finish()
+    }
+
     /// Remove duplicates by considering all attributes except hit_number, or the id is the same
     pub fn remove_duplicates(shortcuts: &Vec<Shortcut>) -> Vec<Shortcut> {
-        let mut seen = HashSet::new();
-        let mut seen_id = HashSet::new();
-        let mut unique_shortcuts = Vec::new();
-
-        for shortcut in shortcuts {
-            // Create a tuple of all fields that should be used for uniqueness check
-            let unique_key = (
-                shortcut.shortcut.clone(),
-                shortcut.application.clone(),
-                shortcut.description.clone(),
-                shortcut.comment.clone(),
-            );
-
-            // If the unique key AND id is not already in the set, add it to the result
-            if !seen.contains(&unique_key) && !seen_id.contains(&shortcut.id) {
-                unique_shortcuts.push(shortcut.clone());
-                seen_id.insert(shortcut.id);
-                seen.insert(unique_key);
-            }
+        let mut seen = HashSet::with_capacity(shortcuts.len());
+        let mut seen_id = HashSet::with_capacity(shortcuts.len());
+        shortcuts
+            .iter()
+            .filter(|shortcut| {
+                // The id first, so a shortcut dropped for its id doesn't claim its content
+                !seen_id.contains(&shortcut.id) && seen.insert(shortcut.content_hash()) && seen_id.insert(shortcut.id)
+            })
+            .cloned()
+            .collect()
+    }
+}
+
+/// (ids, hit_numbers, shortcuts, applications, descriptions, comments, frecencies)
+pub type ShortcutColumnsTuple = (Vec<String>, Vec<i64>, Vec<String>, Vec<String>, Vec<String>, Vec<String>, Vec<f64>);
+
+/// The lowercased whitespace separated parts of a fuzzy_search query
+struct FuzzyQuery {
+    parts: Vec<String>,
+}
+
+impl FuzzyQuery {
+    fn new(query: &str) -> Self {
+        FuzzyQuery { parts: query.to_lowercase().split_whitespace().map(str::to_string).collect() }
+    }
+
+    /// Whether application, description and shortcut, lowercased and without
+    /// spaces, contain every part
+    fn matches(&self, shortcut: &Shortcut) -> bool {
+        let normalized_description = format!("{}{}{}", shortcut.application, shortcut.description, shortcut.shortcut)
+            .to_lowercase()
+            .replace(" ", "");
+        self.parts.iter().all(|part| normalized_description.contains(part.as_str()))
+    }
+}
+
+/// Shortcuts split into parallel columns, so they can cross to Python in one go
+/// without serializing every shortcut to JSON
+#[derive(Debug, Default)]
+pub struct ShortcutColumns {
+    pub ids: Vec<String>,
+    pub hit_numbers: Vec<i64>,
+    pub shortcuts: Vec<String>,
+    pub applications: Vec<String>,
+    pub descriptions: Vec<String>,
+    pub comments: Vec<String>,
+    pub frecencies: Vec<f64>,
+}
+
+impl ShortcutColumns {
+    pub fn from_shortcuts(shortcuts: &[&Shortcut], frecency: impl Fn(&Shortcut) -> f64) -> Self {
+        let n = shortcuts.len();
+        let mut columns = Self {
+            ids: Vec::with_capacity(n),
+            hit_numbers: Vec::with_capacity(n),
+            shortcuts: Vec::with_capacity(n),
+            applications: Vec::with_capacity(n),
+            descriptions: Vec::with_capacity(n),
+            comments: Vec::with_capacity(n),
+            frecencies: Vec::with_capacity(n),
+        };
+        for sc in shortcuts {
+            columns.ids.push(id_to_string(sc.id));
+            columns.hit_numbers.push(sc.hit_number);
+            columns.shortcuts.push(sc.shortcut.clone());
+            columns.applications.push(sc.application.clone());
+            columns.descriptions.push(sc.description.clone());
+            columns.comments.push(sc.comment.clone());
+            columns.frecencies.push(frecency(sc));
         }
+        columns
+    }
 
-        unique_shortcuts
+    pub fn into_tuple(self) -> ShortcutColumnsTuple {
+        (
+            self.ids,
+            self.hit_numbers,
+            self.shortcuts,
+            self.applications,
+            self.descriptions,
+            self.comments,
+            self.frecencies,
+        )
     }
 }
 
@@ -128,6 +198,8 @@ impl Shortcut {
 struct MusicSheetDBTable {
     deleted: Vec<Shortcut>,
     data: Vec<Shortcut>,
+    #[serde(default)]
+    journal_seq: u64, // Last journal entry contained in this snapshot
 }
 
 impl MusicSheetDBTable {
@@ -135,6 +207,7 @@ impl MusicSheetDBTable {
         Self {
             deleted: Vec::new(),
             data: Vec::new(),
+            journal_seq: 0,
         }
     }
 }
@@ -143,6 +216,10 @@ impl MusicSheetDBTable {
 pub struct MusicSheetDB {
     t: MusicSheetDBTable,
     pub keymap: HashMap<String, String>,
+    slots: HashMap<u128, usize>,    // id -> position in t.data, rebuilt when data moves
+    revision: u64,                 // Bumped by every change to data, starts from 0 at load
+    changed_at: HashMap<u128, u64>, // id -> revision of its last change
+    contents: HashMap<u64, u32>,    // content_hash -> shortcuts of data with it, built at load
 }
 
 impl MusicSheetDB {
@@ -151,23 +228,86 @@ impl MusicSheetDB {
      * safe_check (default true) to remove duplicate shortcuts, which means the content or the id is the same.
      */
     pub fn add_shortcuts(&mut self, shortcuts: Vec<Shortcut>, safe_check: Option<bool>) {
-        self.t.data.extend(shortcuts);
-        let safe_check = safe_check.unwrap_or(true);
-        if safe_check {
-            self.remove_data_duplicates();
-        }
+        let shortcuts = if safe_check.unwrap_or(true) { self.unseen(shortcuts) } else { shortcuts };
+        self.append_unique(shortcuts);
     }
 
     // Remove duplicates in shortcuts by considering all attributes except hit_number, or the id is the same
     pub fn remove_data_duplicates(&mut self) {
         self.t.data = Shortcut::remove_duplicates(&self.t.data);
+        self.reindex();
+        self.reindex_contents();
+    }
+
+    /// The shortcuts of batch that are not duplicates: neither their id nor their content
+    /// is in data or earlier in batch. O(batch), checked against the slot and content indexes.
+    pub fn unseen(&self, batch: Vec<Shortcut>) -> Vec<Shortcut> {
+        let mut ids = HashSet::with_capacity(batch.len());
+        let mut hashes = HashSet::with_capacity(batch.len());
+        batch
+            .into_iter()
+            .filter(|sc| {
+                let hash = sc.content_hash();
+                !self.slots.contains_key(&sc.id)
+                    && !self.contents.contains_key(&hash)
+                    && ids.insert(sc.id)
+                    && hashes.insert(hash)
+            })
+            .collect()
+    }
+
+    /// Append shortcuts known to be new (see unseen), without a dedup pass or a full reindex
+    pub fn append_unique(&mut self, shortcuts: Vec<Shortcut>) {
+        self.mark_changed(shortcuts.iter().map(|sc| sc.id));
+        self.t.data.reserve(shortcuts.len());
+        for sc in shortcuts {
+            self.slots.insert(sc.id, self.t.data.len());
+            self.index_content(&sc);
+            self.t.data.push(sc);
+        }
+    }
+
+    /// Rebuild the content_hash index, only needed when data is loaded as a whole
+    fn reindex_contents(&mut self) {
+        self.contents.clear();
+        self.contents.reserve(self.t.data.len());
+        for sc in &self.t.data {
+            *self.contents.entry(sc.content_hash()).or_insert(0) += 1;
+        }
+    }
+
+    fn index_content(&mut self, sc: &Shortcut) {
+        *self.contents.entry(sc.content_hash()).or_insert(0) += 1;
+    }
+
+    fn unindex_content(&mut self, sc: &Shortcut) {
+        let hash = sc.content_hash();
+        if let Some(count) = self.contents.get_mut(&hash) {
+            *count -= 1;
+            if *count == 0 {
+                self.contents.remove(&hash);
+            }
+        }
+    }
+
+    /// Rebuild the id -> slot index after shortcuts were added, removed or reordered
+    fn reindex(&mut self) {
+        self.slots.clear();
+        self.slots.reserve(self.t.data.len());
+        for (slot, sc) in self.t.data.iter().enumerate() {
+            self.slots.insert(sc.id, slot);
+        }
+    }
+
+    fn slot_of(&self, id: u128) -> Option<usize> {
+        self.slots.get(&id).copied()
     }
 
     /// Retrieves one shortcut by its id from either "data" or "deleted" list, default mode to be "data"
     pub fn retrieve(&self, id: u128, mode: Option<&str>) -> Option<&Shortcut> {
         let mode = mode.unwrap_or("data"); // Default to "data" if mode is None
         match mode {
-            "data" => self.t.data.iter().find(|&shortcut| shortcut.id == id),
+            "data" => self.slot_of(id).map(|slot| &self.t.data[slot]),
             "deleted" => self.t.deleted.iter().find(|&shortcut| shortcut.id == id),
             _ => None, // Return None if an invalid mode is provided
         }
@@ -179,21 +319,16 @@ impl MusicSheetDB {
             println!("Retrieve_all");
             return self.retrieve_all();
         }
-        let mut results: Vec<&Shortcut> = Vec::new();
-        let binding: String = query.to_lowercase();
-        let query_parts: Vec<&str> = binding.split_whitespace().collect::<Vec<_>>();
-
-        // Normalize the query (remove spaces) and loop over the data to find matches
-        for shortcut in &self.t.data {
-            let normalized_description = format!("{}{}{}", shortcut.application, shortcut.description, shortcut.shortcut).to_lowercase().replace(" ", "");
-
-            // Check if all query parts match the normalized description
-            if query_parts.iter().all(|part| normalized_description.contains(part)) {
-                results.push(shortcut);
-            }
-        }
+        let query = FuzzyQuery::new(query);
+        self.t.data.iter().filter(|shortcut| query.matches(shortcut)).collect()
+    }
 
-        results
+    /// fuzzy_search among the given ids only, in the same order. For the candidates
+    /// of an index that may match more loosely (or miss a few): what they add that
+    /// fuzzy_search wouldn't return is filtered out.
+    pub fn fuzzy_search_among(&self, query: &str, ids: &HashSet<u128>) -> Vec<&Shortcut> {
+        let query = FuzzyQuery::new(query);
+        self.retrieve_many(ids).into_iter().filter(|shortcut| query.matches(shortcut)).collect()
     }
 
     /// Retrieve all data
@@ -201,20 +336,31 @@ impl MusicSheetDB {
         self.t.data.iter().collect()
     }
 
+    /// Retrieve the shortcuts with the given ids, in data order, unknown ids are skipped
+    pub fn retrieve_many(&self, ids: &HashSet<u128>) -> Vec<&Shortcut> {
+        let mut slots: Vec<usize> = ids.iter().filter_map(|&id| self.slot_of(id)).collect();
+        slots.sort_unstable();
+        slots.into_iter().map(|slot| &self.t.data[slot]).collect()
+    }
+
     /// Delete a list of shortcuts by id, and move the deleted shortcuts to deleted
     pub fn delete_shortcuts(&mut self, ids: Vec<u128>) {
-        let mut deleted_shortcuts: Vec<Shortcut> = Vec::new();
+        let ids: HashSet<u128> = ids.into_iter().filter(|id| self.slots.contains_key(id)).collect();
+        if ids.is_empty() {
+            return;
+        }
 
-        // Collect the shortcuts with the specified IDs to move them to deleted
-        self.t.data.retain(|shortcut| {
-            if ids.contains(&shortcut.id) {
-                deleted_shortcuts.push(shortcut.clone());
-                false
-            } else {
-                true
-            }
-        });
+        // Split the shortcuts with the specified IDs off to move them to deleted
+        let (deleted_shortcuts, kept): (Vec<Shortcut>, Vec<Shortcut>) = std::mem::take(&mut self.t.data)
+            .into_iter()
+            .partition(|shortcut| ids.contains(&shortcut.id));
+        self.t.data = kept;
+        self.reindex();
+        for sc in &deleted_shortcuts {
+            self.unindex_content(sc);
+        }
 
+        self.mark_changed(deleted_shortcuts.iter().map(|sc| sc.id));
         self.t.deleted.extend(deleted_shortcuts);
     }
 
@@ -233,14 +379,18 @@ impl MusicSheetDB {
         let mut modified_shortcuts: Vec<Shortcut> = Vec::new();
 
         for new_sc in new_shortcuts {
-            if let Some(shortcut) = self.t.data.iter_mut().find(|s| s.id == new_sc.id) {
-                modified_shortcuts.push(shortcut.clone());
+            if let Some(slot) = self.slot_of(new_sc.id) {
+                let old_sc = self.t.data[slot].clone();
+                self.unindex_content(&old_sc);
+                self.index_content(&new_sc);
                 // *shortcut = new_sc;  // replace the entire object
-                shortcut.update(&new_sc);
+                self.t.data[slot].update(&new_sc);
+                modified_shortcuts.push(old_sc);
             } else {
                 unmatched.push(new_sc);
             }
         }
+        self.mark_changed(modified_shortcuts.iter().map(|sc| sc.id));
         self.t.deleted.extend(modified_shortcuts);
 
         unmatched
@@ -253,17 +403,65 @@ impl MusicSheetDB {
         Self {
             t: MusicSheetDBTable::new(),
             keymap: HashMap::new(),
+            slots: HashMap::new(),
+            revision: 0,
+            changed_at: HashMap::new(),
+            contents: HashMap::new(),
+        }
+    }
+
+    /// Build from shortcuts loaded elsewhere, e.g. from SQLite
+    pub fn from_parts(data: Vec<Shortcut>, deleted: Vec<Shortcut>) -> Self {
+        let mut db = Self::new();
+        db.t.data = data;
+        db.t.deleted = deleted;
+        db.reindex();
+        db.reindex_contents();
+        db
+    }
+
+    /// Current revision of data, every create/update/delete/hit moves it forward
+    pub fn revision(&self) -> u64 {
+        self.revision
+    }
+
+    /// Record one change (one new revision) touching all the given ids
+    fn mark_changed(&mut self, ids: impl IntoIterator<Item = u128>) {
+        self.revision += 1;
+        for id in ids {
+            self.changed_at.insert(id, self.revision);
         }
     }
 
+    /// Shortcuts created or updated after revision `since`, and the ids deleted after it
+    pub fn changes_since(&self, since: u64) -> (Vec<&Shortcut>, Vec<u128>) {
+        let mut changed: HashSet<u128> = self
+            .changed_at
+            .iter()
+            .filter(|(_, &rev)| rev > since)
+            .map(|(&id, _)| id)
+            .collect();
+        if changed.is_empty() {
+            return (Vec::new(), Vec::new());
+        }
+        let upserted: Vec<&Shortcut> = self.retrieve_many(&changed);
+        for sc in &upserted {
+            changed.remove(&sc.id);
+        }
+        (upserted, changed.into_iter().collect())
+    }
+
     /// Import from JSON file
     pub fn import_from_json(file_path: &str) -> Result<Self, Box<dyn Error>> {
         let file = File::open(file_path)?;
         let t: MusicSheetDBTable = serde_json::from_reader(file)?;
-        Ok(Self {
+        let mut db = Self {
             t,
-            keymap: HashMap::new(),
-        })
+            ..Self::new()
+        };
+        db.reindex();
+        db.reindex_contents();
+        Ok(db)
     }
 
     /// Export to JSON file
@@ -277,13 +475,29 @@ impl MusicSheetDB {
         Ok(())
     }
 
-    pub fn read_keymap(&self, keymap_path: &str) {
+    /// The snapshot export_to_json would write, to be written elsewhere
+    pub fn to_json_bytes(&self) -> serde_json::Result<Vec<u8>> {
+        serde_json::to_vec(&self.t)
+    }
+
+    pub fn journal_seq(&self) -> u64 {
+        self.t.journal_seq
+    }
+
+    pub fn set_journal_seq(&mut self, seq: u64) {
+        self.t.journal_seq = seq;
+    }
+
+    /// Load the keymap (key name -> keycode) from keymap_path, it is left empty
+    /// if the file is missing or invalid
+    pub fn read_keymap(&mut self, keymap_path: &str) {
+        self.keymap.clear();
         // Attempt to open the file
         let mut file = match File::open(keymap_path) {
             Ok(f) => f,
             Err(e) => {
                 eprint!("Warning: Keymap file does not exist: {}\n", e);
-                return; // Return an empty map in case of error
+                return;
             }
         };
 
@@ -291,12 +505,12 @@ impl MusicSheetDB {
         let mut contents = String::new();
         if let Err(e) = file.read_to_string(&mut contents) {
             eprint!("Error reading keymap file: {}\n", e);
-            return; // Return an empty map in case of error
+            return;
         }
 
         // Parse the contents as JSON
         match serde_json::from_str(&contents) {
-            Ok(key_event_codes) => key_event_codes,
+            Ok(key_event_codes) => self.keymap = key_event_codes,
             Err(e) => {
                 eprint!("Error parsing keymap JSON: {}\n", e);
             }
@@ -305,8 +519,9 @@ impl MusicSheetDB {
 
     /// Function to increase hit_number for a given row index
     pub fn hit_num_up(&mut self, id: u128) -> Result<(), String> {
-        if let Some(sc) = self.t.data.iter_mut().find(|shortcut| shortcut.id == id) {
+        if let Some(sc) = self.slot_of(id).map(|slot| &mut self.t.data[slot]) {
             sc.hit_number += 1; // Increment the hit_number
+            self.mark_changed([id]);
             Ok(())
         } else {
             Err(format!("ID {} not found", id)) // Return an error if the index is invalid
@@ -333,6 +548,32 @@ impl MusicSheetDB {
                 ordering.reverse()
             }
         });
+        self.reindex();
+    }
+
+    /// Move the shortcut of given id in front of the shortcuts it outranks now, e.g. after
+    /// hit_num_up, instead of sorting the whole sheet again.
+    /// Keeps the order of sorting by application and then (stable) by hit_number descending.
+    /// Returns the (old, new) slot of the shortcut.
+    pub fn rank_up(&mut self, id: u128) -> Option<(usize, usize)> {
+        let slot = self.slot_of(id)?;
+        let data = &mut self.t.data;
+        let outranks = |other: &Shortcut, sc: &Shortcut| {
+            other.hit_number < sc.hit_number
+                || (other.hit_number == sc.hit_number && other.application > sc.application)
+        };
+
+        let mut new_slot = slot;
+        while new_slot > 0 && outranks(&data[new_slot - 1], &data[slot]) {
+            new_slot -= 1;
+        }
+        if new_slot < slot {
+            data[new_slot..=slot].rotate_right(1);
+            for (s, sc) in data[new_slot..=slot].iter().enumerate() {
+                self.slots.insert(sc.id, new_slot + s);
+            }
+        }
+        Some((slot, new_slot))
     }
 }
 
@@ -347,61 +588,141 @@ impl UserSheet {
         Self { data: shortcuts }
     }
 
-    pub fn import_from(path: &str) -> Result<Self, Box<dyn Error>> {
-        let metadata = fs::metadata(path)?;
-
-        if metadata.is_file() {
-            UserSheet::import_from_json(path)
-        } else if metadata.is_dir() {
-            UserSheet::import_from_json_dir(path)
-        } else {
-            Err(format!("{} is neither a file nor a directory.", path).into())
-        }
+    /// Export to JSON file
+    pub fn export_to_json(&self, file_path: &str) -> Result<(), Box<dyn Error>> {
+        let _ = std::fs::remove_file(file_path);
+        let file = OpenOptions::new()
+            .write(true)
+            .create(true)
+            .open(file_path)?;
+        serde_json::to_writer(file, &self.data)?;
+        Ok(())
     }
 
-    /// Import from JSON file
-    fn import_from_json(file_path: &str) -> Result<Self, Box<dyn Error>> {
-        let file = File::open(file_path)?;
-        let data: Vec<Shortcut> = serde_json::from_reader(file)?;
-        Ok(Self { data: data })
+    pub fn shortcuts(&self) -> &Vec<Shortcut> {
+        &self.data
     }
+}
 
-    /// Import all JSON files from a directory
-    fn import_from_json_dir(dir_path: &str) -> Result<Self, Box<dyn Error>> {
-        let mut all_data: Vec<Shortcut> = Vec::new();
-
-        // Iterate over all entries in the directory
-        for entry in fs::read_dir(dir_path)? {
-            let entry: fs::DirEntry = entry?;
-            let path: std::path::PathBuf = entry.path();
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    fn sheet(n: usize) -> (MusicSheetDB, Vec<u128>) {
+        let shortcuts: Vec<Shortcut> = (0..n)
+            .map(|i| Shortcut {
+                hit_number: (i % 7) as i64,
+                description: format!("shortcut {}", i),
+                ..Default::default()
+            })
+            .collect();
+        let ids = shortcuts.iter().map(|sc| sc.id).collect();
+        let mut db = MusicSheetDB::new();
+        db.add_shortcuts(shortcuts, None);
+        (db, ids)
+    }
 
-            // Check if the entry is a file and ends with .json
-            if path.is_file() && path.extension().and_then(|s| s.to_str()) == Some("json") {
-                let file = File::open(&path)?;
+    #[test]
+    fn test_id_index_follows_deletes_and_sorts() {
+        let (mut db, ids) = sheet(100);
+        db.delete_shortcuts(ids.iter().step_by(3).copied().collect());
+        db.sort_by_column("hit_number", false);
+        for (i, id) in ids.iter().enumerate() {
+            let found = db.retrieve(*id, None);
+            assert_eq!(found.is_none(), i % 3 == 0);
+            if let Some(sc) = found {
+                assert_eq!(sc.description, format!("shortcut {}", i));
+            }
+        }
+        assert_eq!(db.retrieve_deleted().len(), 34);
 
-                // Deserialize the JSON content into UserDataRow
-                let data: Vec<Shortcut> = serde_json::from_reader(file)?;
+        db.hit_num_up(ids[1]).unwrap();
+        assert_eq!(db.retrieve(ids[1], None).unwrap().hit_number, 2);
+    }
 
-                // Extend the result vector with the new data
-                all_data.extend(data);
-            }
+    #[test]
+    fn test_rank_up_matches_full_sort() {
+        let (mut db, ids) = sheet(50);
+        for (i, sc) in db.t.data.iter_mut().enumerate() {
+            sc.application = format!("app {}", i % 4);
+        }
+        db.sort_by_column("application", true);
+        db.sort_by_column("hit_number", false);
+
+        for &id in ids.iter().step_by(7).chain(ids.iter().step_by(7)) {
+            db.hit_num_up(id).unwrap();
+            db.rank_up(id);
+            let ranked: Vec<u128> = db.retrieve_all().iter().map(|sc| sc.id).collect();
+            db.sort_by_column("application", true);
+            db.sort_by_column("hit_number", false);
+            assert_eq!(ranked, db.retrieve_all().iter().map(|sc| sc.id).collect::<Vec<_>>());
+            assert_eq!(db.retrieve(id, None).unwrap().id, id);
         }
+    }
 
-        Ok(Self { data: all_data })
+    #[test]
+    fn test_unseen_drops_what_add_shortcuts_would() {
+        let (mut db, ids) = sheet(20);
+        let same_content = Shortcut { description: "shortcut 3".to_string(), ..Default::default() };
+        let same_id = Shortcut { id: ids[5], description: "new".to_string(), ..Default::default() };
+        let new = Shortcut { description: "new".to_string(), ..Default::default() };
+        let new_twice = Shortcut { id: generate_id(), ..new.clone() };
+        let batch = vec![same_content, same_id, new.clone(), new_twice];
+
+        let added = db.unseen(batch.clone());
+        assert_eq!(added.iter().map(|sc| sc.id).collect::<Vec<_>>(), vec![new.id]);
+        db.append_unique(added);
+        assert_eq!(db.retrieve(new.id, None).unwrap().description, "new");
+        assert!(db.unseen(batch).is_empty()); // The index followed the append
+        assert_eq!(db.retrieve_all().len(), 21);
     }
 
-    /// Export to JSON file
-    pub fn export_to_json(&self, file_path: &str) -> Result<(), Box<dyn Error>> {
-        let _ = std::fs::remove_file(file_path);
-        let file = OpenOptions::new()
-            .write(true)
-            .create(true)
-            .open(file_path)?;
-        serde_json::to_writer(file, &self.data)?;
-        Ok(())
+    #[test]
+    fn test_content_index_follows_updates_and_deletes() {
+        let (mut db, ids) = sheet(10);
+        let copy_of = |i: usize| Shortcut { description: format!("shortcut {}", i), ..Default::default() };
+        assert!(db.unseen(vec![copy_of(4)]).is_empty());
+
+        let renamed = Shortcut { description: "renamed".to_string(), ..db.retrieve(ids[4], None).unwrap().clone() };
+        db.update_shortcuts(vec![renamed.clone()]);
+        assert_eq!(db.unseen(vec![copy_of(4)]).len(), 1);
+        assert!(db.unseen(vec![Shortcut { id: generate_id(), ..renamed }]).is_empty());
+
+        db.delete_shortcuts(vec![ids[5]]);
+        db.add_shortcuts(vec![copy_of(5), copy_of(5), copy_of(6)], None);
+        assert_eq!(db.retrieve_all().len(), 10);
+        assert_eq!(db.contents.values().sum::<u32>(), 10);
     }
 
-    pub fn transform_to_db(&self, db: &mut MusicSheetDB) {
-        db.add_shortcuts(self.data.clone(), None);
+    #[test]
+    fn test_read_keymap_keeps_the_map() {
+        let path = std::env::temp_dir().join(format!("liz-keymap-{}.json", generate_id()));
+        std::fs::write(&path, r#"{"pgup": "pageup"}"#).unwrap();
+        let mut db = MusicSheetDB::new();
+        db.read_keymap(path.to_str().unwrap());
+        assert_eq!(db.keymap.get("pgup").map(String::as_str), Some("pageup"));
+
+        db.read_keymap("/nonexistent/keymap.json");
+        assert!(db.keymap.is_empty());
+        let _ = std::fs::remove_file(path);
+    }
+
+    #[test]
+    fn test_fuzzy_search_among_filters_loose_candidates() {
+        let (mut db, ids) = sheet(30);
+        for (i, sc) in db.t.data.iter_mut().enumerate() {
+            sc.application = ["Firefox", "Blender", "VS Code"][i % 3].to_string();
+            sc.shortcut = format!("ctrl+{}", i % 10);
+        }
+        let all: HashSet<u128> = ids.iter().copied().collect();
+        for query in ["fire", "FIREFOX shortcut", "codeshort", "ctrl+1", "x", "bl 2", "nothing here", "e  +"] {
+            let among: Vec<u128> = db.fuzzy_search_among(query, &all).iter().map(|sc| sc.id).collect();
+            let full: Vec<u128> = db.fuzzy_search(query).iter().map(|sc| sc.id).collect();
+            assert_eq!(among, full, "{}", query);
+        }
+        // Candidates an index missed stay missing, the wrong ones are dropped
+        let some: HashSet<u128> = ids.iter().step_by(2).copied().collect();
+        let found: Vec<u128> = db.fuzzy_search_among("blender", &some).iter().map(|sc| sc.id).collect();
+        assert_eq!(found, ids.iter().enumerate().filter(|(i, _)| i % 6 == 4).map(|(_, id)| *id).collect::<Vec<_>>());
     }
 }
@@ -1,11 +1,12 @@
 use std::error::Error;
+use std::sync::atomic::{AtomicU64, Ordering};
 use std::thread::sleep;
 use std::time::Duration;
 use std::collections::HashMap;
 
 use enigo::{
     Direction::{Press, Release},
-    Enigo, InputError, Key, Keyboard, Settings,
+    Enigo, Key, Keyboard, Settings,
 };
 
 /// Converts a key name (e.g., "ctrl", "u", "enter") to an enigo::Key.
@@ -57,59 +58,116 @@ fn string_to_key(s: &str) -> Option<Key> {
     }
 }
 
-/// Simulate a sequence of keyboard events using Enigo.
-/// The sequence format is space-separated tokens like "ctrl.1 u.1 u.0 ctrl.0"
-/// where "1" stands for Press and "0" stands for Release.
-fn simulate_key_events_enigo(enigo: &mut Enigo, sequence: &str) -> Result<(), Box<dyn Error>> {
-    // Split the sequence by whitespace into individual event tokens.
-    for token in sequence.split_whitespace() {
-        // Use the last dot to separate key from event code.
-        if let Some(idx) = token.rfind('.') {
-            let key_str = &token[..idx];
-            let event_code = &token[idx + 1..];
-            if event_code.is_empty() {
-                return Err(format!("Invalid token (missing event code): '{}'", token).into());
+/// One step of a compiled shortcut
+#[derive(Debug, Clone, PartialEq)]
+pub enum KeyOp {
+    Press(Key),
+    Release(Key),
+    Type(String),
+}
+
+impl KeyOp {
+    /// Readable form, e.g. "press Control", "release c", "type abc"
+    pub fn describe(&self) -> String {
+        fn key_name(key: &Key) -> String {
+            match key {
+                Key::Unicode(ch) => ch.to_string(),
+                other => format!("{:?}", other),
             }
-            let key =
-                string_to_key(key_str).ok_or_else(|| format!("Unknown key: '{}'", key_str))?;
-            let direction = match event_code {
-                "1" => Press,
-                "0" => Release,
-                _ => return Err(format!("Unknown event code: '{}'", event_code).into()),
-            };
-            // Simulate the key event.
-            enigo.key(key, direction)?;
-        } else {
-            return Err(format!("Invalid token format (no '.' found): '{}'", token).into());
+        }
+        match self {
+            KeyOp::Press(key) => format!("press {}", key_name(key)),
+            KeyOp::Release(key) => format!("release {}", key_name(key)),
+            KeyOp::Type(text) => format!("type {}", text),
         }
     }
-    Ok(())
 }
 
-/// Simulate tpying a text using Enigo.
-fn simulate_text_events_enigo(enigo: &mut Enigo, text: &str) -> Result<(), InputError> {
-    enigo.text(text)?;
-    Ok(())
+/// Parse one key event of the keycode format, like "ctrl.1" (press) or "u.0" (release)
+fn parse_key_event(token: &str) -> Result<KeyOp, String> {
+    // Use the last dot to separate key from event code.
+    let idx = token
+        .rfind('.')
+        .ok_or_else(|| format!("Invalid token format (no '.' found): '{}'", token))?;
+    let key_str = &token[..idx];
+    let event_code = &token[idx + 1..];
+    if event_code.is_empty() {
+        return Err(format!("Invalid token (missing event code): '{}'", token));
+    }
+    let key = string_to_key(key_str).ok_or_else(|| format!("Unknown key: '{}'", key_str))?;
+    match event_code {
+        "1" => Ok(KeyOp::Press(key)),
+        "0" => Ok(KeyOp::Release(key)),
+        _ => Err(format!("Unknown event code: '{}'", event_code)),
+    }
 }
 
-pub fn execute_shortcut_enigo(shortcut_str: &str, delay_ms: u64) -> Result<(), Box<dyn Error>> {
-    // Initialize Enigo with the new Settings.
-    let mut enigo: Enigo = Enigo::new(&Settings::default())?;
+/// A shortcut compiled once into the key events it sends, in the blocks
+/// execute_shortcut_enigo waits the interval before.
+#[derive(Debug, Clone, PartialEq, Default)]
+pub struct KeyProgram {
+    blocks: Vec<Vec<KeyOp>>,
+}
 
-    let shortcuts: Vec<&str> = shortcut_str.split("[STR]").collect();
+impl KeyProgram {
+    /// Compile a shortcut string, see convert_shortcut_to_keycode for its format.
+    /// Every key is resolved here, so an invalid shortcut fails now rather than when executed.
+    pub fn compile(shortcut: &str, keymap: &HashMap<String, String>) -> Result<Self, String> {
+        Self::from_keycode(&convert_shortcut_to_keycode(shortcut, keymap))
+    }
 
-    for shortcut in shortcuts {
-        if shortcut.is_empty() {
-            continue;
+    /// Parse the keycode format: blocks split by [STR], each either "+ text" to type
+    /// or space-separated key events
+    fn from_keycode(keycode: &str) -> Result<Self, String> {
+        let mut blocks = Vec::new();
+        for block in keycode.split("[STR]") {
+            if block.is_empty() {
+                continue;
+            }
+            if block.starts_with('+') {
+                let text = block.get(2..).unwrap_or(""); // remove the prefix
+                blocks.push(vec![KeyOp::Type(text.to_string())]);
+            } else {
+                blocks.push(block.split_whitespace().map(parse_key_event).collect::<Result<_, _>>()?);
+            }
         }
+        Ok(Self { blocks })
+    }
+
+    pub fn ops(&self) -> impl Iterator<Item = &KeyOp> {
+        self.blocks.iter().flatten()
+    }
 
+    /// The steps in readable form, for previews
+    pub fn describe(&self) -> Vec<String> {
+        self.ops().map(KeyOp::describe).collect()
+    }
+}
+
+/// Execute the blocks of a compiled shortcut one by one, stopping early once the
+/// `cancels` count has moved past `cancels_seen`, the count when it was submitted.
+pub fn execute_shortcut_enigo(
+    program: &KeyProgram,
+    delay_ms: u64,
+    cancels: &AtomicU64,
+    cancels_seen: u64,
+) -> Result<(), Box<dyn Error>> {
+    // Initialize Enigo with the new Settings.
+    let mut enigo: Enigo = Enigo::new(&Settings::default())?;
+
+    for block in &program.blocks {
         sleep(Duration::from_millis(delay_ms)); // Sleep for the specified delay
 
-        if shortcut.starts_with("+") {
-            let type_str: &str = &shortcut[2..]; // remove the prefix
-            simulate_text_events_enigo(&mut enigo, type_str)?;
-        } else {
-            simulate_key_events_enigo(&mut enigo, shortcut)?;
+        if cancels.load(Ordering::SeqCst) != cancels_seen {
+            return Err("Execution cancelled".into());
+        }
+
+        for op in block {
+            match op {
+                KeyOp::Press(key) => enigo.key(*key, Press)?,
+                KeyOp::Release(key) => enigo.key(*key, Release)?,
+                KeyOp::Type(text) => enigo.text(text)?,
+            }
         }
     }
 
@@ -141,7 +199,7 @@ pub fn convert_shortcut_to_keycode(
         }
         if s.starts_with("+") {
             // Typing the string
-            let type_str: &str = &s[2..];
+            let type_str: &str = s.get(2..).unwrap_or("");
             result.push(format!("[STR]+ {}[STR]", type_str.trim()));
         } else {
             // Split the input by spaces
@@ -234,9 +292,9 @@ mod tests {
         let result = convert_shortcut_to_keycode(shortcut, &key_event_codes);
         assert_eq!(Some(result), expected);
 
-        // Test 4: Test with unrecognized keys (e.g., no mapping for 'enter')
+        // Test 4: Test with keys without a keycode (e.g., no mapping for 'enter'), pressed by name
         let shortcut = "enter tab";
-        let expected = Some("[STR]+ enter[STR] 15.1 15.0".to_string());
+        let expected = Some("enter.1 enter.0 15.1 15.0".to_string());
         let result = convert_shortcut_to_keycode(shortcut, &key_event_codes);
         assert_eq!(Some(result), expected);
 
@@ -267,4 +325,36 @@ mod tests {
         let result = convert_shortcut_to_keycode(shortcut, &key_event_codes);
         assert_eq!(Some(result), expected);
     }
-}
\ No newline at end of file
+
+    #[test]
+    fn test_compile_resolves_every_key() {
+        let keymap = HashMap::new();
+        let program = KeyProgram::compile("ctrl+c [STR]+ hello world[STR] tab", &keymap).unwrap();
+        assert_eq!(
+            program.ops().cloned().collect::<Vec<_>>(),
+            vec![
+                KeyOp::Press(Key::Control),
+                KeyOp::Press(Key::Unicode('c')),
+                KeyOp::Release(Key::Unicode('c')),
+                KeyOp::Release(Key::Control),
+                KeyOp::Type("hello world".to_string()),
+                KeyOp::Press(Key::Tab),
+                KeyOp::Release(Key::Tab),
+            ]
+        );
+        assert_eq!(program.describe()[0], "press Control");
+
+        assert_eq!(KeyProgram::compile("ctrl+foo", &keymap).unwrap_err(), "Unknown key: 'foo'");
+        assert!(KeyProgram::compile("ctrl+", &keymap).is_err());
+        assert!(KeyProgram::compile("[STR]+[STR]", &keymap).unwrap().describe() == vec!["type "]);
+    }
+
+    #[test]
+    fn test_keymap_names_keys() {
+        let mut keymap = HashMap::new();
+        assert_eq!(KeyProgram::compile("shift+pgup", &keymap).unwrap_err(), "Unknown key: 'pgup'");
+        keymap.insert("pgup".to_string(), "pageup".to_string());
+        let program = KeyProgram::compile("shift+pgup", &keymap).unwrap();
+        assert_eq!(program.describe()[1], "press PageUp");
+    }
+}
@@ -0,0 +1,249 @@
+use serde::{Deserialize, Serialize};
+use std::collections::HashMap;
+use std::fs;
+use std::path::{Path, PathBuf};
+use std::time::{SystemTime, UNIX_EPOCH};
+
+use super::db::{MusicSheetDB, Shortcut};
+use super::utils::{id_to_string, string_to_id};
+
+/// Latest hits remembered per shortcut, older ones only count through hit_number
+const RING_SIZE: usize = 10;
+
+/// Now in unix seconds, the time hits are recorded in
+pub fn now_secs() -> u32 {
+    SystemTime::now()
+        .duration_since(UNIX_EPOCH)
+        .map(|d| d.as_secs() as u32)
+        .unwrap_or(0)
+}
+
+/// Timestamps (unix seconds) of the latest hits of one shortcut, the oldest is overwritten first
+#[derive(Debug, Clone, Default)]
+struct UsageRing {
+    stamps: [u32; RING_SIZE],
+    len: u8,
+    next: u8, // Slot of the next stamp
+}
+
+impl UsageRing {
+    fn push(&mut self, stamp: u32) {
+        self.stamps[self.next as usize] = stamp;
+        self.next = ((self.next as usize + 1) % RING_SIZE) as u8;
+        self.len = (self.len as usize + 1).min(RING_SIZE) as u8;
+    }
+
+    /// Oldest first
+    fn iter(&self) -> impl Iterator<Item = u32> + '_ {
+        let start = (self.next as usize + RING_SIZE - self.len as usize) % RING_SIZE;
+        (0..self.len as usize).map(move |i| self.stamps[(start + i) % RING_SIZE])
+    }
+}
+
+#[derive(Debug, Serialize, Deserialize, Default)]
+struct UsageFile {
+    started_at: u32,
+    hits: HashMap<String, Vec<u32>>, // id -> latest hit timestamps, oldest first
+    #[serde(default)]
+    journal_seq: u64, // Last journal entry whose hit is in hits, 0 without a journal
+}
+
+/// Frecency of the shortcuts: hit_number weighted by how recent the hits are.
+///
+/// Every hit weighs 2^-(age / half_life). As only the latest RING_SIZE hits of a shortcut
+/// are kept, its score is hit_number times the mean weight of those, hits without any
+/// timestamp (made before usage was recorded, or imported) count as made at started_at.
+///
+/// Weights are taken as of the start of the session instead of "now": all scores decay
+/// by the same factor as time goes by, so their order doesn't change and scores handed
+/// out at different moments of a session stay comparable.
+///
+/// The usage file has to agree with the hit_number stored, even after a crash: it is
+/// written along with every snapshot of the journal, which keeps the time of the hits
+/// made since in their entries. It records the last journal entry it counts, as the
+/// snapshot is written in the background and may not have made it when the usage did:
+/// the hits replayed then are only recorded when newer. SQLite keeps no such time,
+/// the file follows every hit.
+#[derive(Debug)]
+pub struct Frecency {
+    path: PathBuf,
+    half_life_secs: f64, // 0 (or less) disables the decay
+    started_at: u32,     // When usage was first recorded
+    reference: u32,      // Session start, the time weights are taken at
+    rings: HashMap<u128, UsageRing>,
+    mean_weights: HashMap<u128, f64>, // id -> mean weight of its ring, updated with it
+    journal_seq: u64,                 // Last journal entry counted, see UsageFile
+}
+
+impl Frecency {
+    /// The usage file next to the music sheet
+    pub fn usage_path(music_sheet_path: &str) -> PathBuf {
+        Path::new(music_sheet_path).with_extension("usage")
+    }
+
+    /// Load the recorded usage from path, starting empty if there is none
+    pub fn open(path: PathBuf, half_life_days: f64) -> Self {
+        let now = now_secs();
+        let file: UsageFile = match fs::read(&path) {
+            Ok(bytes) => serde_json::from_slice(&bytes).unwrap_or_else(|e| {
+                eprintln!("Failed to parse {}, usage is recorded anew: {}", path.display(), e);
+                UsageFile::default()
+            }),
+            Err(_) => UsageFile::default(),
+        };
+
+        let mut rings = HashMap::with_capacity(file.hits.len());
+        for (id, stamps) in file.hits {
+            if let Ok(id) = string_to_id(&id) {
+                let mut ring = UsageRing::default();
+                stamps.into_iter().for_each(|stamp| ring.push(stamp));
+                rings.insert(id, ring);
+            }
+        }
+        let mut frecency = Frecency {
+            path,
+            half_life_secs: half_life_days * 86400.0,
+            started_at: if file.started_at == 0 { now } else { file.started_at },
+            reference: now,
+            rings,
+            mean_weights: HashMap::new(),
+            journal_seq: file.journal_seq,
+        };
+        frecency.recompute();
+        frecency
+    }
+
+    fn weight(&self, stamp: u32) -> f64 {
+        if self.half_life_secs <= 0.0 {
+            return 1.0;
+        }
+        ((stamp as f64 - self.reference as f64) / self.half_life_secs).exp2()
+    }
+
+    fn mean_weight(&self, ring: &UsageRing) -> f64 {
+        ring.iter().map(|stamp| self.weight(stamp)).sum::<f64>() / ring.len.max(1) as f64
+    }
+
+    /// Batch compute the weights of all recorded shortcuts, O(hits recorded)
+    fn recompute(&mut self) {
+        let mean_weights = self
+            .rings
+            .iter()
+            .map(|(&id, ring)| (id, self.mean_weight(ring)))
+            .collect();
+        self.mean_weights = mean_weights;
+    }
+
+    pub fn score(&self, sc: &Shortcut) -> f64 {
+        let weight = match self.mean_weights.get(&sc.id) {
+            Some(&weight) => weight,
+            None => self.weight(self.started_at),
+        };
+        sc.hit_number.max(0) as f64 * weight
+    }
+
+    /// Record a hit of the shortcut of given id, made at stamp (see now_secs)
+    pub fn record_hit(&mut self, id: u128, stamp: u32) {
+        self.rings.entry(id).or_default().push(stamp);
+        let weight = self.mean_weight(&self.rings[&id]);
+        self.mean_weights.insert(id, weight);
+    }
+
+    /// Record a hit replayed from journal entry seq, unless the usage file counts it already
+    pub fn replay_hit(&mut self, seq: u64, id: u128, stamp: u32) {
+        if seq > self.journal_seq {
+            self.record_hit(id, stamp);
+        }
+    }
+
+    pub fn path(&self) -> &Path {
+        &self.path
+    }
+
+    /// The usage file of the shortcuts still in db, to be written to path(). It counts
+    /// the hits of the journal entries up to journal_seq, 0 if there is no journal.
+    pub fn to_json_bytes(&mut self, db: &MusicSheetDB, journal_seq: u64) -> serde_json::Result<Vec<u8>> {
+        self.rings.retain(|&id, _| db.retrieve(id, None).is_some());
+        self.mean_weights.retain(|&id, _| db.retrieve(id, None).is_some());
+        self.journal_seq = journal_seq;
+        let file = UsageFile {
+            started_at: self.started_at,
+            journal_seq,
+            hits: self
+                .rings
+                .iter()
+                .map(|(&id, ring)| (id_to_string(id), ring.iter().collect()))
+                .collect(),
+        };
+        serde_json::to_vec(&file)
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    fn frecency(half_life_days: f64) -> Frecency {
+        let path = std::env::temp_dir().join("liz-frecency-test.usage");
+        Frecency {
+            path,
+            half_life_secs: half_life_days * 86400.0,
+            started_at: 0,
+            reference: 1_000_000_000,
+            rings: HashMap::new(),
+            mean_weights: HashMap::new(),
+            journal_seq: 0,
+        }
+    }
+
+    #[test]
+    fn test_ring_keeps_latest_hits() {
+        let mut ring = UsageRing::default();
+        (0..25).for_each(|stamp| ring.push(stamp));
+        assert_eq!(ring.iter().collect::<Vec<_>>(), (15..25).collect::<Vec<_>>());
+    }
+
+    #[test]
+    fn test_recent_hits_outrank_old_ones() {
+        let mut f = frecency(7.0);
+        let week = 7 * 86400;
+        let old = Shortcut { hit_number: 100, ..Default::default() };
+        let recent = Shortcut { hit_number: 10, ..Default::default() };
+        let mut old_ring = UsageRing::default();
+        old_ring.push(f.reference - 10 * week);
+        let mut recent_ring = UsageRing::default();
+        recent_ring.push(f.reference - week);
+        f.rings.insert(old.id, old_ring);
+        f.rings.insert(recent.id, recent_ring);
+        f.recompute();
+
+        assert!((f.score(&recent) - 5.0).abs() < 1e-9);
+        assert!(f.score(&recent) > f.score(&old));
+
+        // Without decay the plain hit_number order is kept
+        f.half_life_secs = 0.0;
+        f.recompute();
+        assert!(f.score(&old) > f.score(&recent));
+    }
+
+    #[test]
+    fn test_replayed_hits_already_in_the_usage_are_skipped() {
+        let path = std::env::temp_dir().join(format!("liz-frecency-{}.usage", id_to_string(crate::tools::utils::generate_id())));
+        let sc = Shortcut { hit_number: 3, ..Default::default() };
+        let mut db = MusicSheetDB::new();
+        db.add_shortcuts(vec![sc.clone()], None);
+
+        let mut f = Frecency::open(path.clone(), 7.0);
+        f.record_hit(sc.id, 10);
+        f.record_hit(sc.id, 20);
+        fs::write(&path, f.to_json_bytes(&db, 2).unwrap()).unwrap();
+
+        // The snapshot of entry 2 was lost, the journal replays its hits and a newer one
+        let mut f = Frecency::open(path.clone(), 7.0);
+        for (seq, at) in [(1, 10), (2, 20), (3, 30)] {
+            f.replay_hit(seq, sc.id, at);
+        }
+        assert_eq!(f.rings[&sc.id].iter().collect::<Vec<_>>(), vec![10, 20, 30]);
+        let _ = fs::remove_file(path);
+    }
+}
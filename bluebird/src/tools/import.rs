@@ -0,0 +1,211 @@
+use serde::de::{self, Deserializer, SeqAccess, Visitor};
+use std::error::Error;
+use std::fmt;
+use std::fs::{self, File};
+use std::io::BufReader;
+use std::path::{Path, PathBuf};
+use std::sync::atomic::{AtomicBool, AtomicUsize, Ordering};
+use std::sync::mpsc::{sync_channel, Receiver, SyncSender};
+use std::sync::Arc;
+use std::thread;
+
+use super::db::Shortcut;
+
+/// Shortcuts sent to the music sheet at once
+pub const BATCH_SIZE: usize = 1000;
+
+/// How far an import got, shared between the import, its parser threads and the UI polling it
+#[derive(Debug, Default)]
+pub struct ImportProgress {
+    files_total: AtomicUsize,
+    files_done: AtomicUsize,
+    read: AtomicUsize,  // Shortcuts parsed
+    added: AtomicUsize, // Of those, the ones that were not duplicates
+    cancel: AtomicBool,
+}
+
+impl ImportProgress {
+    fn start(&self, files_total: usize) {
+        self.files_total.store(files_total, Ordering::SeqCst);
+        self.files_done.store(0, Ordering::SeqCst);
+        self.read.store(0, Ordering::SeqCst);
+        self.added.store(0, Ordering::SeqCst);
+        self.cancel.store(false, Ordering::SeqCst);
+    }
+
+    /// Stop parsing, the shortcuts already added are kept
+    pub fn cancel(&self) {
+        self.cancel.store(true, Ordering::SeqCst);
+    }
+
+    pub fn cancelled(&self) -> bool {
+        self.cancel.load(Ordering::SeqCst)
+    }
+
+    pub fn add(&self, added: usize) {
+        self.added.fetch_add(added, Ordering::SeqCst);
+    }
+
+    /// (files done, files total, shortcuts read, shortcuts added)
+    pub fn snapshot(&self) -> (usize, usize, usize, usize) {
+        (
+            self.files_done.load(Ordering::SeqCst),
+            self.files_total.load(Ordering::SeqCst),
+            self.read.load(Ordering::SeqCst),
+            self.added.load(Ordering::SeqCst),
+        )
+    }
+}
+
+pub enum ImportMsg {
+    Batch(Vec<Shortcut>),
+    Failed { path: String, error: String },
+}
+
+/// The files to import from the chosen paths: a file as is, the .json files of a directory
+fn expand_paths(paths: &[String]) -> (Vec<PathBuf>, Vec<ImportMsg>) {
+    let mut files = Vec::new();
+    let mut failed = Vec::new();
+    for path in paths {
+        let listed = fs::metadata(path).and_then(|metadata| {
+            if metadata.is_dir() {
+                let mut json_files: Vec<PathBuf> = fs::read_dir(path)?
+                    .filter_map(|entry| entry.ok().map(|entry| entry.path()))
+                    .filter(|p| p.is_file() && p.extension().and_then(|s| s.to_str()) == Some("json"))
+                    .collect();
+                json_files.sort();
+                Ok(json_files)
+            } else {
+                Ok(vec![PathBuf::from(path)])
+            }
+        });
+        match listed {
+            Ok(listed) => files.extend(listed),
+            Err(e) => failed.push(ImportMsg::Failed { path: path.clone(), error: e.to_string() }),
+        }
+    }
+    (files, failed)
+}
+
+/// Sends the elements of a JSON array in batches as they are parsed, so a file is
+/// never held in memory as a whole
+struct BatchSender<'a> {
+    tx: &'a SyncSender<ImportMsg>,
+    progress: &'a ImportProgress,
+}
+
+impl<'de, 'a> Visitor<'de> for BatchSender<'a> {
+    type Value = ();
+
+    fn expecting(&self, f: &mut fmt::Formatter) -> fmt::Result {
+        f.write_str("an array of shortcuts")
+    }
+
+    fn visit_seq<A: SeqAccess<'de>>(self, mut seq: A) -> Result<(), A::Error> {
+        let mut batch = Vec::with_capacity(BATCH_SIZE);
+        while let Some(sc) = seq.next_element::<Shortcut>()? {
+            batch.push(sc);
+            if batch.len() == BATCH_SIZE {
+                self.send(std::mem::replace(&mut batch, Vec::with_capacity(BATCH_SIZE)))?;
+            }
+        }
+        self.send(batch)
+    }
+}
+
+impl<'a> BatchSender<'a> {
+    fn send<E: de::Error>(&self, batch: Vec<Shortcut>) -> Result<(), E> {
+        if self.progress.cancelled() {
+            return Err(E::custom("import cancelled"));
+        }
+        self.progress.read.fetch_add(batch.len(), Ordering::SeqCst);
+        if !batch.is_empty() && self.tx.send(ImportMsg::Batch(batch)).is_err() {
+            return Err(E::custom("import stopped")); // The receiving end is gone
+        }
+        Ok(())
+    }
+}
+
+fn parse_file(path: &Path, tx: &SyncSender<ImportMsg>, progress: &ImportProgress) -> Result<(), Box<dyn Error>> {
+    let mut deserializer = serde_json::Deserializer::from_reader(BufReader::new(File::open(path)?));
+    deserializer.deserialize_seq(BatchSender { tx, progress })?;
+    deserializer.end()?;
+    Ok(())
+}
+
+/// Parse the files of paths on a few threads, streaming their shortcuts back in batches.
+///
+/// The channel is bounded, so parsers wait for the batches to be taken instead of
+/// reading ahead. The receiver is closed once every file is done, or cancelled.
+/// Batches of a file that fails midway are kept, the file is reported as Failed.
+pub fn parse_in_parallel(paths: &[String], progress: Arc<ImportProgress>) -> Receiver<ImportMsg> {
+    let (files, failed) = expand_paths(paths);
+    progress.start(files.len());
+    let workers = thread::available_parallelism().map_or(2, |n| n.get()).min(files.len()).max(1);
+    let (tx, rx) = sync_channel(workers * 2 + failed.len());
+    for msg in failed {
+        let _ = tx.send(msg);
+    }
+
+    let files = Arc::new(files);
+    let next = Arc::new(AtomicUsize::new(0)); // Next file to parse
+    for _ in 0..workers {
+        let (files, next, tx, progress) = (files.clone(), next.clone(), tx.clone(), progress.clone());
+        thread::spawn(move || loop {
+            let i = next.fetch_add(1, Ordering::SeqCst);
+            if i >= files.len() || progress.cancelled() {
+                return;
+            }
+            if let Err(e) = parse_file(&files[i], &tx, &progress) {
+                if progress.cancelled() {
+                    return;
+                }
+                let path = files[i].to_string_lossy().to_string();
+                if tx.send(ImportMsg::Failed { path, error: e.to_string() }).is_err() {
+                    return;
+                }
+            }
+            progress.files_done.fetch_add(1, Ordering::SeqCst);
+        });
+    }
+    rx
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    #[test]
+    fn test_parse_streams_every_file_in_batches() {
+        let dir = std::env::temp_dir().join(format!("liz-import-test-{}", std::process::id()));
+        fs::create_dir_all(&dir).unwrap();
+        for f in 0..3 {
+            let shortcuts: Vec<Shortcut> = (0..BATCH_SIZE + 10)
+                .map(|i| Shortcut { description: format!("{} {}", f, i), ..Default::default() })
+                .collect();
+            fs::write(dir.join(format!("{}.json", f)), serde_json::to_vec(&shortcuts).unwrap()).unwrap();
+        }
+        fs::write(dir.join("broken.json"), b"[{\"description\": ").unwrap();
+        fs::write(dir.join("ignored.txt"), b"not json").unwrap();
+
+        let progress = Arc::new(ImportProgress::default());
+        let rx = parse_in_parallel(&[dir.to_string_lossy().to_string(), "/no/such/file".to_string()], progress.clone());
+        let (mut read, mut failed) = (0, Vec::new());
+        for msg in rx {
+            match msg {
+                ImportMsg::Batch(batch) => {
+                    assert!(batch.len() <= BATCH_SIZE);
+                    read += batch.len();
+                }
+                ImportMsg::Failed { path, .. } => failed.push(path),
+            }
+        }
+        fs::remove_dir_all(&dir).unwrap();
+
+        assert_eq!(read, 3 * (BATCH_SIZE + 10));
+        failed.sort();
+        assert_eq!(failed.len(), 2);
+        assert!(failed[0] == "/no/such/file" && failed[1].ends_with("broken.json"));
+        assert_eq!(progress.snapshot(), (4, 4, read, 0));
+    }
+}
@@ -0,0 +1,397 @@
+use serde::{Deserialize, Serialize};
+use std::error::Error;
+use std::fs::{self, File, OpenOptions};
+use std::io::{self, BufRead, BufReader, Write};
+use std::path::{Path, PathBuf};
+use std::sync::{Arc, Mutex, MutexGuard};
+use std::thread::{self, JoinHandle};
+
+use super::db::{MusicSheetDB, Shortcut};
+use super::utils::string_to_id;
+
+/// Number of journal entries after which the snapshot is rewritten in the background
+const COMPACT_EVERY: usize = 1000;
+
+/// One mutation of the music sheet, replayed in order at startup
+#[derive(Debug, Serialize, Deserialize)]
+#[serde(tag = "op", rename_all = "snake_case")]
+pub enum JournalOp {
+    HitUp {
+        id: String,
+        #[serde(default)]
+        at: u32, // When, in unix seconds, 0 in entries written before it was recorded
+    },
+    Create { shortcuts: Vec<Shortcut> },
+    Update { shortcuts: Vec<Shortcut> },
+    Delete { ids: Vec<String> },
+}
+
+#[derive(Debug, Deserialize)]
+struct JournalEntry {
+    seq: u64,
+    #[serde(flatten)]
+    op: JournalOp,
+}
+
+#[derive(Debug, Serialize)]
+struct JournalEntryRef<'a> {
+    seq: u64,
+    #[serde(flatten)]
+    op: &'a JournalOp,
+}
+
+impl JournalOp {
+    /// Ids of the shortcuts this op touches
+    pub fn ids(&self) -> Vec<u128> {
+        match self {
+            JournalOp::HitUp { id, .. } => string_to_id(id).ok().into_iter().collect(),
+            JournalOp::Create { shortcuts } | JournalOp::Update { shortcuts } => {
+                shortcuts.iter().map(|sc| sc.id).collect()
+            }
+            JournalOp::Delete { ids } => ids.iter().filter_map(|id| string_to_id(id).ok()).collect(),
+        }
+    }
+
+    fn apply(self, db: &mut MusicSheetDB) {
+        match self {
+            JournalOp::HitUp { id, .. } => {
+                if let Ok(id) = string_to_id(&id) {
+                    let _ = db.hit_num_up(id);
+                }
+            }
+            JournalOp::Create { shortcuts } => db.add_shortcuts(shortcuts, None),
+            JournalOp::Update { shortcuts } => {
+                db.update_shortcuts(shortcuts);
+            }
+            JournalOp::Delete { ids } => {
+                db.delete_shortcuts(ids.iter().filter_map(|id| string_to_id(id).ok()).collect())
+            }
+        }
+    }
+}
+
+/// Append-only log of the mutations made since the music sheet snapshot was written.
+///
+/// Every entry is one JSON line with a sequence number. The snapshot remembers the
+/// last sequence number it contains, so replaying skips whatever was already
+/// compacted into it, even after a crash halfway a compaction.
+///
+/// Appending only queues the entry, JournalWriter::flush writes and fdatasyncs it
+/// later, with the GIL released. Compaction moves the journal aside to
+/// `<journal>.old`, starts a fresh one and writes the snapshot on a background
+/// thread, the old journal is removed once the new snapshot is safely renamed in place.
+#[derive(Debug)]
+pub struct Journal {
+    writer: Arc<JournalWriter>,
+    seq: u64,       // Sequence number of the last entry queued or replayed
+    pending: usize, // Entries not compacted into the snapshot yet
+    replayed_hits: Vec<(u64, u128, u32)>, // (seq, id, at) of the hits replayed, for the frecency
+}
+
+impl Journal {
+    pub fn journal_path(snapshot_path: &str) -> PathBuf {
+        PathBuf::from(format!("{}.journal", snapshot_path))
+    }
+
+    /// Replay the journal of the snapshot at snapshot_path into db, then open it for appending
+    pub fn open(snapshot_path: &str, db: &mut MusicSheetDB) -> io::Result<Self> {
+        let path = Journal::journal_path(snapshot_path);
+        let files = JournalFiles {
+            file: OpenOptions::new().append(true).create(true).open(&path)?,
+            compaction: None,
+        };
+        let mut journal = Journal {
+            writer: Arc::new(JournalWriter {
+                path,
+                snapshot_path: PathBuf::from(snapshot_path),
+                queue: Mutex::new(Vec::new()),
+                files: Mutex::new(files),
+            }),
+            seq: db.journal_seq(),
+            pending: 0,
+            replayed_hits: Vec::new(),
+        };
+        for path in [journal.writer.old_path(), journal.writer.path.clone()] {
+            journal.replay_file(&path, db)?;
+        }
+        if journal.pending > 0 {
+            println!("Replayed {} journal entries", journal.pending);
+        }
+        Ok(journal)
+    }
+
+    fn replay_file(&mut self, path: &Path, db: &mut MusicSheetDB) -> io::Result<()> {
+        let file = match File::open(path) {
+            Ok(f) => f,
+            Err(e) if e.kind() == io::ErrorKind::NotFound => return Ok(()),
+            Err(e) => return Err(e),
+        };
+        for line in BufReader::new(file).lines() {
+            let line = line?;
+            if line.trim().is_empty() {
+                continue;
+            }
+            match serde_json::from_str::<JournalEntry>(&line) {
+                Ok(entry) if entry.seq > self.seq => {
+                    self.seq = entry.seq;
+                    self.pending += 1;
+                    if let JournalOp::HitUp { id, at } = &entry.op {
+                        match string_to_id(id) {
+                            Ok(id) if *at > 0 => self.replayed_hits.push((entry.seq, id, *at)),
+                            _ => {}
+                        }
+                    }
+                    entry.op.apply(db);
+                }
+                Ok(_) => {} // Already in the snapshot
+                Err(e) => {
+                    // Only the last line can be torn by a crash, nothing valid follows it
+                    eprintln!("Stop replaying {:?} at a broken entry: {}", path, e);
+                    break;
+                }
+            }
+        }
+        Ok(())
+    }
+
+    /// The hits replayed by open(), with their entry and time: the usage file, written
+    /// along with the snapshot, doesn't have them unless the snapshot was lost
+    pub fn take_replayed_hits(&mut self) -> Vec<(u64, u128, u32)> {
+        std::mem::take(&mut self.replayed_hits)
+    }
+
+    /// Sequence number of the last entry queued or replayed
+    pub fn seq(&self) -> u64 {
+        self.seq
+    }
+
+    /// The IO side of the journal, to flush what was queued
+    pub fn writer(&self) -> Arc<JournalWriter> {
+        self.writer.clone()
+    }
+
+    /// Queue op, to be called before (or right after) applying it to the db.
+    /// It is durable once the writer is flushed.
+    pub fn append(&mut self, op: &JournalOp) -> io::Result<()> {
+        let entry = JournalEntryRef { seq: self.seq + 1, op };
+        let mut line = serde_json::to_vec(&entry)?;
+        line.push(b'\n');
+        self.writer.queue(JournalWrite::Entry(line));
+        self.seq = entry.seq;
+        self.pending += 1;
+        Ok(())
+    }
+
+    pub fn should_compact(&self) -> bool {
+        self.pending >= COMPACT_EVERY
+    }
+
+    /// Queue a new journal and the snapshot of db, written in the background
+    pub fn compact(&mut self, db: &mut MusicSheetDB) -> Result<(), Box<dyn Error>> {
+        db.set_journal_seq(self.seq);
+        self.writer.queue(JournalWrite::Compact(db.to_json_bytes()?));
+        self.pending = 0;
+        Ok(())
+    }
+
+    /// Queue the snapshot of db and emptying the journal, e.g. on quit.
+    /// Done once the writer is flushed, which reports whether it succeeded.
+    pub fn checkpoint(&mut self, db: &mut MusicSheetDB) -> Result<(), Box<dyn Error>> {
+        db.set_journal_seq(self.seq);
+        self.writer.queue(JournalWrite::Checkpoint(db.to_json_bytes()?));
+        self.pending = 0;
+        Ok(())
+    }
+}
+
+/// A write to the journal files, done by JournalWriter::flush in the order queued
+#[derive(Debug)]
+enum JournalWrite {
+    Entry(Vec<u8>),      // One line of the journal
+    Compact(Vec<u8>),    // A snapshot, to start a new journal for
+    Checkpoint(Vec<u8>), // A snapshot, to write now and empty the journal
+}
+
+#[derive(Debug)]
+struct JournalFiles {
+    file: File,
+    compaction: Option<JoinHandle<io::Result<()>>>,
+}
+
+/// The writes queued by a Journal and the files they go to, shared with the threads
+/// flushing them. Queuing only takes the queue lock, so the thread holding the GIL
+/// never waits for a sync in progress.
+#[derive(Debug)]
+pub struct JournalWriter {
+    path: PathBuf,
+    snapshot_path: PathBuf,
+    queue: Mutex<Vec<JournalWrite>>,
+    files: Mutex<JournalFiles>, // Also held while flushing, so the writes keep their order
+}
+
+fn lock<T>(mutex: &Mutex<T>) -> MutexGuard<'_, T> {
+    mutex.lock().unwrap_or_else(|e| e.into_inner())
+}
+
+impl JournalWriter {
+    fn old_path(&self) -> PathBuf {
+        self.path.with_extension("journal.old")
+    }
+
+    fn queue(&self, write: JournalWrite) {
+        lock(&self.queue).push(write);
+    }
+
+    /// Do the writes queued so far and fdatasync the journal once for all of their
+    /// entries. Blocks on the disk, so it is called with the GIL released.
+    /// Returns the first error, the writes after it are still tried.
+    pub fn flush(&self) -> io::Result<()> {
+        let mut files = lock(&self.files);
+        let writes = std::mem::take(&mut *lock(&self.queue));
+        let mut result = Ok(());
+        let mut unsynced = false;
+        for write in writes {
+            let done = match write {
+                JournalWrite::Entry(line) => {
+                    unsynced = true;
+                    files.file.write_all(&line)
+                }
+                JournalWrite::Compact(snapshot) => {
+                    unsynced = false;
+                    self.start_compaction(&mut files, snapshot)
+                }
+                JournalWrite::Checkpoint(snapshot) => {
+                    unsynced = false;
+                    self.write_checkpoint(&mut files, &snapshot)
+                }
+            };
+            if result.is_ok() {
+                result = done;
+            }
+        }
+        if unsynced {
+            let synced = files.file.sync_data();
+            if result.is_ok() {
+                result = synced;
+            }
+        }
+        result
+    }
+
+    fn join_compaction(files: &mut JournalFiles) {
+        if let Some(handle) = files.compaction.take() {
+            match handle.join() {
+                Ok(Ok(())) => {}
+                Ok(Err(e)) => eprintln!("Failed to compact the journal: {}", e),
+                Err(_) => eprintln!("BUG: The journal compaction thread panicked"),
+            }
+        }
+    }
+
+    fn start_compaction(&self, files: &mut JournalFiles, snapshot: Vec<u8>) -> io::Result<()> {
+        JournalWriter::join_compaction(files);
+        let old_path = self.old_path();
+        if old_path.exists() {
+            // The last background snapshot failed, its entries only survive in the old
+            // journal. Keep appending here until a checkpoint writes them synchronously.
+            return Ok(());
+        }
+        // The entries in the snapshot are only in the old journal until it is written
+        files.file.sync_data()?;
+        fs::rename(&self.path, &old_path)?;
+        files.file = OpenOptions::new().append(true).create(true).open(&self.path)?;
+
+        let snapshot_path = self.snapshot_path.clone();
+        files.compaction = Some(thread::spawn(move || {
+            write_atomic(&snapshot_path, &snapshot)?;
+            fs::remove_file(&old_path)
+        }));
+        Ok(())
+    }
+
+    fn write_checkpoint(&self, files: &mut JournalFiles, snapshot: &[u8]) -> io::Result<()> {
+        JournalWriter::join_compaction(files);
+        write_atomic(&self.snapshot_path, snapshot)?;
+        let old_path = self.old_path();
+        if old_path.exists() {
+            fs::remove_file(&old_path)?;
+        }
+        files.file.set_len(0)?;
+        files.file.sync_all()
+    }
+}
+
+/// Replace the file at path with contents, never leaving a half written file behind
+pub fn write_atomic(path: &Path, contents: &[u8]) -> io::Result<()> {
+    let tmp_path = path.with_extension("tmp");
+    let mut file = File::create(&tmp_path)?;
+    file.write_all(contents)?;
+    file.sync_all()?;
+    fs::rename(&tmp_path, path)
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use crate::tools::utils::{generate_id, id_to_string};
+
+    fn temp_snapshot_path() -> String {
+        let dir = std::env::temp_dir().join(format!("liz-journal-{}", id_to_string(generate_id())));
+        fs::create_dir_all(&dir).unwrap();
+        dir.join("music_sheet.lock").to_str().unwrap().to_string()
+    }
+
+    fn load(path: &str) -> (MusicSheetDB, Journal) {
+        let mut db = MusicSheetDB::import_from_json(path).unwrap_or_else(|_| MusicSheetDB::new());
+        let journal = Journal::open(path, &mut db).unwrap();
+        (db, journal)
+    }
+
+    #[test]
+    fn test_replay_after_crash() {
+        let path = temp_snapshot_path();
+        let sc = Shortcut::default();
+        let id = id_to_string(sc.id);
+        {
+            let (mut db, mut journal) = load(&path);
+            journal.append(&JournalOp::Create { shortcuts: vec![sc.clone()] }).unwrap();
+            db.add_shortcuts(vec![sc.clone()], None);
+            for at in 1..=3 {
+                journal.append(&JournalOp::HitUp { id: id.clone(), at }).unwrap();
+            }
+            journal.writer().flush().unwrap();
+            // Queued after the last flush, lost like the command being played when killed
+            journal.append(&JournalOp::HitUp { id: id.clone(), at: 4 }).unwrap();
+            // Dropped without a checkpoint, like a killed process
+        }
+        let (db, mut journal) = load(&path);
+        assert_eq!(db.retrieve(sc.id, None).unwrap().hit_number, 3);
+        assert_eq!(journal.take_replayed_hits(), vec![(2, sc.id, 1), (3, sc.id, 2), (4, sc.id, 3)]);
+    }
+
+    #[test]
+    fn test_compacted_entries_are_not_replayed_twice() {
+        let path = temp_snapshot_path();
+        let sc = Shortcut::default();
+        let id = id_to_string(sc.id);
+        {
+            let (mut db, mut journal) = load(&path);
+            journal.append(&JournalOp::Create { shortcuts: vec![sc.clone()] }).unwrap();
+            db.add_shortcuts(vec![sc.clone()], None);
+            journal.append(&JournalOp::HitUp { id: id.clone(), at: 0 }).unwrap();
+            db.hit_num_up(sc.id).unwrap();
+            journal.compact(&mut db).unwrap();
+            journal.writer().flush().unwrap();
+            JournalWriter::join_compaction(&mut lock(&journal.writer.files));
+            journal.append(&JournalOp::HitUp { id: id.clone(), at: 0 }).unwrap();
+            journal.writer().flush().unwrap();
+        }
+        let (mut db, mut journal) = load(&path);
+        assert_eq!(db.retrieve(sc.id, None).unwrap().hit_number, 2);
+
+        journal.checkpoint(&mut db).unwrap();
+        journal.writer().flush().unwrap();
+        let (db, _) = load(&path);
+        assert_eq!(db.retrieve(sc.id, None).unwrap().hit_number, 2);
+    }
+}
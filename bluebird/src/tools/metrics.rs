@@ -0,0 +1,122 @@
+use std::collections::HashMap;
+use std::sync::Mutex;
+use std::time::Duration;
+
+/// Upper edge of the first bucket, in microseconds
+const MIN_US: f64 = 1.0;
+/// Every bucket is this much wider than the previous one, so a percentile is off by less than 10%
+const GROWTH: f64 = 1.1;
+/// Up to MIN_US * GROWTH^BUCKETS, a few minutes
+const BUCKETS: usize = 210;
+
+/// Latencies in log-scale buckets: constant memory and time whatever the number of samples
+#[derive(Debug, Clone)]
+pub struct Histogram {
+    counts: Vec<u64>,
+    count: u64,
+    max_us: f64,
+}
+
+impl Default for Histogram {
+    fn default() -> Self {
+        Self { counts: vec![0; BUCKETS], count: 0, max_us: 0.0 }
+    }
+}
+
+impl Histogram {
+    fn bucket(us: f64) -> usize {
+        if us < MIN_US {
+            return 0;
+        }
+        ((us / MIN_US).ln() / GROWTH.ln()) as usize + 1
+    }
+
+    pub fn record(&mut self, elapsed: Duration) {
+        let us = elapsed.as_secs_f64() * 1e6;
+        self.counts[Self::bucket(us).min(BUCKETS - 1)] += 1;
+        self.count += 1;
+        self.max_us = self.max_us.max(us);
+    }
+
+    /// The latency in ms under which a fraction p of the samples fall
+    pub fn percentile(&self, p: f64) -> f64 {
+        let rank = ((p * self.count as f64).ceil() as u64).max(1);
+        let mut seen = 0;
+        for (i, count) in self.counts.iter().enumerate() {
+            seen += count;
+            if seen >= rank {
+                // Upper edge of the bucket, but never above what was measured
+                return (MIN_US * GROWTH.powi(i as i32)).min(self.max_us) / 1000.0;
+            }
+        }
+        self.max_us / 1000.0
+    }
+
+    /// (count, p50, p95, p99, max), in ms
+    pub fn summary(&self) -> (u64, f64, f64, f64, f64) {
+        (self.count, self.percentile(0.5), self.percentile(0.95), self.percentile(0.99), self.max_us / 1000.0)
+    }
+}
+
+/// How long the commands played by the Flute took, per action
+#[derive(Debug, Default)]
+pub struct CommandTimings {
+    histograms: Mutex<HashMap<String, Histogram>>,
+}
+
+impl CommandTimings {
+    pub fn record(&self, action: &str, elapsed: Duration) {
+        let mut histograms = self.histograms.lock().unwrap();
+        match histograms.get_mut(action) {
+            Some(histogram) => histogram.record(elapsed),
+            None => histograms.entry(action.to_string()).or_default().record(elapsed),
+        }
+    }
+
+    /// (action, count, p50, p95, p99, max) sorted by action, times in ms
+    pub fn summaries(&self) -> Vec<(String, u64, f64, f64, f64, f64)> {
+        let histograms = self.histograms.lock().unwrap();
+        let mut summaries: Vec<_> = histograms
+            .iter()
+            .map(|(action, histogram)| {
+                let (count, p50, p95, p99, max) = histogram.summary();
+                (action.clone(), count, p50, p95, p99, max)
+            })
+            .collect();
+        summaries.sort_by(|a, b| a.0.cmp(&b.0));
+        summaries
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    #[test]
+    fn test_percentiles_within_a_bucket() {
+        let mut histogram = Histogram::default();
+        for ms in 1..=100 {
+            histogram.record(Duration::from_millis(ms));
+        }
+        let (count, p50, p95, p99, max) = histogram.summary();
+        assert_eq!(count, 100);
+        assert!((50.0..=55.0).contains(&p50), "p50 {}", p50);
+        assert!((95.0..=104.5).contains(&p95), "p95 {}", p95);
+        assert!((99.0..=100.0).contains(&p99), "p99 {}", p99);
+        assert_eq!(max, 100.0);
+    }
+
+    #[test]
+    fn test_timings_per_action() {
+        let timings = CommandTimings::default();
+        timings.record("persist", Duration::from_micros(500));
+        timings.record("info", Duration::from_nanos(10));
+        timings.record("info", Duration::from_secs(3600)); // Past the last bucket
+        let summaries = timings.summaries();
+        assert_eq!(summaries.len(), 2);
+        assert_eq!((summaries[0].0.as_str(), summaries[0].1), ("info", 2));
+        assert_eq!(summaries[0].5, 3_600_000.0);
+        assert_eq!((summaries[1].0.as_str(), summaries[1].1), ("persist", 1));
+        assert_eq!(summaries[1].2, 0.5);
+    }
+}
@@ -1,4 +1,10 @@
 pub mod db;
 pub mod exec;
+pub mod frecency;
+pub mod import;
+pub mod journal;
+pub mod metrics;
 pub mod rhythm;
+pub mod sqlite;
+pub mod storage;
 pub mod utils;
\ No newline at end of file
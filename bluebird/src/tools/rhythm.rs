@@ -16,6 +16,10 @@ pub struct Rhythm {
     pub interval_ms: u64,         // interval of each shortcut block. No need to set it normally.
     pub trigger_shortcut: String, // The shortcut to activate Liz
     pub theme: String, // The dark/light theme
+    pub search_debounce_ms: u64, // Idle time after typing before the launcher searches
+    pub storage: String, // Where the music sheet is stored: json (lock file) or sqlite
+    pub frecency_half_life_days: f64, // Age at which a hit counts half in the ranking, 0 to rank by hits only
+    pub log_level: String, // Lowest level written to the log: debug, info, warning or error
     // pub shortcut_print_fmt: String, // The format to show one shortcut
     // pub language: String,    // The Application Language
 }
@@ -43,6 +47,10 @@ impl Default for Rhythm {
             interval_ms: 100,
             trigger_shortcut,
             theme,
+            search_debounce_ms: 30,
+            storage: "json".to_string(),
+            frecency_half_life_days: 14.0,
+            log_level: "info".to_string(),
             // shortcut_print_fmt,
             // language: format!("en"),
         }
@@ -71,6 +79,10 @@ impl Rhythm {
             json!({"name": "interval_ms", "value": self.interval_ms, "hint": "Interval of each shortcut block. No need to set it normally."}).to_string(),
             json!({"name": "trigger_shortcut", "value": self.trigger_shortcut, "hint": "The shortcut to activate Liz"}).to_string(),
             json!({"name": "theme", "value": self.theme, "hint": "Theme (dark/light)"}).to_string(),
+            json!({"name": "search_debounce_ms", "value": self.search_debounce_ms, "hint": "Idle time (ms) after typing before searching"}).to_string(),
+            json!({"name": "storage", "value": self.storage, "hint": "Store shortcuts in json or sqlite (restart to apply)"}).to_string(),
+            json!({"name": "frecency_half_life_days", "value": self.frecency_half_life_days, "hint": "Days after which a hit counts half in the ranking, 0 to rank by hits only (restart to apply)"}).to_string(),
+            json!({"name": "log_level", "value": self.log_level, "hint": "Lowest level written to the log (debug/info/warning/error)"}).to_string(),
             // json!({"name": "shortcut_print_fmt", "value": self.shortcut_print_fmt, "hint": "The format to show one shortcut"}).to_string(),
         ]
     }
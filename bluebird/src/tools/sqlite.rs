@@ -0,0 +1,332 @@
+use rusqlite::{params, Connection, Row};
+use std::error::Error;
+use std::path::Path;
+use std::sync::{Mutex, MutexGuard};
+
+use super::db::{MusicSheetDB, Shortcut};
+use super::utils::{id_to_string, string_to_id};
+
+/// Bumped whenever SCHEMA changes
+const SCHEMA_VERSION: i64 = 1;
+
+const SCHEMA: &str = "
+CREATE TABLE IF NOT EXISTS shortcuts (
+    id          TEXT PRIMARY KEY,
+    hit_number  INTEGER NOT NULL DEFAULT 0,
+    shortcut    TEXT NOT NULL,
+    application TEXT NOT NULL,
+    description TEXT NOT NULL,
+    comment     TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS shortcuts_application ON shortcuts(application);
+CREATE INDEX IF NOT EXISTS shortcuts_hit_number ON shortcuts(hit_number DESC);
+
+-- Deleted shortcuts and the old versions of updated ones, oldest first
+CREATE TABLE IF NOT EXISTS deleted (
+    seq         INTEGER PRIMARY KEY AUTOINCREMENT,
+    id          TEXT NOT NULL,
+    hit_number  INTEGER NOT NULL,
+    shortcut    TEXT NOT NULL,
+    application TEXT NOT NULL,
+    description TEXT NOT NULL,
+    comment     TEXT NOT NULL
+);
+
+-- Same text as MusicSheetDB::fuzzy_search looks at; trigrams make MATCH a substring search
+CREATE VIRTUAL TABLE IF NOT EXISTS shortcuts_fts USING fts5(text, tokenize = 'trigram');
+CREATE TRIGGER IF NOT EXISTS shortcuts_fts_insert AFTER INSERT ON shortcuts BEGIN
+    INSERT INTO shortcuts_fts(rowid, text)
+    VALUES (new.rowid, replace(lower(new.application || new.description || new.shortcut), ' ', ''));
+END;
+CREATE TRIGGER IF NOT EXISTS shortcuts_fts_delete AFTER DELETE ON shortcuts BEGIN
+    DELETE FROM shortcuts_fts WHERE rowid = old.rowid;
+END;
+CREATE TRIGGER IF NOT EXISTS shortcuts_fts_update AFTER UPDATE OF shortcut, application, description ON shortcuts BEGIN
+    UPDATE shortcuts_fts
+    SET text = replace(lower(new.application || new.description || new.shortcut), ' ', '')
+    WHERE rowid = new.rowid;
+END;
+";
+
+const UPSERT: &str = "
+INSERT INTO shortcuts (id, hit_number, shortcut, application, description, comment)
+VALUES (?1, ?2, ?3, ?4, ?5, ?6)
+ON CONFLICT(id) DO UPDATE SET
+    hit_number = excluded.hit_number,
+    shortcut = excluded.shortcut,
+    application = excluded.application,
+    description = excluded.description,
+    comment = excluded.comment";
+
+const INSERT_DELETED: &str = "
+INSERT INTO deleted (id, hit_number, shortcut, application, description, comment)
+VALUES (?1, ?2, ?3, ?4, ?5, ?6)";
+
+fn shortcut_from_row(row: &Row) -> rusqlite::Result<Shortcut> {
+    let id: String = row.get(0)?;
+    Ok(Shortcut {
+        id: string_to_id(&id).map_err(|e| {
+            rusqlite::Error::FromSqlConversionFailure(0, rusqlite::types::Type::Text, e.to_string().into())
+        })?,
+        hit_number: row.get(1)?,
+        shortcut: row.get(2)?,
+        application: row.get(3)?,
+        description: row.get(4)?,
+        comment: row.get(5)?,
+    })
+}
+
+/// The rows a mutation changed, copied out of the music sheet to be written later
+#[derive(Debug, Default)]
+struct RowChanges {
+    upserted: Vec<Shortcut>,
+    removed: Vec<u128>,
+    deleted: Vec<Shortcut>, // The entries db.deleted gained
+}
+
+/// A write to the database, done by SqliteSheet::flush
+#[derive(Debug)]
+enum SqliteWrite {
+    Rows(RowChanges),
+    Checkpoint,
+}
+
+/// The music sheet stored in SQLite.
+///
+/// MusicSheetDB stays the working copy in memory; after every mutation only the
+/// touched rows are queued, and written by flush() with the GIL released, all the
+/// mutations queued since the last flush in one transaction.
+///
+/// The connection is not Sync (it caches statements), a pyclass has to be:
+/// every use goes through the mutex.
+#[derive(Debug)]
+pub struct SqliteSheet {
+    conn: Mutex<Connection>, // Also held while flushing, so the writes keep their order
+    queue: Mutex<Vec<SqliteWrite>>,
+}
+
+impl SqliteSheet {
+    /// Open (or create) the database at path.
+    /// A new database is filled from the JSON lock file at json_path, if there is one.
+    pub fn open(path: &str, json_path: &str) -> Result<(Self, MusicSheetDB), Box<dyn Error>> {
+        let conn = Connection::open(path)?;
+        conn.pragma_update(None, "journal_mode", "WAL")?;
+        // With WAL, NORMAL only syncs at checkpoints and still survives a crash of the app
+        conn.pragma_update(None, "synchronous", "NORMAL")?;
+
+        let version: i64 = conn.pragma_query_value(None, "user_version", |row| row.get(0))?;
+        let sheet = SqliteSheet {
+            conn: Mutex::new(conn),
+            queue: Mutex::new(Vec::new()),
+        };
+        if version < SCHEMA_VERSION {
+            sheet.conn().execute_batch(SCHEMA)?;
+            if version == 0 {
+                sheet.migrate_from_json(json_path)?;
+            }
+            // Only now, so a failed migration is tried again on the next start
+            sheet.conn().pragma_update(None, "user_version", SCHEMA_VERSION)?;
+        }
+        let db = sheet.load()?;
+        Ok((sheet, db))
+    }
+
+    /// The connection, still usable after a panic of another thread holding it:
+    /// each write is a transaction, a panic halfway only rolls it back
+    fn conn(&self) -> MutexGuard<'_, Connection> {
+        self.conn.lock().unwrap_or_else(|e| e.into_inner())
+    }
+
+    /// One-shot import of the JSON lock file (and its journal) into a new database
+    fn migrate_from_json(&self, json_path: &str) -> Result<(), Box<dyn Error>> {
+        if !Path::new(json_path).exists() {
+            return Ok(());
+        }
+        let mut db = MusicSheetDB::import_from_json(json_path)?;
+        if let Err(e) = super::journal::Journal::open(json_path, &mut db) {
+            eprintln!("Failed to replay the journal of {}: {}", json_path, e);
+        }
+
+        let conn = self.conn();
+        let tx = conn.unchecked_transaction()?;
+        {
+            let mut upsert = tx.prepare(UPSERT)?;
+            for sc in db.retrieve_all() {
+                upsert.execute(params![
+                    id_to_string(sc.id), sc.hit_number, sc.shortcut, sc.application, sc.description, sc.comment
+                ])?;
+            }
+            let mut insert_deleted = tx.prepare(INSERT_DELETED)?;
+            for sc in db.retrieve_deleted() {
+                insert_deleted.execute(params![
+                    id_to_string(sc.id), sc.hit_number, sc.shortcut, sc.application, sc.description, sc.comment
+                ])?;
+            }
+        }
+        tx.commit()?;
+        println!("Migrated {} shortcuts from {} to SQLite", db.retrieve_all().len(), json_path);
+        Ok(())
+    }
+
+    fn query_shortcuts(&self, sql: &str) -> rusqlite::Result<Vec<Shortcut>> {
+        let conn = self.conn();
+        let mut stmt = conn.prepare(sql)?;
+        let shortcuts = stmt.query_map([], shortcut_from_row)?.collect();
+        shortcuts
+    }
+
+    fn load(&self) -> rusqlite::Result<MusicSheetDB> {
+        let data = self.query_shortcuts(
+            "SELECT id, hit_number, shortcut, application, description, comment FROM shortcuts",
+        )?;
+        let deleted = self.query_shortcuts(
+            "SELECT id, hit_number, shortcut, application, description, comment FROM deleted ORDER BY seq",
+        )?;
+        Ok(MusicSheetDB::from_parts(data, deleted))
+    }
+
+    fn queue(&self, write: SqliteWrite) {
+        self.queue.lock().unwrap_or_else(|e| e.into_inner()).push(write);
+    }
+
+    /// Queue writing the current state of the given ids, and the entries db.deleted
+    /// gained since it had deleted_before of them
+    pub fn queue_rows(&self, db: &MusicSheetDB, ids: &[u128], deleted_before: usize) {
+        let mut changes = RowChanges::default();
+        for &id in ids {
+            match db.retrieve(id, None) {
+                Some(sc) => changes.upserted.push(sc.clone()),
+                None => changes.removed.push(id),
+            }
+        }
+        changes.deleted = db.retrieve_deleted().iter().skip(deleted_before).cloned().collect();
+        self.queue(SqliteWrite::Rows(changes));
+    }
+
+    /// Queue folding the WAL back into the database file
+    pub fn queue_checkpoint(&self) {
+        self.queue(SqliteWrite::Checkpoint);
+    }
+
+    /// Do the writes queued so far, the rows in one transaction, then the checkpoint
+    /// if one was queued. Blocks on the disk, so it is called with the GIL released.
+    pub fn flush(&self) -> rusqlite::Result<()> {
+        let conn = self.conn();
+        let writes = std::mem::take(&mut *self.queue.lock().unwrap_or_else(|e| e.into_inner()));
+        if writes.is_empty() {
+            return Ok(());
+        }
+        let mut checkpoint = false;
+        let tx = conn.unchecked_transaction()?;
+        {
+            let mut upsert = tx.prepare_cached(UPSERT)?;
+            let mut remove = tx.prepare_cached("DELETE FROM shortcuts WHERE id = ?1")?;
+            let mut insert_deleted = tx.prepare_cached(INSERT_DELETED)?;
+            for write in &writes {
+                let changes = match write {
+                    SqliteWrite::Rows(changes) => changes,
+                    SqliteWrite::Checkpoint => {
+                        checkpoint = true;
+                        continue;
+                    }
+                };
+                for sc in &changes.upserted {
+                    upsert.execute(params![
+                        id_to_string(sc.id), sc.hit_number, sc.shortcut, sc.application, sc.description, sc.comment
+                    ])?;
+                }
+                for &id in &changes.removed {
+                    remove.execute(params![id_to_string(id)])?;
+                }
+                for sc in &changes.deleted {
+                    insert_deleted.execute(params![
+                        id_to_string(sc.id), sc.hit_number, sc.shortcut, sc.application, sc.description, sc.comment
+                    ])?;
+                }
+            }
+        }
+        tx.commit()?;
+        if checkpoint {
+            conn.execute_batch("PRAGMA wal_checkpoint(TRUNCATE);")?;
+        }
+        Ok(())
+    }
+
+    /// Ids of the shortcuts whose indexed text contains every part of query, None if
+    /// the index can't answer it (trigrams need parts of at least 3 characters).
+    /// Only candidates: SQLite lowercases ASCII alone and trigrams fold case their own
+    /// way, pass them to MusicSheetDB::fuzzy_search_among for fuzzy_search's result.
+    pub fn search_ids(&self, query: &str) -> Option<Vec<u128>> {
+        let binding = query.to_lowercase();
+        let parts: Vec<&str> = binding.split_whitespace().collect();
+        if parts.is_empty() || parts.iter().any(|part| part.chars().count() < 3) {
+            return None;
+        }
+        let expr = parts
+            .iter()
+            .map(|part| format!("\"{}\"", part.replace('"', "\"\"")))
+            .collect::<Vec<_>>()
+            .join(" AND ");
+
+        match self.match_ids(&expr) {
+            Ok(ids) => Some(ids.iter().filter_map(|id| string_to_id(id).ok()).collect()),
+            Err(e) => {
+                eprintln!("Full text search failed for {}: {}", query, e);
+                None
+            }
+        }
+    }
+
+    fn match_ids(&self, expr: &str) -> rusqlite::Result<Vec<String>> {
+        let conn = self.conn();
+        let mut stmt = conn.prepare_cached(
+            "SELECT s.id FROM shortcuts_fts f JOIN shortcuts s ON s.rowid = f.rowid WHERE shortcuts_fts MATCH ?1",
+        )?;
+        let ids = stmt.query_map(params![expr], |row| row.get(0))?.collect();
+        ids
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use crate::tools::utils::generate_id;
+    use std::collections::HashSet;
+
+    #[test]
+    fn test_full_text_candidates_give_the_fuzzy_search_result() {
+        let dir = std::env::temp_dir().join(format!("liz-sqlite-{}", id_to_string(generate_id())));
+        std::fs::create_dir_all(&dir).unwrap();
+        let path = dir.join("sheet.db");
+        let (sheet, _) = SqliteSheet::open(path.to_str().unwrap(), dir.join("none.json").to_str().unwrap()).unwrap();
+
+        let mut db = MusicSheetDB::new();
+        db.add_shortcuts(
+            (0..40)
+                .map(|i| Shortcut {
+                    application: ["Firefox", "Blender", "VS Code"][i % 3].to_string(),
+                    description: format!("Copy Line {}", i),
+                    shortcut: format!("Ctrl+{}", i % 10),
+                    ..Default::default()
+                })
+                .collect(),
+            None,
+        );
+        let ids: Vec<u128> = db.retrieve_all().iter().map(|sc| sc.id).collect();
+        sheet.queue_rows(&db, &ids, 0);
+        sheet.flush().unwrap();
+
+        for query in ["copyline", "FIREFOX line", "codecopy", "ctrl+3", "line12", "e+1 blender", "nothing"] {
+            let candidates: HashSet<u128> = sheet.search_ids(query).unwrap().into_iter().collect();
+            let found: Vec<u128> = db.fuzzy_search_among(query, &candidates).iter().map(|sc| sc.id).collect();
+            let expected: Vec<u128> = db.fuzzy_search(query).iter().map(|sc| sc.id).collect();
+            assert_eq!(found, expected, "{}", query);
+        }
+        // Parts too short for trigrams are left to fuzzy_search
+        assert!(sheet.search_ids("vs code").is_none());
+        assert!(sheet.search_ids("").is_none());
+
+        drop(sheet);
+        let _ = std::fs::remove_dir_all(dir);
+    }
+}
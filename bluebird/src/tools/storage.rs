@@ -0,0 +1,159 @@
+use std::error::Error;
+use std::path::Path;
+use std::sync::Arc;
+
+use super::db::MusicSheetDB;
+use super::journal::{Journal, JournalOp, JournalWriter};
+use super::rhythm::Rhythm;
+use super::sqlite::SqliteSheet;
+
+/// Where the music sheet lives on disk, chosen by `storage` in rhythm.toml
+#[derive(Debug)]
+pub enum Storage {
+    /// The JSON lock file, rewritten as a whole, plus the journal of changes since
+    Json {
+        path: String,
+        journal: Option<Journal>, // None if the journal could not be opened
+    },
+    /// A SQLite database next to the lock file, updated row by row
+    Sqlite(Arc<SqliteSheet>),
+}
+
+impl Storage {
+    /// Open the configured storage and load the music sheet from it
+    pub fn open(rhythm: &Rhythm) -> (Self, MusicSheetDB) {
+        let json_path = rhythm.music_sheet_path.clone();
+        if rhythm.storage == "sqlite" {
+            let sqlite_path = Path::new(&json_path).with_extension("sqlite");
+            match SqliteSheet::open(&sqlite_path.to_string_lossy(), &json_path) {
+                Ok((sheet, db)) => return (Storage::Sqlite(Arc::new(sheet)), db),
+                Err(e) => eprintln!(
+                    "Failed to open {}, falling back to the json lock file: {}",
+                    sqlite_path.display(),
+                    e
+                ),
+            }
+        } else if rhythm.storage != "json" {
+            eprintln!("Unknown storage {}, use json instead", rhythm.storage);
+        }
+
+        let mut db = MusicSheetDB::import_from_json(&json_path).unwrap_or_else(|_| {
+            eprintln!("Failed to load music sheet from {}", json_path);
+            MusicSheetDB::new() // Return a default instance if loading fails
+        });
+        // Bring back the changes made after the last snapshot, e.g. before a crash
+        let journal = Journal::open(&json_path, &mut db)
+            .map_err(|e| eprintln!("Failed to open the journal, changes are only saved on quit: {}", e))
+            .ok();
+        (Storage::Json { path: json_path, journal }, db)
+    }
+
+    /// Apply a mutation to db and queue what makes it durable, see writer()
+    pub fn mutate<R>(&mut self, db: &mut MusicSheetDB, op: JournalOp, apply: impl FnOnce(&mut MusicSheetDB) -> R) -> R {
+        match self {
+            Storage::Json { journal: Some(journal), .. } => {
+                if let Err(e) = journal.append(&op) {
+                    eprintln!("Failed to queue the journal entry: {}", e);
+                }
+                apply(db)
+            }
+            Storage::Json { journal: None, .. } => apply(db),
+            Storage::Sqlite(sheet) => {
+                let deleted_before = db.retrieve_deleted().len();
+                let result = apply(db);
+                sheet.queue_rows(db, &op.ids(), deleted_before);
+                result
+            }
+        }
+    }
+
+    /// Queue the compaction of the journal once it has grown enough, true if it did
+    pub fn compact_if_due(&mut self, db: &mut MusicSheetDB) -> bool {
+        match self {
+            Storage::Json { journal: Some(journal), .. } if journal.should_compact() => {
+                match journal.compact(db) {
+                    Ok(()) => true,
+                    Err(e) => {
+                        eprintln!("Failed to compact the journal: {}", e);
+                        false
+                    }
+                }
+            }
+            _ => false,
+        }
+    }
+
+    /// Whether the time of a hit is stored with it. The journal keeps it in the entry
+    /// until the snapshot, the SQLite rows only keep the count.
+    pub fn keeps_hit_times(&self) -> bool {
+        match self {
+            Storage::Json { .. } => true,
+            Storage::Sqlite(_) => false,
+        }
+    }
+
+    /// (journal entry, id, time) of the hits replayed from the journal when opening
+    pub fn take_replayed_hits(&mut self) -> Vec<(u64, u128, u32)> {
+        match self {
+            Storage::Json { journal: Some(journal), .. } => journal.take_replayed_hits(),
+            _ => Vec::new(),
+        }
+    }
+
+    /// Last journal entry queued, 0 without a journal
+    pub fn journal_seq(&self) -> u64 {
+        match self {
+            Storage::Json { journal: Some(journal), .. } => journal.seq(),
+            _ => 0,
+        }
+    }
+
+    /// Candidate ids for query if the storage has an index for it, see MusicSheetDB::fuzzy_search_among
+    pub fn search_ids(&self, query: &str) -> Option<Vec<u128>> {
+        match self {
+            Storage::Sqlite(sheet) => sheet.search_ids(query),
+            Storage::Json { .. } => None,
+        }
+    }
+
+    /// The IO queued by mutate() and persist(), flushed with the GIL released
+    pub fn writer(&self) -> StorageWriter {
+        match self {
+            Storage::Json { journal: Some(journal), .. } => StorageWriter::Journal(journal.writer()),
+            Storage::Json { journal: None, .. } => StorageWriter::None,
+            Storage::Sqlite(sheet) => StorageWriter::Sqlite(sheet.clone()),
+        }
+    }
+
+    /// Write everything out, e.g. before quitting. The journal and SQLite checkpoints
+    /// are queued, flushing the writer does them.
+    pub fn persist(&mut self, db: &mut MusicSheetDB) -> Result<(), Box<dyn Error>> {
+        match self {
+            Storage::Json { journal: Some(journal), .. } => journal.checkpoint(db),
+            Storage::Json { path, journal: None } => db.export_to_json(path),
+            Storage::Sqlite(sheet) => {
+                sheet.queue_checkpoint();
+                Ok(())
+            }
+        }
+    }
+}
+
+/// What flushes the writes a Storage queued, held without borrowing the Flute
+#[derive(Debug, Clone)]
+pub enum StorageWriter {
+    Journal(Arc<JournalWriter>),
+    Sqlite(Arc<SqliteSheet>),
+    None, // Everything is written right away
+}
+
+impl StorageWriter {
+    /// Do the queued writes, blocking on the disk
+    pub fn flush(&self) -> Result<(), Box<dyn Error + Send + Sync>> {
+        match self {
+            StorageWriter::Journal(writer) => Ok(writer.flush()?),
+            StorageWriter::Sqlite(sheet) => Ok(sheet.flush()?),
+            StorageWriter::None => Ok(()),
+        }
+    }
+}
@@ -0,0 +1,169 @@
+# Headless front-end of Liz, for launchers like rofi or dmenu:
+#
+#   python liz.py search [--json] [--limit N] [query...]   Ranked shortcuts, one per line
+#   python liz.py execute <id>                              Execute a shortcut by id
+#
+# Search lines are "id<TAB>application<TAB>description<TAB>shortcut", or JSON objects with
+# --json. With rofi, for example:
+#   python liz.py execute "$(python liz.py search | rofi -dmenu -display-columns 2,3,4 | cut -f1)"
+#
+# A running Liz answers the commands, so its shortcuts aren't loaded again. Otherwise
+# (or with --standalone) the music sheet is opened here with bluebird, without Qt, and
+# ranked by the same SearchEngine as the launcher.
+
+import time
+STARTED_AT = time.perf_counter()
+
+import argparse
+import json
+import os
+import sys
+from contextlib import contextmanager
+from typing import Iterator, List, Optional
+
+from windows.remote import OK, send_request
+
+
+class Row:
+    """A search result line"""
+    __slots__ = ("id", "application", "description", "shortcut", "hit_number", "score")
+
+    def __init__(self, id: str, application: str, description: str, shortcut: str,
+                 hit_number: Optional[int] = None, score: Optional[float] = None):
+        self.id = id
+        self.application = application
+        self.description = description
+        self.shortcut = shortcut
+        self.hit_number = hit_number
+        self.score = score
+
+    @classmethod
+    def from_tsv(cls, line: str) -> "Row":
+        return cls(*line.split("\t", 3))
+
+    def to_tsv(self) -> str:
+        fields = [self.id, self.application, self.description, self.shortcut]
+        return "\t".join(field.replace("\t", " ").replace("\n", " ") for field in fields)
+
+    def to_json(self) -> str:
+        row = {name: getattr(self, name) for name in self.__slots__}
+        return json.dumps({name: value for name, value in row.items() if value is not None},
+                          ensure_ascii=False)
+
+
+@contextmanager
+def stdout_to_stderr():
+    """bluebird prints to the stdout of the process, which is the output of the CLI"""
+    sys.stdout.flush()
+    saved = os.dup(1)
+    os.dup2(2, 1)
+    try:
+        yield
+    finally:
+        os.dup2(saved, 1)
+        os.close(saved)
+
+
+def open_flute():
+    from bluebird import Flute
+    with stdout_to_stderr():
+        return Flute.create_flute(None)
+
+
+def search_standalone(query: str, limit: int) -> Iterator[Row]:
+    from windows.base import ShortcutColumns
+    from windows.search_engine import SearchEngine
+    from windows.search_index import SearchIndex
+
+    flute = open_flute()
+    items = ShortcutColumns(*flute.fetch_columns()).to_shortcuts()
+    by_id = {item.id: item for item in items}
+    result = SearchEngine(SearchIndex(items)).search(query)
+    for shortcut_id, score in zip(result.ids[:limit or None], result.scores):
+        item = by_id[shortcut_id]
+        yield Row(item.id, item.application, item.description, item.shortcut,
+                  item.hit_number, round(score, 1))
+
+
+def search_remote(query: str, limit: int) -> Optional[Iterator[Row]]:
+    """None when no Liz is running"""
+    reply = send_request("search", [query, str(limit)])
+    if reply is None:
+        return None
+    if reply["code"] != OK:
+        raise RuntimeError("; ".join(reply["results"]))
+    return map(Row.from_tsv, reply["results"])
+
+
+def execute_standalone(shortcut_id: str) -> List[str]:
+    """The errors, if any"""
+    from bluebird import LizCommand, StateCode
+    flute = open_flute()
+    with stdout_to_stderr():
+        response = flute.play(LizCommand("execute", [shortcut_id]))
+        flute.play(LizCommand("persist", []))   # Keep the hit
+    return [] if response.code == StateCode.OK else response.results
+
+
+def execute_remote(shortcut_id: str) -> Optional[List[str]]:
+    """The errors, None when no Liz is running"""
+    reply = send_request("execute", [shortcut_id])
+    if reply is None:
+        return None
+    return [] if reply["code"] == OK else reply["results"]
+
+
+def command_search(args) -> int:
+    query = " ".join(args.query)
+    rows = None if args.standalone else search_remote(query, args.limit)
+    if rows is None:
+        rows = search_standalone(query, args.limit)
+    for row in rows:
+        sys.stdout.write((row.to_json() if args.json else row.to_tsv()) + "\n")
+    return 0
+
+
+def command_execute(args) -> int:
+    errors = None if args.standalone else execute_remote(args.id)
+    if errors is None:
+        errors = execute_standalone(args.id)
+    for error in errors:
+        print(error, file=sys.stderr)
+    return 1 if errors else 0
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(prog="liz", description="Search and execute Liz shortcuts without the GUI")
+    parser.add_argument("--standalone", action="store_true",
+                        help="open the music sheet here even if Liz is running")
+    parser.add_argument("--profile", action="store_true", help="print the time taken to stderr")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    search = commands.add_parser("search", help="print the shortcuts matching a query, best first")
+    search.add_argument("query", nargs="*", help="empty lists every shortcut by frecency")
+    search.add_argument("--json", action="store_true", help="print JSON lines instead of tab separated ones")
+    search.add_argument("--limit", type=int, default=1000, help="at most this many lines, 0 for all (default: %(default)s)")
+    search.set_defaults(run=command_search)
+
+    execute = commands.add_parser("execute", help="execute a shortcut")
+    execute.add_argument("id")
+    execute.set_defaults(run=command_execute)
+
+    args = parser.parse_args(argv)
+    try:
+        code = args.run(args)
+        sys.stdout.flush()
+    except BrokenPipeError:
+        # The reader (head, rofi) stopped reading, which is fine
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        code = 0
+    except RuntimeError as e:
+        print(e, file=sys.stderr)
+        code = 1
+    if args.profile:
+        print(f"{args.command} took {(time.perf_counter() - STARTED_AT) * 1000:.1f}ms", file=sys.stderr)
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
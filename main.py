@@ -1,31 +1,33 @@
+import time
+STARTED_AT = time.perf_counter()
+
 import sys
+if __name__ == "__main__":
+    # A later launch hands its command to the running instance and exits before Qt loads
+    from windows.remote import forward_command
+    COMMAND = forward_command(sys.argv[1:])
+
 import os
 from pathlib import Path
 from PySide6.QtWidgets import QApplication, QMainWindow, QWidget, QSystemTrayIcon, QMenu, QVBoxLayout
 from PySide6.QtGui import QIcon, QKeySequence, QAction
 from PySide6.QtCore import QTimer, QMetaObject, Qt
-from windows.main_window import MainWindow
-from windows.config_window import ConfigWindow
-from windows.cmd_manager_window import ShortcutManager
+# The window modules pull numpy, rapidfuzz and notifypy in: the launcher's is imported
+# by StartupLoader in the background, the others on first use
 from windows.signals import global_signal_bus
-from bluebird import Flute, LizCommand
+from windows.executor import ShortcutExecutor
+from windows.importer import ShortcutImporter
+from windows.instance import InstanceServer, RemoteRequest
+from windows.logs import LoggedFlute, logger, set_log_level, start_logging
+from windows.metrics import dump_metrics
+from windows.remote import ERROR, OK, forward_command
+from windows.startup import StartupLoader, StartupProfiler
+from bluebird import Flute, LizCommand, StateCode
 
-from pynput import keyboard
 import threading
 
 from datetime import datetime
 
-class UnbufferedStream:
-    def __init__(self, stream):
-        self.stream = stream
-    
-    def write(self, data):
-        self.stream.write(data)
-        self.stream.flush()  # Force immediate write
-    
-    def __getattr__(self, attr):
-        return getattr(self.stream, attr)
-
 def setup_logging():
     # Get the directory where the executable is running
     if getattr(sys, 'frozen', False):
@@ -36,20 +38,12 @@ def setup_logging():
         app_dir = Path(__file__).parent
     
     log_path = app_dir / "liz_runtime.log"
-    
-    # Clear previous log file and open in write mode
-    with open(log_path, 'w') as f:
-        f.write("")  # Clear the file
-    
-    # Reopen in append mode and redirect stdout/stderr
-    log_file = open(log_path, 'a', encoding='utf-8')
-    sys.stdout = UnbufferedStream(log_file)
-    sys.stderr = UnbufferedStream(log_file)
-    
+    start_logging(log_path)
+
     # Print initial info
-    print(f"=== Application started at {datetime.now()} ===")
-    print(f"Working directory: {app_dir}")
-    print(f"Log file: {log_path}\n")
+    logger.info(f"=== Application started at {datetime.now()} ===")
+    logger.info(f"Working directory: {app_dir}")
+    logger.info(f"Log file: {log_path}")
 
 def resource_path(relative_path):
     """Get absolute path to resource, works for dev and for PyInstaller"""
@@ -62,13 +56,53 @@ def resource_path(relative_path):
     
     return str(base_path / relative_path)
 
+def read_theme(mode) -> str:
+    """The stylesheet of the specified theme with file validation"""
+    try:
+        valid_modes = ["dark", "light"]  # Add other valid modes if needed
+        if mode not in valid_modes:
+            raise ValueError(f"Invalid theme mode: {mode}")
+
+        theme_path = resource_path(f"theme/{mode}.qss")
+
+        if not os.path.exists(theme_path):
+            raise FileNotFoundError(f"Theme file not found: {theme_path}")
+
+        # Verify file is readable
+        if not os.access(theme_path, os.R_OK):
+            raise PermissionError(f"Cannot read theme file: {theme_path}")
+
+        with open(theme_path, "r") as f:
+            return f.read()
+
+    except Exception as e:
+        # Show error to user but continue with dark theme
+        error_msg = f"Failed to apply theme '{mode}': {str(e)}. Using dark theme as fallback."
+        logger.warning(error_msg)
+
+        # Fallback to dark theme
+        if mode != "dark":  # Prevent infinite recursion
+            return read_theme("dark")
+        return ""
+
 class LizDesktop(QMainWindow):
-    def __init__(self, flute:Flute, icon_file:str):
+    """
+    The tray and the launcher frame. Only the tray is set up on construction: the
+    launcher (its modules, the shortcuts and the theme) is loaded by a StartupLoader
+    started once the hotkey is registered, and built by finish_startup() when it is
+    done, or as soon as something needs it.
+    """
+    SEARCH_RESULTS = 100    # Rows answered to a forwarded search without a limit
+
+    def __init__(self, flute:Flute, icon_file:str, profiler:StartupProfiler, server:InstanceServer):
         super().__init__()
         self.setWindowFlags(Qt.FramelessWindowHint | Qt.WindowStaysOnTopHint | Qt.Window)
         self.setAttribute(Qt.WA_TranslucentBackground)
 
         self.flute: Flute = flute
+        self.profiler = profiler
+        self.store = None   # ShortcutStore, once loaded
+        self.executor = ShortcutExecutor(flute)
 
         # Desired size
         width = 700
@@ -76,8 +110,6 @@ class LizDesktop(QMainWindow):
 
         self.set_geometry(width, height)
 
-        self.load_theme()
-        
         # Setup tray icon
         self.setup_tray(icon_file)
 
@@ -85,14 +117,39 @@ class LizDesktop(QMainWindow):
         self.installEventFilter(self)
         
         # Initialize pages
-        self.main_window = MainWindow(self)
+        self.main_window = None
         self.config_window = None
         self.shortcut_manager_window = None
+        self.diagnostics_window = None
 
-        self.setCentralWidget(self.main_window)
+        # Commands of later launches, already listening but only read once the event loop runs
+        self.server = server
+        self.server.setParent(self)
+        self.server.requested.connect(self.handle_request)
+
+        self.loader = StartupLoader(flute, read_theme, profiler)
+        self.loader.loaded.connect(self.finish_startup)
 
         # self.open_config()
 
+    def finish_startup(self):
+        """Build the launcher from what the loader got, waiting for it if needed"""
+        if self.main_window is not None:
+            return
+        self.profiler.mark("until loaded")   # Event loop running, or waiting for the loader
+        self.loader.wait()
+        from windows.main_window import MainWindow
+
+        self.store = self.loader.store
+        self.setStyleSheet(self.loader.stylesheet)
+        self.main_window = MainWindow(self)
+        self.setCentralWidget(self.main_window)
+        self.profiler.mark("build launcher")
+
+        self.show()
+        self.profiler.mark("show launcher")
+        self.profiler.print_report()
+
     def set_geometry(self, width, height):
         # Get screen geometry
         screen = QApplication.primaryScreen()
@@ -107,6 +164,7 @@ class LizDesktop(QMainWindow):
 
     def open_config(self):
         if self.config_window is None:
+            from windows.config_window import ConfigWindow
             self.config_window = ConfigWindow(self, self.flute,
                             on_close_callback=self.on_config_closed)
             self.config_window.show()
@@ -118,6 +176,8 @@ class LizDesktop(QMainWindow):
 
     def open_shortcut_manager(self):
         if self.shortcut_manager_window is None:
+            self.finish_startup()   # Shares the launcher's store
+            from windows.cmd_manager_window import ShortcutManager
             self.shortcut_manager_window = ShortcutManager(self,
                 on_close_callback=self.on_shortcut_manager_closed)
             self.shortcut_manager_window.show()
@@ -127,36 +187,21 @@ class LizDesktop(QMainWindow):
     def on_shortcut_manager_closed(self):
         self.shortcut_manager_window = None
 
-    def load_theme(self):
-        self.apply_theme(self.flute.get_theme())
-            
+    def open_diagnostics(self):
+        if self.diagnostics_window is None:
+            from windows.diagnostics_window import DiagnosticsWindow
+            self.diagnostics_window = DiagnosticsWindow(self, self.flute,
+                            on_close_callback=self.on_diagnostics_closed)
+            self.diagnostics_window.show()
+            self.diagnostics_window.raise_()
+            self.diagnostics_window.activateWindow()
+
+    def on_diagnostics_closed(self):
+        self.diagnostics_window = None
+
     def apply_theme(self, mode):
         """Apply the specified theme with file validation"""
-        try:
-            valid_modes = ["dark", "light"]  # Add other valid modes if needed
-            if mode not in valid_modes:
-                raise ValueError(f"Invalid theme mode: {mode}")
-            
-            theme_path = resource_path(f"theme/{mode}.qss")
-
-            if not os.path.exists(theme_path):
-                raise FileNotFoundError(f"Theme file not found: {theme_path}")
-                
-            # Verify file is readable
-            if not os.access(theme_path, os.R_OK):
-                raise PermissionError(f"Cannot read theme file: {theme_path}")
-
-            with open(theme_path, "r") as f:
-                self.setStyleSheet(f.read())
-                
-        except Exception as e:
-            # Show error to user but continue with dark theme
-            error_msg = f"Failed to apply theme '{mode}': {str(e)}\n\nUsing dark theme as fallback."
-            print(error_msg)
-            
-            # Fallback to dark theme
-            if mode != "dark":  # Prevent infinite recursion
-                self.apply_theme("dark")
+        self.setStyleSheet(read_theme(mode))
         
     def setup_tray(self, icon_file):
         # Create tray icon
@@ -176,11 +221,21 @@ class LizDesktop(QMainWindow):
         shortcut_manager_action.triggered.connect(self.open_shortcut_manager)
         tray_menu.addAction(shortcut_manager_action)
 
+        # Stop the shortcut being executed
+        stop_action = QAction("Stop Execution", self)
+        stop_action.triggered.connect(self.executor.cancel)
+        tray_menu.addAction(stop_action)
+
         # Config action
         config_action = QAction("Config", self)
         config_action.triggered.connect(self.open_config)
         tray_menu.addAction(config_action)
 
+        # Diagnostics action
+        diagnostics_action = QAction("Diagnostics", self)
+        diagnostics_action.triggered.connect(self.open_diagnostics)
+        tray_menu.addAction(diagnostics_action)
+
         # Quit action
         quit_action = QAction("Quit", self)
         quit_action.triggered.connect(self.quit_app)
@@ -190,12 +245,65 @@ class LizDesktop(QMainWindow):
         self.tray.show()
 
     def show_main(self):
+        self.finish_startup()
         self.show()
         self.main_window.activateWindow()
         self.activateWindow()
         self.raise_()
 
+    def handle_request(self, request: RemoteRequest):
+        """A command forwarded by a later launch, see windows.remote"""
+        if request.action == "show":
+            self.show_main()
+            request.reply(OK, [])
+        elif request.action == "search":
+            self.finish_startup()
+            query = request.args[0] if request.args else ""
+            try:
+                limit = int(request.args[1]) if len(request.args) > 1 else self.SEARCH_RESULTS
+            except ValueError:
+                request.reply(ERROR, [f"Invalid limit: {request.args[1]}"])
+                return
+            result = self.main_window.search_worker.search(query)
+            rows = []
+            for shortcut_id in result.ids[:limit or None]:
+                item = self.store.get(shortcut_id)
+                fields = [item.id, item.application, item.description, item.shortcut]
+                rows.append("\t".join(field.replace("\t", " ") for field in fields))
+            request.reply(OK, rows)
+        elif request.action == "execute":
+            self.finish_startup()
+            unknown = [shortcut_id for shortcut_id in request.args if self.store.get(shortcut_id) is None]
+            if not request.args or unknown:
+                request.reply(ERROR, [f"Unknown shortcut id: {shortcut_id}" for shortcut_id in unknown]
+                                     or ["No shortcut id given"])
+                return
+            for shortcut_id in request.args:
+                self.executor.submit(shortcut_id)
+            request.reply(OK, [])
+        elif request.action == "import":
+            self.finish_startup()
+            importer = ShortcutImporter(self.flute, request.args, self)
+            importer.finished.connect(lambda response: self.on_import_finished(request, response))
+            importer.start()
+        elif request.action == "diagnostics":
+            request.reply(OK, [dump_metrics(self.flute)])
+        else:
+            request.reply(ERROR, [f"Unknown action: {request.action}"])
+
+    def on_import_finished(self, request: RemoteRequest, response):
+        self.store.sync()   # Patches the open views through shortcutsChanged
+        if response.code != StateCode.OK:
+            request.reply(ERROR, [f"Failed to import shortcuts: {'; '.join(response.results)}"])
+        else:
+            # Imported, but their shortcuts don't compile
+            request.reply(OK, [f"Can't be executed: {result}" for result in response.results])
+
     def quit_app(self):
+        if self.main_window is not None:
+            self.main_window.search_worker.shutdown()
+        self.executor.shutdown()
+        self.server.close()
         cmd = LizCommand("persist", [])
         self.flute.play(cmd)
         self.tray.hide()
@@ -226,10 +334,12 @@ class LizDesktop(QMainWindow):
 
 # Global shortcut handler using pynput
 def listen_for_shortcut(app_window, hotkey:str):
+    from pynput import keyboard     # Imported here, off the GUI thread
+
     COMBO = keyboard.HotKey.parse(hotkey)
 
     def on_activate():
-        print("Hotkey triggered")
+        logger.debug("Hotkey triggered")
 
         # Safely invoke show from the Qt event loop
         QMetaObject.invokeMethod(
@@ -249,6 +359,10 @@ def listen_for_shortcut(app_window, hotkey:str):
         listener.join()
 
 if __name__ == "__main__":
+    # Prints how long each phase of the startup took
+    profiler = StartupProfiler("--profile-startup" in sys.argv, STARTED_AT)
+    profiler.mark("imports")
+
     setup_logging()
 
     app = QApplication(sys.argv)
@@ -256,15 +370,34 @@ if __name__ == "__main__":
 
     icon_file = resource_path("resources/icon_1024.png")
     app.setWindowIcon(QIcon(icon_file))
+    profiler.mark("QApplication")
 
-    flute = Flute.create_flute(None)
+    # Take the instance name before the Flute loads the sheet. Another launch may
+    # have taken it since the check at the top: hand it the command, and if it
+    # doesn't answer either, exit rather than run as a second instance
+    server = InstanceServer()
+    if not server.listen():
+        forward_command(sys.argv[1:])
+        sys.exit("Another instance is starting and did not answer, try again")
+    profiler.mark("listen for other launches")
 
-    window = LizDesktop(flute, icon_file)
-    window.show()
+    flute = LoggedFlute(Flute.create_flute(None))    # Logs the time of every command
+    set_log_level(flute.get_log_level())
+    profiler.mark("create flute")
+
+    window = LizDesktop(flute, icon_file, profiler, server)
+    profiler.mark("tray")
 
     # Launch the global shortcut listener in a separate thread
     listener_thread = threading.Thread(target=listen_for_shortcut, args=(window,flute.get_trigger_hotkey(),), daemon=True)
     listener_thread.start()
+    profiler.mark("start hotkey listener")
+
+    # The command this launch was given
+    if COMMAND[0] != "show":
+        QTimer.singleShot(0, lambda: window.handle_request(RemoteRequest(*COMMAND, None)))
 
+    # Everything else loads in the background, the launcher shows up once it is built
+    window.loader.start()
 
     sys.exit(app.exec())
\ No newline at end of file
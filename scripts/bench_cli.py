@@ -0,0 +1,84 @@
+# This script compares what answering one search costs through liz.py with what the GUI
+# path costs. Every run is a fresh process, timed from spawn to exit, its peak RSS taken
+# from wait4:
+#   - cli standalone:  liz.py --standalone search, bluebird and the SearchEngine without Qt
+#   - cli via Liz:     liz.py search answered by the running Liz (only when one is running)
+#   - gui:             what main.py does up to a search: QApplication, the tray, the launcher
+#
+# Usage: python scripts/bench_cli.py [--runs R] [query]     (default: 5 runs, query "copy")
+# Needs wait4, so Linux or macOS. Without a display, run it with QT_QPA_PLATFORM=offscreen.
+
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from windows.remote import send_request   # noqa: E402
+
+LIMIT = "20"
+
+
+def gui_child(query: str):
+    """The GUI path, run in the child process"""
+    from PySide6.QtWidgets import QApplication
+    from bluebird import Flute
+    from main import LizDesktop, resource_path
+    from windows.instance import InstanceServer
+    from windows.startup import StartupProfiler
+
+    app = QApplication([])
+    window = LizDesktop(Flute.create_flute(None), resource_path("resources/icon_1024.png"),
+                        StartupProfiler(False, 0), InstanceServer())
+    window.loader.start()
+    window.finish_startup()
+    window.main_window.search_worker.search(query)
+    app.processEvents()
+    os._exit(0)     # Leave without the teardown, the CLI doesn't have one either
+
+
+def run(command: list) -> tuple:
+    """(seconds, peak RSS in MB) of one process"""
+    start = time.perf_counter()
+    child = subprocess.Popen(command, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    _, status, usage = os.wait4(child.pid, 0)
+    elapsed = time.perf_counter() - start
+    child.returncode = os.waitstatus_to_exitcode(status)
+    if child.returncode != 0:
+        raise RuntimeError(f"{' '.join(command)} exited with {child.returncode}")
+    # ru_maxrss is in KB on Linux, in bytes on macOS
+    rss = usage.ru_maxrss / (2**20 if sys.platform == "darwin" else 2**10)
+    return elapsed, rss
+
+
+def main():
+    args = sys.argv[1:]
+    if args and args[0] == "--gui-child":
+        gui_child(" ".join(args[1:]))
+    runs = 5
+    if "--runs" in args:
+        i = args.index("--runs")
+        runs = int(args[i + 1])
+        del args[i:i + 2]
+    query = " ".join(args) or "copy"
+
+    python = sys.executable
+    paths = [("cli standalone", [python, "liz.py", "--standalone", "search", "--limit", LIMIT, query])]
+    if send_request("search", ["", "1"]) is not None:
+        paths.append(("cli via Liz", [python, "liz.py", "search", "--limit", LIMIT, query]))
+    paths.append(("gui", [python, os.path.join("scripts", "bench_cli.py"), "--gui-child", query]))
+
+    print(f"query {query!r}, {runs} runs each")
+    print(f"{'path':<16}{'median':>10}{'min':>10}{'peak RSS':>12}")
+    for name, command in paths:
+        results = [run(command) for _ in range(runs)]
+        times = [elapsed for elapsed, _ in results]
+        print(f"{name:<16}{statistics.median(times) * 1000:>8.0f}ms{min(times) * 1000:>8.0f}ms"
+              f"{max(rss for _, rss in results):>10.1f}MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+# This script measures how long the launcher list takes to paint a frame while scrolling
+# through N shortcuts. It compares the old AppItemDelegate (texts laid out on every paint,
+# no sizeHint, rows measured one by one) with the cached one of windows/main_window.py.
+#
+# Every frame scrolls the view by a page and repaints it synchronously, the time of the
+# repaint (including the layout work scrolling triggers) is the frame time.
+#
+# Usage: python scripts/bench_delegate.py [--frames F] [N ...]     (default N: 10000 100000)
+# Without a display, run it with QT_QPA_PLATFORM=offscreen.
+
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from PySide6.QtCore import QRect, Qt   # noqa: E402
+from PySide6.QtGui import QPainter, QPainterPath, QTextOption   # noqa: E402
+from PySide6.QtWidgets import QApplication, QListView, QStyle, QStyledItemDelegate   # noqa: E402
+
+from windows.base import ShortcutColumns   # noqa: E402
+from windows.filter_proxy import AppFilterProxy   # noqa: E402
+from windows.main_window import AppItemDelegate, AppListModel   # noqa: E402
+from windows.search_result import SearchResult   # noqa: E402
+
+APPLICATIONS = [f"Application {i}" for i in range(40)]
+
+
+class OldAppItemDelegate(QStyledItemDelegate):
+    """The AppItemDelegate windows/main_window.py used before the layout cache"""
+    def __init__(self):
+        super().__init__()
+        self.text_option_left = QTextOption(Qt.AlignLeft | Qt.AlignVCenter)
+        self.text_option_left.setWrapMode(QTextOption.WordWrap)
+        self.text_option_right = QTextOption(Qt.AlignRight | Qt.AlignVCenter)
+        self.text_option_right.setWrapMode(QTextOption.WordWrap)
+
+    def paint(self, painter, option, index):
+        item = index.model().data(index, Qt.UserRole)
+        if item is None:
+            return super().paint(painter, option, index)
+        painter.save()
+        if option.state & QStyle.State_Selected:
+            path = QPainterPath()
+            path.addRoundedRect(option.rect.adjusted(2, 2, -2, -2), 8, 8)
+            painter.setRenderHint(QPainter.Antialiasing)
+            painter.fillPath(path, option.palette.highlight())
+        rect = option.rect.adjusted(5, 5, -5, -5)
+        left_rect = QRect(rect.left(), rect.top(), int(rect.width() * 0.8), rect.height())
+        painter.setPen(option.palette.text().color())
+        painter.drawText(left_rect, f"{item.application}> {item.description}", self.text_option_left)
+        right_rect = QRect(left_rect.right(), rect.top(), int(rect.width() * 0.2), rect.height())
+        painter.setPen(Qt.darkGray)
+        painter.drawText(right_rect, item.shortcut, self.text_option_right)
+        painter.restore()
+
+
+def make_view(n: int, delegate, uniform: bool) -> QListView:
+    items = ShortcutColumns(
+        [f"id-{i}" for i in range(n)],
+        [i % 50 for i in range(n)],
+        [f"ctrl+shift+{chr(97 + i % 26)}" for i in range(n)],
+        [APPLICATIONS[i % len(APPLICATIONS)] for i in range(n)],
+        [f"Do the thing number {i} in the current window" for i in range(n)],
+        ["" for _ in range(n)],
+        [0.0 for _ in range(n)],
+    ).to_shortcuts()
+    model = AppListModel(items)
+    proxy = AppFilterProxy()
+    proxy.setSourceModel(model)
+    proxy.apply_result(SearchResult("", [item.id for item in items]))
+
+    view = QListView()
+    view.setModel(proxy)
+    view.setItemDelegate(delegate)
+    view.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+    view.setResizeMode(QListView.Adjust)
+    view.setUniformItemSizes(uniform)
+    view.resize(700, 480)
+    view.show()
+    view._keep = (model, proxy, delegate)
+    return view
+
+
+def measure(view: QListView, frames: int) -> list:
+    app = QApplication.instance()
+    start = time.perf_counter()
+    view.viewport().repaint()   # First layout of all rows
+    app.processEvents()
+    first = time.perf_counter() - start
+
+    bar = view.verticalScrollBar()
+    times = []
+    for frame in range(frames):
+        start = time.perf_counter()
+        bar.setValue((frame * bar.pageStep()) % max(1, bar.maximum()))
+        view.viewport().repaint()
+        times.append(time.perf_counter() - start)
+    return [first] + times
+
+
+def main():
+    args = sys.argv[1:]
+    frames = 200
+    if "--frames" in args:
+        at = args.index("--frames")
+        frames = int(args[at + 1])
+        del args[at:at + 2]
+    sizes = [int(a) for a in args] or [10_000, 100_000]
+
+    app = QApplication(sys.argv[:1])
+    setups = [
+        ("old delegate", lambda: OldAppItemDelegate(), False),
+        ("cached + uniform sizes", lambda: AppItemDelegate(), True),
+    ]
+    print(f"{'shortcuts':>10}  {'delegate':<24}{'first':>10}{'mean':>10}{'p95':>10}{'max':>10}")
+    for n in sizes:
+        for name, delegate, uniform in setups:
+            view = make_view(n, delegate(), uniform)
+            first, *times = measure(view, frames)
+            times.sort()
+            p95 = times[int(len(times) * 0.95) - 1]
+            print(f"{n:>10}  {name:<24}{first * 1e3:>8.1f}ms{statistics.mean(times) * 1e3:>8.2f}ms"
+                  f"{p95 * 1e3:>8.2f}ms{times[-1] * 1e3:>8.2f}ms")
+            view.close()
+            app.processEvents()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+# This script measures how much Python memory the launcher needs to hold N shortcuts.
+# It compares the old dataclass layout (per-instance __dict__, cached searchable_text,
+# one application string per shortcut) with the slotted Shortcut of windows/base.py
+# shared by both models, and optionally the search index built on top of it.
+#
+# Usage: python scripts/bench_memory.py [--index] [N ...]     (default N: 10000 100000 1000000)
+
+import gc
+import os
+import sys
+import time
+import tracemalloc
+import uuid
+from dataclasses import dataclass, field
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from windows.base import ShortcutColumns   # noqa: E402
+
+APPLICATIONS = [f"Application {i}" for i in range(40)]
+
+
+@dataclass
+class OldShortcut:
+    """The layout windows/base.py used before the slotted record"""
+    id: str
+    hit_number: int
+    shortcut: str
+    application: str
+    description: str
+    comment: str
+
+    searchable_text: str = field(init=False)
+
+    def __post_init__(self):
+        self.searchable_text = f"{self.shortcut} {self.application} {self.description}".lower()
+
+
+def make_columns(n: int) -> ShortcutColumns:
+    # Every string is a fresh object, as when the columns come out of bluebird
+    return ShortcutColumns(
+        [str(uuid.uuid4()) for _ in range(n)],
+        [i % 50 for i in range(n)],
+        [f"ctrl+shift+{chr(97 + i % 26)}" for i in range(n)],
+        [APPLICATIONS[i % len(APPLICATIONS)].encode().decode() for i in range(n)],
+        [f"Do the thing number {i} in the current window" for i in range(n)],
+        ["" for _ in range(n)],
+        [(i % 50) * 0.5 for i in range(n)],
+    )
+
+
+def measure(n: int, build) -> tuple:
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    kept = build(make_columns(n))
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return current, elapsed
+
+
+def old_layout(columns: ShortcutColumns):
+    # Each window fetched and parsed its own copy
+    launcher = list(map(OldShortcut, *columns[:6]))
+    manager = list(map(OldShortcut, *columns[:6]))
+    return launcher, manager
+
+
+def new_layout(columns: ShortcutColumns):
+    # ShortcutStore keeps the records, each model only a list of references
+    records = columns.to_shortcuts()
+    return records, list(records), list(records)
+
+
+def new_layout_with_index(columns: ShortcutColumns):
+    from windows.search_index import SearchIndex
+    store, launcher, manager = new_layout(columns)
+    index = SearchIndex(launcher)
+    index.arrays()
+    return store, launcher, manager, index
+
+
+def main():
+    args = sys.argv[1:]
+    with_index = "--index" in args
+    sizes = [int(a) for a in args if a != "--index"] or [10_000, 100_000, 1_000_000]
+
+    layouts = [("dataclass, two copies", old_layout), ("slots, shared", new_layout)]
+    if with_index:
+        layouts.append(("slots, shared + index", new_layout_with_index))
+
+    print(f"{'shortcuts':>10}  {'layout':<24}{'memory':>12}{'per row':>10}{'build':>9}")
+    for n in sizes:
+        for name, build in layouts:
+            current, elapsed = measure(n, build)
+            print(f"{n:>10}  {name:<24}{current / 2**20:>10.1f}MB{current / n:>9.0f}B{elapsed:>8.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+# This script checks the launcher ranking of windows/search_engine.py on a small index
+# with free slots: the empty query must list every live shortcut (the one in slot 0
+# included) by frecency, and the removed ones must be gone from every result.
+#
+# Usage: python scripts/check_search_engine.py
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from windows.base import Shortcut   # noqa: E402
+from windows.search_engine import SearchEngine   # noqa: E402
+from windows.search_index import SearchIndex   # noqa: E402
+
+
+def make_items(n: int):
+    return [Shortcut(str(i), i, f"ctrl+{i}", "Editor", f"Copy line {i}", "", frecency=float(i % 3))
+            for i in range(n)]
+
+
+def check_empty_query_lists_live_slots():
+    items = make_items(5)
+    index = SearchIndex(items)
+    index.remove("3")
+    result = SearchEngine(index).search("")
+    assert sorted(result.ids) == ["0", "1", "2", "4"], result.ids
+    frecencies = [items[int(i)].frecency for i in result.ids]
+    assert frecencies == sorted(frecencies, reverse=True), result.ids
+
+
+def check_removed_slots_stay_out():
+    items = make_items(5)
+    index = SearchIndex(items)
+    engine = SearchEngine(index)
+    index.remove("0")
+    index.remove("4")
+    engine.invalidate()
+    assert sorted(engine.search("").ids) == ["1", "2", "3"]
+    assert sorted(engine.search("copy line").ids) == ["1", "2", "3"]
+
+
+def main():
+    checks = [check_empty_query_lists_live_slots, check_removed_slots_stay_out]
+    for check in checks:
+        check()
+        print(f"ok  {check.__name__}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+import time
+
+import pytest
+from PySide6.QtCore import QAbstractListModel, QModelIndex, QPersistentModelIndex, Qt
+
+from windows.base import RowMap, Shortcut, ShortcutChanges, apply_shortcut_changes
+from windows.filter_proxy import AppFilterProxy
+from windows.search_result import SearchResult
+
+ROWS = 50000
+
+
+class ListModel(QAbstractListModel):
+    """The parts of the launcher's AppListModel the proxy relies on, without the launcher"""
+
+    def __init__(self, items):
+        super().__init__()
+        self._items = items
+        self._rows = RowMap(self)
+
+    def rowCount(self, parent=QModelIndex()):
+        return len(self._items)
+
+    def data(self, index, role=Qt.DisplayRole):
+        return self._items[index.row()].id if index.isValid() else None
+
+    def items(self):
+        return self._items
+
+    def row_of(self, shortcut_id):
+        return self._rows.get(shortcut_id)
+
+    def apply_changes(self, changes: ShortcutChanges):
+        apply_shortcut_changes(self, self._items, changes)
+
+
+def make_items(n: int):
+    return [Shortcut(str(i), 0, f"ctrl+{i}", "Editor", f"Action {i}", "") for i in range(n)]
+
+
+def shown_ids(proxy):
+    return [proxy.index(row).data() for row in range(proxy.rowCount())]
+
+
+@pytest.fixture
+def proxy(qapp):
+    model = ListModel(make_items(ROWS))
+    proxy = AppFilterProxy()
+    proxy.setSourceModel(model)
+    return proxy
+
+
+def best_time(apply, result, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        apply(result)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def test_apply_costs_the_matches_not_the_rows(proxy):
+    few = SearchResult("q", [str(i) for i in range(0, ROWS, ROWS // 20)][::-1])
+    assert best_time(proxy.apply_result, few) < 0.002   # Mapping every row took tens of ms
+    assert shown_ids(proxy) == few.ids
+
+    every = SearchResult("", [str(i) for i in range(ROWS)][::-1])
+    assert best_time(proxy.apply_result, every) < 0.1
+    assert proxy.rowCount() == ROWS
+    assert proxy.mapToSource(proxy.index(0)).row() == ROWS - 1
+    assert proxy.mapFromSource(proxy.sourceModel().index(0, 0)).row() == ROWS - 1
+
+
+def test_mapping_follows_source_changes(proxy):
+    model = proxy.sourceModel()
+    proxy.apply_result(SearchResult("q", ["5", "3", "49999", "7"]))
+    proxy_index = proxy.index(2)    # Persistent through the view's selection in the launcher
+    current = QPersistentModelIndex(proxy_index)
+
+    model.apply_changes(ShortcutChanges(1, [Shortcut("new", 0, "", "", "", "")], ["3", "4", "10"]))
+    assert model.row_of("new") == ROWS - 3
+    assert model.row_of("5") == 3 and model.row_of("3") is None
+    assert shown_ids(proxy) == ["5", "49999", "7"]
+    assert current.data() == "49999"
+
+    proxy.apply_result(SearchResult("q", ["new", "5"]))
+    assert shown_ids(proxy) == ["new", "5"]
+    assert proxy.mapFromSource(model.index(ROWS - 3, 0)).row() == 0
+    assert not proxy.mapFromSource(model.index(0, 0)).isValid()
@@ -0,0 +1,93 @@
+import random
+
+import pytest
+from rapidfuzz import fuzz
+
+from windows.base import Shortcut
+from windows.search_engine import SearchEngine
+from windows.search_index import SCORE_CUTOFF, SearchIndex
+
+APPLICATIONS = ["Editor", "Browser", "Terminal", "Mail", "Spreadsheet"]
+WORDS = ["copy", "paste", "line", "tab", "close", "open", "new", "window", "select", "all",
+         "find", "next", "previous", "toggle", "comment", "split", "pane", "zoom", "reload"]
+KEYS = ["ctrl", "alt", "shift", "super"]
+
+
+def make_items(n: int, seed: int = 7):
+    rng = random.Random(seed)
+    return [
+        Shortcut(str(i), rng.randrange(50), "+".join(rng.sample(KEYS, rng.randint(1, 2)) + [rng.choice("abcxyz0123")]),
+                 rng.choice(APPLICATIONS), " ".join(rng.choices(WORDS, k=rng.randint(1, 4))).capitalize(), "",
+                 frecency=rng.random() * 10)
+        for i in range(n)
+    ]
+
+
+def brute_force(items, query: str):
+    """Ids of the live shortcuts scoring above the cutoff, scored one by one"""
+    query = query.lower()
+    if not query:
+        return {item.id for item in items}  # The empty query lists everything by frecency
+    return {item.id for item in items if fuzz.partial_ratio(query, item.searchable_text) > SCORE_CUTOFF}
+
+
+def check(engine: SearchEngine, items, query: str):
+    result = engine.search(query)
+    assert set(result.ids) == brute_force(items, query), query
+    assert len(result.ids) == len(set(result.ids)), query
+    assert result.keys == sorted(result.keys, reverse=True), query
+
+
+@pytest.fixture
+def items():
+    return make_items(600)
+
+
+def test_matches_brute_force(items):
+    engine = SearchEngine(SearchIndex(items))
+    for query in ["c", "co", "copy l", "Tab", "ctrl+a", "zz", "Editor close", "xqj", "new window"]:
+        check(engine, items, query)
+
+
+def test_incremental_narrowing(items):
+    engine = SearchEngine(SearchIndex(items))
+    for typed in ["toggle comment", "ctrl+shift+x", "browser reload", "split pane"]:
+        for end in range(1, len(typed) + 1):
+            check(engine, items, typed[:end])
+        # Backspacing goes through the cache, then typing on narrows from another prefix
+        for end in range(len(typed), 0, -1):
+            check(engine, items, typed[:end])
+        check(engine, items, typed[:3] + "x")
+
+
+def test_removals_and_re_adds(items):
+    index = SearchIndex(items)
+    engine = SearchEngine(index)
+    live = {item.id: item for item in items}
+    rng = random.Random(11)
+
+    typed = "select all"
+    for end in range(1, len(typed) + 1):
+        removed = rng.sample(sorted(live), 40)
+        for shortcut_id in removed:
+            index.remove(shortcut_id)
+            del live[shortcut_id]
+        re_added = [item for item in items if item.id not in live][:25]
+        for item in re_added:
+            index.add(item)
+            live[item.id] = item
+        engine.invalidate()
+        check(engine, list(live.values()), typed[:end])
+        check(engine, list(live.values()), "")
+
+
+def test_changed_text_is_searched_again(items):
+    index = SearchIndex(items)
+    engine = SearchEngine(index)
+    check(engine, items, "zoom")
+    changed = [Shortcut(item.id, item.hit_number, item.shortcut, item.application, "Zoom in", "", item.frecency)
+               if i % 10 == 0 else item for i, item in enumerate(items)]
+    index.sync(changed)
+    engine.invalidate()
+    check(engine, changed, "zoom")
+    check(engine, changed, "zoom i")
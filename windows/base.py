@@ -1,6 +1,14 @@
-from dataclasses import dataclass, field
+import json
+import sys
+from bisect import bisect_left
+from dataclasses import asdict, dataclass
+from typing import TYPE_CHECKING, Dict, Iterable, List, NamedTuple, Optional, Tuple
 
-@dataclass
+# Qt is only imported by the functions patching models, so the records load without it (liz.py)
+if TYPE_CHECKING:
+    from PySide6.QtCore import QAbstractItemModel
+
+@dataclass(slots=True)
 class Shortcut:
     id: str
     hit_number: int
@@ -8,12 +16,172 @@ class Shortcut:
     application: str
     description: str
     comment: str
-
-    searchable_text: str = field(init=False)
+    frecency: float = 0.0   # hit_number weighted by how recent the hits are, computed by bluebird
 
     def __post_init__(self):
-        # Precompute and cache the lowercased searchable text
-        self.searchable_text = f"{self.shortcut} {self.application} {self.description}".lower()
+        # A few applications are shared by thousands of shortcuts, keep one string each
+        self.application = sys.intern(self.application)
+
+    @property
+    def searchable_text(self) -> str:
+        # Built on demand, the search index keeps its own copy
+        return f"{self.shortcut} {self.application} {self.description}".lower()
+
+    def update(self, other: "Shortcut"):
+        self.hit_number = other.hit_number
+        self.shortcut = other.shortcut
+        self.application = other.application
+        self.description = other.description
+        self.comment = other.comment
+        self.frecency = other.frecency
+
+    def to_json(self) -> str:
+        fields = asdict(self)
+        del fields["frecency"]  # Not stored, bluebird keeps the hit times itself
+        return json.dumps(fields)
+
+
+class ShortcutColumns(NamedTuple):
+    """Shortcuts as parallel lists, in the order returned by Flute.fetch_columns"""
+    ids: List[str]
+    hit_numbers: List[int]
+    shortcuts: List[str]
+    applications: List[str]
+    descriptions: List[str]
+    comments: List[str]
+    frecencies: List[float]
+
+    def __len__(self):
+        return len(self.ids)
+
+    def to_shortcuts(self) -> List[Shortcut]:
+        return list(map(Shortcut, *self))
+
+
+class ShortcutChanges(NamedTuple):
+    """What changed in the backend after some revision, see Flute.fetch_changes"""
+    revision: int
+    upserted: List[Shortcut]    # created or updated
+    deleted: List[str]          # ids
+
+    @classmethod
+    def fetch(cls, flute, since: int) -> "ShortcutChanges":
+        revision, columns, deleted = flute.fetch_changes(since)
+        return cls(revision, ShortcutColumns(*columns).to_shortcuts(), deleted)
+
+    def __bool__(self):
+        return bool(self.upserted or self.deleted)
+
+
+def row_runs(rows: Iterable[int]) -> List[Tuple[int, int]]:
+    """(first, last) of every run of adjacent rows, the bottom run first"""
+    runs = []
+    for row in sorted(set(rows), reverse=True):
+        if runs and runs[-1][0] == row + 1:
+            runs[-1] = (row, runs[-1][1])
+        else:
+            runs.append((row, row))
+    return runs
+
+
+def remove_item_rows(model: "QAbstractItemModel", items: List[Shortcut], rows: Iterable[int]):
+    """
+    Remove rows from the list backing a flat model, bottom run first so the rows
+    still to remove don't shift. A single run is one row removal; scattered rows
+    are removed under one layout change, so proxies map their rows once instead
+    of once per run.
+    """
+    from PySide6.QtCore import QModelIndex
+    runs = row_runs(rows)
+    if not runs:
+        return
+    if len(runs) == 1:
+        first, last = runs[0]
+        model.beginRemoveRows(QModelIndex(), first, last)
+        del items[first:last + 1]
+        model.endRemoveRows()
+        return
+
+    model.layoutAboutToBeChanged.emit()
+    for first, last in runs:
+        del items[first:last + 1]
+    removed = sorted(row for first, last in runs for row in range(first, last + 1))
+    old_indexes = model.persistentIndexList()
+    new_indexes = []
+    for index in old_indexes:
+        above = bisect_left(removed, index.row())   # Removed rows above this one
+        if above < len(removed) and removed[above] == index.row():
+            new_indexes.append(QModelIndex())
+        else:
+            new_indexes.append(model.index(index.row() - above, index.column()))
+    model.changePersistentIndexList(old_indexes, new_indexes)
+    model.layoutChanged.emit()
+
+
+class RowMap:
+    """
+    Row of every shortcut of a flat model by id, kept up to date from the model's own
+    signals: rows from the first inserted or removed one down are mapped again, a
+    layout change or a reset maps them all. Create it in the model's __init__, its
+    slots then run before those of the proxies and views attached later.
+    """
+
+    def __init__(self, model: "QAbstractItemModel"):
+        self._model = model     # Needs items(), the list backing the rows
+        self._rows: Dict[str, int] = {}
+        model.rowsAboutToBeRemoved.connect(self._forget)
+        model.rowsRemoved.connect(self._map_from)
+        model.rowsInserted.connect(self._map_from)
+        model.rowsMoved.connect(self._map_all)
+        model.layoutChanged.connect(self._map_all)
+        model.modelReset.connect(self._map_all)
+        self._map_all()
+
+    def get(self, shortcut_id: str) -> Optional[int]:
+        return self._rows.get(shortcut_id)
+
+    def _forget(self, parent, first: int, last: int):
+        for item in self._model.items()[first:last + 1]:
+            self._rows.pop(item.id, None)
+
+    def _map_from(self, parent, first: int, *args):
+        items = self._model.items()
+        rows = self._rows
+        for row in range(first, len(items)):
+            rows[items[row].id] = row
+
+    def _map_all(self, *args):
+        self._rows = {item.id: row for row, item in enumerate(self._model.items())}
+
+
+def apply_shortcut_changes(model: "QAbstractItemModel", items: List[Shortcut], changes: ShortcutChanges,
+                           last_column: int = 0):
+    """
+    Patch the list backing a flat model in place, emitting batched row removals,
+    one dataChanged per run of updated rows and one insertion at the end instead
+    of a model reset. Rows are looked up through the model's row_of (see RowMap).
+    """
+    from PySide6.QtCore import QModelIndex
+    removed = [row for row in map(model.row_of, changes.deleted) if row is not None]
+    if removed:
+        remove_item_rows(model, items, removed)
+
+    added = []
+    updated = []
+    for item in changes.upserted:
+        row = model.row_of(item.id)
+        if row is None:
+            added.append(item)
+        else:
+            items[row] = item
+            updated.append(row)
+    for first, last in row_runs(updated):
+        model.dataChanged.emit(model.index(first, 0), model.index(last, last_column))
+
+    if added:
+        model.beginInsertRows(QModelIndex(), len(items), len(items) + len(added) - 1)
+        items.extend(added)
+        model.endInsertRows()
 
 
 @dataclass
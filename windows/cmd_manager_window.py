@@ -1,13 +1,22 @@
-import json
-from typing import List, Dict, Set, Optional
+from dataclasses import replace
+from operator import attrgetter
+from typing import Iterable, List, Dict, Set, Optional
 from PySide6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QPushButton, 
                               QTableView, QTableWidgetItem, QLineEdit, QLabel, QMenu, QDialog, 
                               QMessageBox, QInputDialog, QFileDialog, QHeaderView)
-from PySide6.QtCore import QAbstractTableModel, QModelIndex, Qt, QSortFilterProxyModel, Signal, QPoint
+from PySide6.QtCore import QAbstractTableModel, QModelIndex, Qt, Signal, QPoint, QTimer
 from PySide6.QtGui import QAction
 from bluebird import *
-from windows.base import Shortcut
+from windows.base import RowMap, Shortcut, ShortcutChanges, apply_shortcut_changes, remove_item_rows
+from windows.filter_proxy import AppFilterProxy
+from windows.importer import ShortcutImporter
+from windows.search_result import SearchResult
+from windows.search_worker import SearchWorker
 from windows.signals import global_signal_bus
+from windows.table_filter import FilterIndex, TableFilter
+
+# Tables with more rows than this are filtered on a background thread
+BACKGROUND_FILTER_ROWS = 20000
 
 class EditDialog(QDialog):
     def __init__(self, parent=None):
@@ -34,6 +43,14 @@ class EditDialog(QDialog):
         self.command_input = QLineEdit()
         layout.addWidget(self.command_label)
         layout.addWidget(self.command_input)
+
+        # Preview of the keys the shortcut sends, see ShortcutManager.preview_shortcut
+        self.preview_label = QLabel()
+        self.preview_label.setWordWrap(True)
+        self.preview_label.setTextInteractionFlags(Qt.TextSelectableByMouse)
+        self.preview_label.hide()
+        layout.addWidget(self.preview_label)
+        self.command_input.textChanged.connect(self.preview_label.hide)
         
         # Comment
         self.comment_label = QLabel("Comment:")
@@ -50,8 +67,10 @@ class EditDialog(QDialog):
         
         # Buttons
         button_layout = QHBoxLayout()
+        self.preview_button = QPushButton("Preview")
         self.save_button = QPushButton("Save")
         self.cancel_button = QPushButton("Cancel")
+        button_layout.addWidget(self.preview_button)
         button_layout.addWidget(self.save_button)
         button_layout.addWidget(self.cancel_button)
         
@@ -62,11 +81,72 @@ class EditDialog(QDialog):
         self.save_button.clicked.connect(self.accept)
         self.cancel_button.clicked.connect(self.reject)
 
+    def show_preview(self, text: str):
+        self.preview_label.setText(text)
+        self.preview_label.show()
+        self.adjustSize()
+
 class AppTableModel(QAbstractTableModel):
-    def __init__(self, data: List[Shortcut]):
-        super().__init__()
+    """
+    The shortcuts of the manager, handed to the view a page at a time through
+    canFetchMore/fetchMore as it scrolls down, so opening a big sheet only costs
+    one page of rows. Sorting orders all of them, not only the loaded ones.
+    """
+    PAGE_SIZE = 500
+    SORT_KEYS = [attrgetter("application"), attrgetter("description"),
+                 attrgetter("shortcut"), attrgetter("hit_number")]
+
+    def __init__(self, data: List[Shortcut], parent=None):
+        super().__init__(parent)
         self.headers = ["Application", "Description", "Shortcut", "Hits"]
-        self._data: List[Shortcut] = data  # List of lists or dicts
+        self._data: List[Shortcut] = data[:self.PAGE_SIZE]      # Rows the view knows about
+        self._pending: List[Shortcut] = data[self.PAGE_SIZE:]   # Not fetched by the view yet
+        self._rows = RowMap(self)
+
+    def total(self) -> int:
+        return len(self._data) + len(self._pending)
+
+    def items(self) -> List[Shortcut]:
+        """The loaded rows"""
+        return self._data
+
+    def row_of(self, shortcut_id: str) -> Optional[int]:
+        """Row of a loaded shortcut"""
+        return self._rows.get(shortcut_id)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and bool(self._pending)
+
+    def fetchMore(self, parent=QModelIndex(), count: Optional[int] = None):
+        if parent.isValid() or not self._pending:
+            return
+        page = self._pending[:count or self.PAGE_SIZE]
+        self.beginInsertRows(QModelIndex(), len(self._data), len(self._data) + len(page) - 1)
+        self._data.extend(page)
+        del self._pending[:len(page)]
+        self.endInsertRows()
+
+    def fetch_all(self):
+        self.fetchMore(count=len(self._pending))
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        if not 0 <= column < len(self.SORT_KEYS):
+            return
+        self.layoutAboutToBeChanged.emit()
+        old_indexes = self.persistentIndexList()
+        ids = [self._data[index.row()].id for index in old_indexes]
+
+        items = self._data + self._pending
+        items.sort(key=self.SORT_KEYS[column], reverse=order == Qt.DescendingOrder)
+        loaded = len(self._data)
+        self._data, self._pending = items[:loaded], items[loaded:]
+
+        rows = {item.id: row for row, item in enumerate(self._data)} if ids else {}
+        self.changePersistentIndexList(old_indexes, [
+            self.index(rows[shortcut_id], index.column()) if shortcut_id in rows else QModelIndex()
+            for index, shortcut_id in zip(old_indexes, ids)
+        ])
+        self.layoutChanged.emit()
 
     def add_item(self, item):
         self.beginInsertRows(self.index(len(self._data), 0).parent(), len(self._data), len(self._data))
@@ -117,34 +197,71 @@ class AppTableModel(QAbstractTableModel):
 
     def reset_data(self, new_data):
         self.beginResetModel()
-        self._data = new_data
+        self._data = new_data[:self.PAGE_SIZE]
+        self._pending = new_data[self.PAGE_SIZE:]
         self.endResetModel()
 
-class AppFilterProxyModel(QSortFilterProxyModel):
-    def __init__(self):
-        super().__init__()
-        self._filter = ""
+    def remove_ids(self, ids: Iterable[str]):
+        """Remove the rows of the given shortcuts, loaded or not, with batched row removals"""
+        ids = set(ids)
+        if self._pending:
+            self._pending = [item for item in self._pending if item.id not in ids]
+        remove_item_rows(self, self._data, [row for row in map(self.row_of, ids) if row is not None])
+
+    def apply_changes(self, changes: ShortcutChanges):
+        if changes.deleted:
+            self.remove_ids(changes.deleted)
+            changes = changes._replace(deleted=[])
+        if self._pending:
+            # Pending rows are the shared records, already updated in place;
+            # keep the updated ones from being added again
+            pending_ids = {item.id for item in self._pending}
+            changes = changes._replace(upserted=[item for item in changes.upserted if item.id not in pending_ids])
+        apply_shortcut_changes(self, self._data, changes, self.columnCount() - 1)
+
+class AppFilterProxyModel(AppFilterProxy):
+    """
+    Shows the rows accepted by the latest TableFilter result, in the order of the table.
+    Like the launcher, the rows are looked up from the result's ids once per result
+    instead of calling filterAcceptsRow for every row. Sorting is forwarded to the table model.
+    """
+    METRIC = "table filter apply"
+
+    def _shown_rows(self) -> List[int]:
+        return sorted(super()._shown_rows())    # In the order of the table
+
+    def _remap(self):
+        if self._result.query:
+            super()._remap()
+            return
+        # Nothing filtered out: map every row to itself instead of through a dict of them all
+        self._source_rows = range(self.sourceModel().rowCount())
+        self._proxy_rows = None
+
+    def apply_result(self, result: SearchResult):
+        if result.query:
+            self.sourceModel().fetch_all()  # Show matches from every shortcut, not only the loaded pages
+        super().apply_result(result)
 
-    def setFilterString(self, text: str):
-        self._filter = text.lower()
-        self.invalidateFilter()
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.sourceModel().columnCount()
 
-    def filterAcceptsRow(self, row, parent):
-        for column in range(self.sourceModel().columnCount()):
-            index = self.sourceModel().index(row, column)
-            if self._filter.lower() in str(self.sourceModel().data(index, Qt.DisplayRole)).lower():
-                return True
-        return False
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        # The default maps the section through row 0, which is missing when nothing matches
+        return self.sourceModel().headerData(section, orientation, role)
 
 class ShortcutManager(QWidget):
+    IMPORT_WARNINGS_SHOWN = 20  # Invalid shortcuts listed after an import
     def __init__(self, parent, on_close_callback=None):
         super().__init__()
         self.setWindowTitle("Shortcut Manager")
         self.resize(parent.width(), parent.height())
         self.parent = parent
         self.flute = parent.flute
+        self.store = parent.store
 
         self.need_fetchall = False
+        self.importer: Optional[ShortcutImporter] = None
 
         self.setAttribute(Qt.WA_DeleteOnClose)
         self.on_close_callback = on_close_callback
@@ -153,6 +270,13 @@ class ShortcutManager(QWidget):
         self.setup_connections()
 
     def closeEvent(self, event):
+        # The bus outlives the window, the changes made after it closed are not its business
+        global_signal_bus.shortcutsChanged.disconnect(self.model.apply_changes)
+        global_signal_bus.shortcutsChanged.disconnect(self.filter_worker.apply_changes)
+        self.filter_worker.shutdown()
+        if self.importer is not None:
+            self.importer.cancel()
+            self.need_fetchall = True   # The launcher fetches what was imported so far
         if self.on_close_callback:
             self.on_close_callback()
         if self.need_fetchall:
@@ -160,10 +284,13 @@ class ShortcutManager(QWidget):
         return super().closeEvent(event)
 
     def setup_table_view(self):
-        data = self.fetch_shortcuts("")
-        self.model = AppTableModel(data)
-        self.proxy = AppFilterProxyModel()
+        data = self.fetch_shortcuts()
+        # Owned by the window, so they go with it when it is deleted on close
+        self.model = AppTableModel(data, self)
+        self.proxy = AppFilterProxyModel(self)
         self.proxy.setSourceModel(self.model)
+        self.filter_worker = SearchWorker(TableFilter(FilterIndex(data)),
+                                          self.flute.get_search_debounce_ms(), self, metric="table filter")
 
         self.table = QTableView()
         self.table.setModel(self.proxy)
@@ -184,7 +311,30 @@ class ShortcutManager(QWidget):
         self.table.setColumnWidth(3, 40)   # Hits
 
         self.table.setWordWrap(True)
-        self.table.resizeRowsToContents()  # Adjust height for wrapped lines
+        # Only the rows in view are fitted to their wrapped lines, see fit_visible_rows
+        self._fit_rows_timer = QTimer(self)
+        self._fit_rows_timer.setSingleShot(True)
+        self._fit_rows_timer.setInterval(0)
+        self._fit_rows_timer.timeout.connect(self.fit_visible_rows)
+
+    def schedule_fit_rows(self, *args):
+        self._fit_rows_timer.start()
+
+    def fit_visible_rows(self):
+        """Adjust the height of the rows in view to their wrapped lines, top down"""
+        viewport_height = self.table.viewport().height()
+        row = self.table.rowAt(0)
+        if row < 0:
+            return
+        while row < self.proxy.rowCount():
+            self.table.resizeRowToContents(row)
+            if self.table.rowViewportPosition(row) + self.table.rowHeight(row) >= viewport_height:
+                break
+            row += 1
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.schedule_fit_rows()
 
     def setup_ui(self):
         
@@ -195,7 +345,7 @@ class ShortcutManager(QWidget):
         
         # Search box
         self.search_box = QLineEdit()
-        self.search_box.setPlaceholderText("Search shortcuts...")
+        self.search_box.setPlaceholderText("Search shortcuts... (app: desc: key: for one column)")
         top_bar.addWidget(self.search_box)
         
         # Counter
@@ -215,6 +365,7 @@ class ShortcutManager(QWidget):
         
         # Edit dialog
         self.edit_dialog = EditDialog(self)
+        self.edit_dialog.preview_button.clicked.connect(self.preview_shortcut)
     
         # Context menu
         self.context_menu = QMenu(self)
@@ -224,13 +375,29 @@ class ShortcutManager(QWidget):
     def setup_connections(self):
         self.close_button.clicked.connect(self.close)
         # self.search_box.returnPressed.connect(self.on_search)
-        self.search_box.textChanged.connect(self.proxy.setFilterString)
+        self.search_box.textChanged.connect(self.filter_rows)
+        self.filter_worker.finished.connect(self.proxy.apply_result)
         self.table.customContextMenuRequested.connect(self.show_context_menu)
+        global_signal_bus.shortcutsChanged.connect(self.model.apply_changes)
+        global_signal_bus.shortcutsChanged.connect(self.filter_worker.apply_changes)
         self.table.selectionModel().selectionChanged.connect(self.update_counter)
+
+        self.table.verticalScrollBar().valueChanged.connect(self.schedule_fit_rows)
+        self.table.horizontalHeader().sectionResized.connect(self.schedule_fit_rows)
+        for signal in (self.proxy.layoutChanged, self.proxy.modelReset,
+                       self.proxy.rowsInserted, self.proxy.rowsRemoved, self.proxy.dataChanged):
+            signal.connect(self.schedule_fit_rows)
     
+    def filter_rows(self, text: str):
+        """Filter by text, e.g. "app:chrome key:ctrl new tab", see parse_filter_query"""
+        if self.model.total() > BACKGROUND_FILTER_ROWS:
+            self.filter_worker.request(text)
+        else:
+            self.proxy.apply_result(self.filter_worker.search_blocking(text))
+
     def update_counter(self):
         total_shortcuts = len(self.table.selectionModel().selectedRows())
-        self.counter_label.setText(f"{total_shortcuts} / {self.model.rowCount()}")
+        self.counter_label.setText(f"{total_shortcuts} / {self.model.total()}")
     
     def make_default_if_none(self):
         # Get new ID from backend
@@ -257,31 +424,18 @@ class ShortcutManager(QWidget):
         
         response:BlueBirdResponse = self.flute.play(LizCommand(
             action='create_shortcuts',
-            args=[json.dumps(shortcut.__dict__)]
+            args=[shortcut.to_json()]
         ))
         
         if response.code != StateCode.OK:
             QMessageBox.critical(self, "Error", f"Failed to create shortcut: {'; '.join(response.results)}")
             return
 
-    def fetch_shortcuts(self, query: str) -> List[Shortcut]:
-        # This would be replaced with actual backend calls in a real implementation
-        response:BlueBirdResponse = self.flute.play(LizCommand(
-            action='get_shortcut_details',
-            args=[query]
-        ))
-        
-        if response.code != StateCode.OK:
-            QMessageBox.critical(self, "Error", f"Failed to retrieve shortcuts because {'; '.join(response.results)}")
-            return
-        
-        if len(response.results) == 0:
+    def fetch_shortcuts(self) -> List[Shortcut]:
+        if len(self.store) == 0:
             self.make_default_if_none()
-            return self.fetch_shortcuts("")
-
-        shortcuts = [Shortcut(**json.loads(content)) for content in response.results]
-
-        return shortcuts
+            self.store.sync()
+        return self.store.items()
     
     def show_context_menu(self, pos: QPoint):
         global_pos = self.table.viewport().mapToGlobal(pos)
@@ -294,7 +448,7 @@ class ShortcutManager(QWidget):
         menu = QMenu(self)
         
         edit_action = QAction("Edit", self)
-        edit_action.triggered.connect(lambda: self.open_edit_dialog(index))
+        edit_action.triggered.connect(lambda: self.edit_selected_rows(index))
         
         delete_action = QAction("Delete Selected", self)
         delete_action.triggered.connect(self.delete_selected_rows)
@@ -316,11 +470,21 @@ class ShortcutManager(QWidget):
         
         menu.exec_(global_pos)
 
+    def edit_selected_rows(self, idx):
+        """Edit the clicked row, or all the selected ones if it is part of a multi-row selection"""
+        items = self.get_selected_items()
+        if len(items) > 1 and self.table.selectionModel().isRowSelected(idx.row(), QModelIndex()):
+            self.open_bulk_edit_dialog(items)
+        else:
+            self.open_edit_dialog(idx)
+
     def open_edit_dialog(self, idx):
 
         source_index = self.proxy.mapToSource(idx)
         shortcut: Shortcut = self.model._data[source_index.row()]
         
+        self.edit_dialog.setWindowTitle("Edit Shortcut")
+        self.edit_dialog.preview_label.hide()
         self.edit_dialog.app_input.setText(shortcut.application)
         self.edit_dialog.desc_input.setText(shortcut.description)
         self.edit_dialog.command_input.setText(shortcut.shortcut)
@@ -329,12 +493,60 @@ class ShortcutManager(QWidget):
         
         if self.edit_dialog.exec_() == QDialog.Accepted:
             self.save_edit(shortcut.id, source_index.row())
+
+    def open_bulk_edit_dialog(self, items: List[Shortcut]):
+        """
+        Edit several shortcuts at once: fields they share are filled in, the others
+        are left empty; only the fields changed in the dialog are written
+        """
+        fields = [
+            (self.edit_dialog.app_input, "application"),
+            (self.edit_dialog.desc_input, "description"),
+            (self.edit_dialog.command_input, "shortcut"),
+            (self.edit_dialog.comment_input, "comment"),
+            (self.edit_dialog.hit_input, "hit_number"),
+        ]
+        shown = {}
+        for line_edit, name in fields:
+            values = {str(getattr(item, name)) for item in items}
+            shown[name] = values.pop() if len(values) == 1 else ""
+            line_edit.setText(shown[name])
+            line_edit.setPlaceholderText("" if shown[name] else "(multiple values)")
+
+        self.edit_dialog.setWindowTitle(f"Edit {len(items)} Shortcuts")
+        self.edit_dialog.preview_label.hide()
+        accepted = self.edit_dialog.exec_() == QDialog.Accepted
+        changed = {name: line_edit.text() for line_edit, name in fields if line_edit.text() != shown[name]}
+        for line_edit, _ in fields:
+            line_edit.setPlaceholderText("")
+        if not accepted or not changed:
+            return
+        if "hit_number" in changed:
+            try:
+                changed["hit_number"] = int(changed["hit_number"])
+            except ValueError:
+                QMessageBox.warning(self, "Invalid Input", "Hit count must be a number")
+                return
+        self.save_bulk_edit(items, changed)
     
+    def preview_shortcut(self):
+        """Show the keys the shortcut in the dialog would send, or why it can't be executed"""
+        response:BlueBirdResponse = self.flute.play(LizCommand(
+            action='compile_shortcut',
+            args=[self.edit_dialog.command_input.text()]
+        ))
+        if response.code == StateCode.OK:
+            self.edit_dialog.show_preview(", ".join(response.results) or "Sends nothing")
+        else:
+            self.edit_dialog.show_preview(f"Can't be executed: {'; '.join(response.results)}")
+
     def create_new_command(self):
         self.edit_dialog.app_input.clear()
         self.edit_dialog.desc_input.clear()
         self.edit_dialog.command_input.clear()
         self.edit_dialog.comment_input.clear()
+        self.edit_dialog.setWindowTitle("New Shortcut")
+        self.edit_dialog.preview_label.hide()
         self.edit_dialog.hit_input.setText("0")
         
         if self.edit_dialog.exec_() == QDialog.Accepted:
@@ -364,14 +576,31 @@ class ShortcutManager(QWidget):
         
         response:BlueBirdResponse = self.flute.play(LizCommand(
             action='update_shortcuts',
-            args=[json.dumps(shortcut.__dict__)]
+            args=[shortcut.to_json()]
         ))
         
         if response.code != StateCode.OK:
             QMessageBox.critical(self, "Error", f"Failed to update shortcut: {'; '.join(response.results)}")
             return
 
-        self.model.modify_row(row, shortcut)
+        # Updates the shared record, this table and the filter index through shortcutsChanged
+        self.store.sync()
+        self.need_fetchall = True
+
+    def save_bulk_edit(self, items: List[Shortcut], changed: Dict[str, object]):
+        """Write the changed fields to every item with one update_shortcuts call"""
+        updated = [replace(item, **changed) for item in items]
+        response:BlueBirdResponse = self.flute.play(LizCommand(
+            action='update_shortcuts',
+            args=[shortcut.to_json() for shortcut in updated]
+        ))
+
+        if response.code != StateCode.OK:
+            QMessageBox.critical(self, "Error", f"Failed to update shortcuts: {'; '.join(response.results)}")
+            return
+
+        # One dataChanged per run of updated rows, through shortcutsChanged
+        self.store.sync()
         self.need_fetchall = True
 
     def save_new_command(self):
@@ -411,7 +640,7 @@ class ShortcutManager(QWidget):
         
         response:BlueBirdResponse = self.flute.play(LizCommand(
             action='create_shortcuts',
-            args=[json.dumps(shortcut.__dict__)]
+            args=[shortcut.to_json()]
         ))
         
         
@@ -419,28 +648,28 @@ class ShortcutManager(QWidget):
             QMessageBox.critical(self, "Error", f"Failed to create shortcut: {'; '.join(response.results)}")
             return
         
-        self.model.add_item(shortcut)
+        self.store.sync()   # Adds the row through shortcutsChanged
         self.need_fetchall = True
         self.update_counter()
 
+    def get_selected_items(self) -> List[Shortcut]:
+        """The shortcuts of the selected rows, in table order"""
+        source_rows = sorted(self.proxy.mapToSource(proxy_index).row()
+                             for proxy_index in self.table.selectionModel().selectedRows())
+        return [self.model._data[row] for row in source_rows]
+
     def get_ids_of_selected_rows(self):
-        selected = self.table.selectionModel().selectedRows()
-        ids = []
-        if selected:
-            for proxy_index in selected:
-                # Remove from model using source index
-                source_index = self.proxy.mapToSource(proxy_index)
-                ids.append(self.model._data[source_index.row()].id)
-        return ids
+        return [item.id for item in self.get_selected_items()]
 
     def delete_selected_rows(self):
+        ids = self.get_ids_of_selected_rows()
+        if not ids:
+            return
 
-        selected = self.table.selectionModel().selectedRows()
-        
         reply = QMessageBox.question(
             self,
             "Confirm Delete",
-            f"Are you sure you want to delete the selected {len(selected)} shortcuts?",
+            f"Are you sure you want to delete the selected {len(ids)} shortcuts?",
             QMessageBox.Yes | QMessageBox.No
         )
         
@@ -449,24 +678,17 @@ class ShortcutManager(QWidget):
 
         response:BlueBirdResponse = self.flute.play(LizCommand(
             action='delete_shortcuts',
-            args=self.get_ids_of_selected_rows()
+            args=ids
         ))
         
-        
         if response.code != StateCode.OK:
             QMessageBox.critical(self, "Error", f"Failed to delete shortcuts: {'; '.join(response.results)}")
             return
-        
-        if selected:
-            for proxy_index in selected:
-                # Remove from model using source index
-                source_index = self.proxy.mapToSource(proxy_index)
 
-                self.model.beginRemoveRows(source_index.parent(), source_index.row(), source_index.row())
-                del self.model._data[source_index.row()]
-                self.model.endRemoveRows()
-            self.need_fetchall = True
-            self.update_counter()
+        # Removes the rows with AppTableModel.remove_ids, in runs, through shortcutsChanged
+        self.store.sync()
+        self.need_fetchall = True
+        self.update_counter()
     
     def export_selected_rows(self):
         
@@ -499,14 +721,24 @@ class ShortcutManager(QWidget):
         if not file_paths:
             return
 
-        response:BlueBirdResponse = self.flute.play(LizCommand(
-            action='import_shortcuts',
-            args=file_paths
-        ))
-        
+        self.importer = ShortcutImporter(self.flute, file_paths, self)
+        self.importer.finished.connect(self.on_import_finished)
+        self.importer.start()
+
+    def on_import_finished(self, response: BlueBirdResponse):
+        importer, self.importer = self.importer, None
+        # Cancelled imports keep what they added, so sync either way
+        self.store.sync()   # Patches this table and the launcher through shortcutsChanged
+        self.need_fetchall = True
+        self.update_counter()
+        if importer.cancelled:
+            return
         if response.code != StateCode.OK:
             QMessageBox.critical(self, "Error", f"Failed to import shortcuts: {'; '.join(response.results)}")
-        else:
-            self.model.reset_data(self.fetch_shortcuts(""))
-            self.need_fetchall = True
-            self.update_counter()
\ No newline at end of file
+        elif response.results:
+            # Imported, but their shortcuts don't compile; listed now rather than when executed
+            shown = response.results[:self.IMPORT_WARNINGS_SHOWN]
+            more = len(response.results) - len(shown)
+            QMessageBox.warning(self, "Invalid Shortcuts",
+                                f"{len(response.results)} imported shortcuts can't be executed:\n"
+                                + "\n".join(shown) + (f"\n... and {more} more" if more else ""))
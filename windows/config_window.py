@@ -6,10 +6,14 @@ from PySide6.QtWidgets import (
 from PySide6.QtCore import Qt
 
 from windows.base import RhythmItem
+from windows.logs import set_log_level
 import json
+import logging
 from bluebird import *
 from typing import List
 
+logger = logging.getLogger("liz.config")
+
 class ConfigOptionWidget(QWidget):
     def __init__(self, name: str, value: str, hint: str):
         super().__init__()
@@ -78,6 +82,8 @@ class ConfigWindow(QWidget):
         json_data = {item.name: item.value for item in self.options}
 
         json_data["interval_ms"] = int(json_data["interval_ms"])
+        json_data["search_debounce_ms"] = int(json_data["search_debounce_ms"])
+        json_data["frecency_half_life_days"] = float(json_data["frecency_half_life_days"])
 
         json_str = json.dumps(json_data)
         # This would be replaced with actual backend calls in a real implementation
@@ -88,7 +94,8 @@ class ConfigWindow(QWidget):
         
         if response.code != StateCode.OK:
             QMessageBox.critical(self, "Error", f"Failed to update rhythm because {'; '.join(response.results)}")
-        return
+            return
+        set_log_level(self.flute.get_log_level())
 
     def reset(self):
         for i, opt in enumerate(self.options):
@@ -116,6 +123,6 @@ class ConfigWindow(QWidget):
 
         options = [RhythmItem(**json.loads(content)) for content in response.results]
 
-        print(options)
+        logger.debug("Rhythm options: %s", options)
 
         return options
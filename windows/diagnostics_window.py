@@ -0,0 +1,89 @@
+from PySide6.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QPushButton,
+    QTableWidget, QTableWidgetItem, QHeaderView, QApplication,
+    QFileDialog, QMessageBox
+)
+from PySide6.QtCore import Qt
+
+from bluebird import *
+from windows.metrics import bluebird_summaries, dump_metrics, metrics
+
+
+class DiagnosticsWindow(QWidget):
+    """
+    Latency percentiles of the Python side (commands as played from Python, searches,
+    filtering, painting) next to the bluebird side (the commands alone), so a slowdown
+    can be pinned on one of them. The JSON dump is for bug reports.
+    """
+    COLUMNS = ["Side", "Name", "Count", "p50 (ms)", "p95 (ms)", "p99 (ms)", "Max (ms)"]
+
+    def __init__(self, parent, flute, on_close_callback=None):
+        super().__init__()
+        self.parent = parent
+        self.flute: Flute = flute
+        self.resize(parent.width(), parent.height())
+        self.setWindowTitle("Diagnostics")
+        self.setAttribute(Qt.WA_DeleteOnClose)
+        self.on_close_callback = on_close_callback
+
+        layout = QVBoxLayout(self)
+
+        # Top buttons
+        top_bar = QHBoxLayout()
+        self.refresh_btn = QPushButton("Refresh")
+        self.copy_btn = QPushButton("Copy JSON")
+        self.save_btn = QPushButton("Save JSON")
+        top_bar.addWidget(self.refresh_btn)
+        top_bar.addWidget(self.copy_btn)
+        top_bar.addWidget(self.save_btn)
+        layout.addLayout(top_bar)
+
+        self.table = QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.table.verticalHeader().setVisible(False)
+        self.table.horizontalHeader().setSectionResizeMode(1, QHeaderView.Stretch)
+        layout.addWidget(self.table)
+
+        self.refresh_btn.clicked.connect(self.refresh)
+        self.copy_btn.clicked.connect(self.copy_json)
+        self.save_btn.clicked.connect(self.save_json)
+        self.refresh()
+
+    def refresh(self):
+        rows = [("python", summary) for summary in metrics.summaries()]
+        rows += [("bluebird", summary) for summary in bluebird_summaries(self.flute)]
+
+        self.table.setRowCount(len(rows))
+        for row, (side, summary) in enumerate(rows):
+            self.table.setItem(row, 0, QTableWidgetItem(side))
+            self.table.setItem(row, 1, QTableWidgetItem(summary.name))
+            for column, value in enumerate(summary[1:], start=2):
+                item = QTableWidgetItem()
+                item.setData(Qt.DisplayRole, value if isinstance(value, int) else round(value, 2))
+                item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                self.table.setItem(row, column, item)
+
+    def copy_json(self):
+        QApplication.clipboard().setText(dump_metrics(self.flute))
+
+    def save_json(self):
+        file_path, _ = QFileDialog.getSaveFileName(
+            self,
+            "Save Diagnostics",
+            "liz_diagnostics.json",
+            "JSON Files (*.json)"
+        )
+        if not file_path:
+            return
+        try:
+            with open(file_path, "w", encoding="utf-8") as f:
+                f.write(dump_metrics(self.flute))
+        except OSError as e:
+            QMessageBox.critical(self, "Error", f"Failed to save diagnostics: {e}")
+
+    def closeEvent(self, event):
+        if self.on_close_callback:
+            self.on_close_callback()
+        return super().closeEvent(event)
@@ -0,0 +1,58 @@
+import json
+import queue
+import threading
+
+from bluebird import *
+from windows.signals import global_signal_bus
+
+
+class ShortcutExecutor:
+    """
+    Plays "execute" commands on a background thread, one at a time and in order.
+
+    The Rust side releases the GIL while it sends keys, so the GUI and searches keep
+    running. Results are reported through global_signal_bus, whose receivers live on
+    the GUI thread.
+    """
+
+    def __init__(self, flute: Flute):
+        self.flute = flute
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self._generation = 0    # Bumped by cancel() to drop already queued ids
+        self._thread = threading.Thread(target=self._run, name="liz-executor", daemon=True)
+        self._thread.start()
+
+    def submit(self, shortcut_id: str):
+        # The Flute's cancel count now: a cancel played before the execute starts still stops it
+        self._queue.put((self._generation, self.flute.get_execute_cancels(), shortcut_id))
+
+    def cancel(self):
+        """Drop the queued shortcuts and stop the one being executed"""
+        self._generation += 1
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+        self.flute.play(LizCommand("cancel_execute", []))
+
+    def shutdown(self):
+        self.cancel()
+        self._queue.put(None)
+        self._thread.join(timeout=1)
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            generation, cancels, shortcut_id = job
+            if generation != self._generation:
+                continue
+
+            resp: BlueBirdResponse = self.flute.play(LizCommand("execute", [shortcut_id, str(cancels)]))
+            if resp.code != StateCode.OK:
+                global_signal_bus.executeFailed.emit(shortcut_id, "; ".join(resp.results))
+                continue
+            hit_number = json.loads(resp.results[0])["hit_number"]
+            global_signal_bus.shortcutExecuted.emit(shortcut_id, hit_number, float(resp.results[1]))
@@ -0,0 +1,138 @@
+from typing import Dict, List, Optional, Sequence
+
+from PySide6.QtCore import QAbstractItemModel, QAbstractProxyModel, QModelIndex
+
+from windows.metrics import metrics
+from windows.search_result import SearchResult
+
+
+class AppFilterProxy(QAbstractProxyModel):
+    """
+    Shows the rows of the latest SearchResult in rank order.
+    The row mapping is precomputed per search from the result's ids and the source's
+    row_of, so it costs as many lookups as there are matches, and filtering and
+    sorting never call back into Python per row.
+    """
+    METRIC = "filter apply"     # Name the apply_result times are recorded under
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._result = SearchResult("", [])
+        self._source_rows: Sequence[int] = []   # proxy row -> source row
+        self._proxy_rows: Optional[Dict[int, int]] = {}   # source row -> proxy row, None if all shown in order
+        self._pending = []                  # (persistent index, shortcut id) during a relayout
+
+    def setSourceModel(self, model: QAbstractItemModel):
+        super().setSourceModel(model)
+        model.modelAboutToBeReset.connect(self.beginResetModel)
+        model.modelReset.connect(self._on_source_reset)
+        model.rowsAboutToBeInserted.connect(self._begin_relayout)
+        model.rowsInserted.connect(self._end_relayout)
+        model.rowsAboutToBeRemoved.connect(self._begin_relayout)
+        model.rowsRemoved.connect(self._end_relayout)
+        model.layoutAboutToBeChanged.connect(self._begin_relayout)
+        model.layoutChanged.connect(self._end_relayout)
+        model.dataChanged.connect(self._on_source_data_changed)
+        self.apply_result(self._result)
+
+    def _on_source_reset(self):
+        # Keep showing the last result for the new rows until a fresh one arrives
+        self._remap()
+        self.endResetModel()
+
+    def apply_result(self, result: SearchResult):
+        with metrics.timed(self.METRIC):    # Includes the relayout of the attached views
+            self._result = result
+            self._begin_relayout()
+            self._end_relayout()
+
+    def _shown_rows(self) -> List[int]:
+        """Source rows to show, in order"""
+        return [row for row in map(self.sourceModel().row_of, self._result.ids) if row is not None]
+
+    def _remap(self):
+        self._source_rows = self._shown_rows()
+        self._proxy_rows = {source_row: proxy_row for proxy_row, source_row in enumerate(self._source_rows)}
+
+    def result(self) -> SearchResult:
+        return self._result
+
+    def move_up(self, shortcut_id: str):
+        """
+        The shortcut moved up in the shown result (see SearchResult.promote), follow
+        with a single row move instead of mapping every row again
+        """
+        source_row = self.sourceModel().row_of(shortcut_id)
+        row = self._proxy_rows.get(source_row)
+        if row is None:
+            return
+        items = self.sourceModel().items()
+        rank = self._result.rank
+        new_row = row
+        while new_row > 0 and rank[items[self._source_rows[new_row - 1]].id] > rank[shortcut_id]:
+            new_row -= 1
+        if new_row == row:
+            return
+
+        root = QModelIndex()
+        self.beginMoveRows(root, row, row, root, new_row)
+        self._source_rows.insert(new_row, self._source_rows.pop(row))
+        for proxy_row in range(new_row, row + 1):
+            self._proxy_rows[self._source_rows[proxy_row]] = proxy_row
+        self.endMoveRows()
+
+    def _begin_relayout(self, *args):
+        # Remember persistent indexes (selection, current row) by shortcut id,
+        # source rows may shift before _end_relayout runs
+        self.layoutAboutToBeChanged.emit()
+        items = self.sourceModel().items()
+        self._pending = [(index, items[self._source_rows[index.row()]].id)
+                         for index in self.persistentIndexList()]
+
+    def _end_relayout(self, *args):
+        self._remap()
+        source = self.sourceModel()
+        old_indexes = [index for index, _ in self._pending]
+        new_indexes = []
+        for index, shortcut_id in self._pending:
+            row = source.row_of(shortcut_id)
+            new_indexes.append(QModelIndex() if row is None else self.mapFromSource(source.index(row, index.column())))
+        self._pending = []
+        self.changePersistentIndexList(old_indexes, new_indexes)
+        self.layoutChanged.emit()
+
+    def _on_source_data_changed(self, top_left, bottom_right, roles=[]):
+        for source_row in range(top_left.row(), bottom_right.row() + 1):
+            proxy_index = self.mapFromSource(self.sourceModel().index(source_row, 0))
+            if proxy_index.isValid():
+                row = proxy_index.row()
+                self.dataChanged.emit(self.index(row, top_left.column()), self.index(row, bottom_right.column()), roles)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._source_rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else 1
+
+    def index(self, row, column=0, parent=QModelIndex()):
+        if parent.isValid() or not (0 <= row < len(self._source_rows)) or not (0 <= column < self.columnCount()):
+            return QModelIndex()
+        return self.createIndex(row, column)
+
+    def parent(self, index=QModelIndex()):
+        return QModelIndex()
+
+    def mapToSource(self, proxy_index):
+        if not proxy_index.isValid() or proxy_index.row() >= len(self._source_rows):
+            return QModelIndex()
+        return self.sourceModel().index(self._source_rows[proxy_index.row()], proxy_index.column())
+
+    def mapFromSource(self, source_index):
+        if not source_index.isValid():
+            return QModelIndex()
+        proxy_row = source_index.row()
+        if self._proxy_rows is not None:
+            proxy_row = self._proxy_rows.get(proxy_row)
+        if proxy_row is None or proxy_row >= len(self._source_rows):
+            return QModelIndex()
+        return self.createIndex(proxy_row, source_index.column())
@@ -0,0 +1,76 @@
+import threading
+from typing import List
+
+from PySide6.QtCore import QObject, Qt, QTimer, Signal
+from PySide6.QtWidgets import QProgressDialog, QWidget
+
+from bluebird import *
+
+
+class ShortcutImporter(QObject):
+    """
+    Plays an "import_shortcuts" command on a background thread, with its progress in a
+    QProgressDialog whose Cancel button stops the import.
+
+    The Rust side parses the files in parallel without the GIL and adds their shortcuts
+    batch by batch, so the GUI keeps running; the progress is polled from the Flute.
+    finished is delivered on the GUI thread once the command returns.
+    """
+    finished = Signal(object)   # BlueBirdResponse
+    _done = Signal(object)
+
+    POLL_MS = 100
+
+    def __init__(self, flute: Flute, paths: List[str], parent: QWidget):
+        super().__init__(parent)
+        self.flute = flute
+        self.paths = paths
+        self.cancelled = False
+
+        self._dialog = QProgressDialog("Reading files...", "Cancel", 0, 0, parent)
+        self._dialog.setWindowTitle("Import Shortcuts")
+        self._dialog.setWindowModality(Qt.WindowModal)
+        self._dialog.setMinimumDuration(300)    # Small imports finish without a dialog
+        self._dialog.setAutoClose(False)
+        self._dialog.setAutoReset(False)
+        self._dialog.canceled.connect(self.cancel)
+
+        self._timer = QTimer(self)
+        self._timer.setInterval(self.POLL_MS)
+        self._timer.timeout.connect(self._poll)
+        self._done.connect(self._on_done)
+        self._thread = threading.Thread(target=self._run, name="liz-importer", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        self._timer.start()
+
+    def cancel(self):
+        """Stop parsing, the shortcuts imported so far are kept"""
+        self.cancelled = True
+        self._dialog.setLabelText("Cancelling...")
+        self.flute.play(LizCommand("cancel_import", []))
+
+    def _run(self):
+        response = self.flute.play(LizCommand("import_shortcuts", self.paths))
+        try:
+            self._done.emit(response)
+        except RuntimeError:
+            pass    # The window was closed meanwhile, which cancelled the import
+
+    def _poll(self):
+        if self.cancelled:
+            return
+        files_done, files_total, read, added = self.flute.get_import_progress()
+        if files_total:
+            self._dialog.setMaximum(files_total)
+            self._dialog.setValue(files_done)
+        self._dialog.setLabelText(f"{files_done} / {files_total} files, "
+                                  f"{added} new of {read} shortcuts read")
+
+    def _on_done(self, response: BlueBirdResponse):
+        self._timer.stop()
+        self._dialog.canceled.disconnect(self.cancel)   # Closing the dialog emits canceled
+        self._dialog.close()
+        self.finished.emit(response)
+        self.deleteLater()
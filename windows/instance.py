@@ -0,0 +1,81 @@
+import json
+import logging
+from typing import List, Optional
+
+from PySide6.QtCore import QObject, Signal
+from PySide6.QtNetwork import QLocalServer, QLocalSocket
+
+from windows.remote import CONNECT_TIMEOUT_MS, ERROR, SERVER_NAME
+
+logger = logging.getLogger("liz.instance")
+
+
+class RemoteRequest:
+    """A request read from a client, answered once with reply()"""
+
+    def __init__(self, action: str, args: List[str], socket: Optional[QLocalSocket]):
+        self.action = action
+        self.args = args
+        self._socket = socket   # None for a request of this very process
+
+    def reply(self, code: str, results: list):
+        if self._socket is None:
+            logger.info("%s: %s %s", self.action, code, results)
+            return
+        try:
+            if self._socket.state() == QLocalSocket.ConnectedState:
+                self._socket.write(json.dumps({"code": code, "results": results}).encode() + b"\n")
+                self._socket.disconnectFromServer()
+        except RuntimeError:
+            pass    # The client went away before the reply, its socket is deleted
+        self._socket = None
+
+
+class InstanceServer(QObject):
+    """
+    Listens for the commands of later launches. Every complete request line is
+    emitted as a RemoteRequest on the GUI thread, the receiver replies to it.
+    """
+    requested = Signal(object)  # RemoteRequest
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._server = QLocalServer(self)
+        self._server.setSocketOptions(QLocalServer.UserAccessOption)
+        self._server.newConnection.connect(self._on_new_connection)
+
+    def listen(self) -> bool:
+        """False when another instance is already listening"""
+        if self._server.listen(SERVER_NAME):
+            return True
+        probe = QLocalSocket()
+        probe.connectToServer(SERVER_NAME)
+        if probe.waitForConnected(CONNECT_TIMEOUT_MS):
+            probe.abort()
+            return False
+        # A socket file left behind by a crashed instance, nobody answered on it
+        QLocalServer.removeServer(SERVER_NAME)
+        if not self._server.listen(SERVER_NAME):
+            logger.error("Failed to listen on %s: %s", SERVER_NAME, self._server.errorString())
+        return True
+
+    def close(self):
+        self._server.close()
+
+    def _on_new_connection(self):
+        while self._server.hasPendingConnections():
+            socket = self._server.nextPendingConnection()
+            socket.readyRead.connect(lambda socket=socket: self._on_ready_read(socket))
+            socket.disconnected.connect(socket.deleteLater)
+
+    def _on_ready_read(self, socket: QLocalSocket):
+        if not socket.canReadLine():
+            return  # Wait for the rest of the line
+        line = socket.readLine().data()
+        try:
+            request = json.loads(line)
+            action, args = str(request["action"]), [str(arg) for arg in request.get("args", [])]
+        except (ValueError, KeyError, TypeError) as e:
+            RemoteRequest("", [], socket).reply(ERROR, [f"Invalid request: {e}"])
+            return
+        self.requested.emit(RemoteRequest(action, args, socket))
@@ -0,0 +1,110 @@
+import atexit
+import logging
+import logging.handlers
+import queue
+import sys
+import time
+from pathlib import Path
+
+from bluebird import *
+from windows.metrics import metrics
+
+LOG_MAX_BYTES = 1024 * 1024     # Rotated at this size
+LOG_BACKUPS = 3                 # liz_runtime.log.1 ... .3 are kept
+LOG_FORMAT = "%(asctime)s %(levelname)-7s %(threadName)s %(name)s: %(message)s"
+
+LEVELS = {"debug": logging.DEBUG, "info": logging.INFO, "warning": logging.WARNING, "error": logging.ERROR}
+
+logger = logging.getLogger("liz")
+command_logger = logging.getLogger("liz.flute")
+
+
+class LoggerStream:
+    """
+    Stands in for sys.stdout/sys.stderr: every complete line written is a record of
+    logger, so the prints and tracebacks go through the queue like the rest.
+    """
+
+    def __init__(self, target: logging.Logger, level: int):
+        self.target = target
+        self.level = level
+        self._partial = ""
+
+    def write(self, data: str) -> int:
+        lines = (self._partial + data).split("\n")
+        self._partial = lines.pop()
+        for line in lines:
+            if line:
+                self.target.log(self.level, line)
+        return len(data)
+
+    def flush(self):
+        pass    # Partial lines wait for their end, the writer thread does the IO
+
+    def isatty(self) -> bool:
+        return False
+
+
+def start_logging(log_path: Path, level: str = "info") -> logging.handlers.QueueListener:
+    """
+    Log to log_path from a writer thread: records are queued by the threads logging
+    them, formatted and written in batches by the listener, and the file is rotated
+    by size instead of being cleared at every start. stdout and stderr are redirected
+    into the log.
+    """
+    file_handler = logging.handlers.RotatingFileHandler(log_path, maxBytes=LOG_MAX_BYTES,
+                                                        backupCount=LOG_BACKUPS, encoding="utf-8")
+    file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, file_handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)  # Writes what is still queued
+
+    # A failing write would print to stderr, which is logged again
+    logging.raiseExceptions = False
+    root = logging.getLogger()
+    root.handlers[:] = [logging.handlers.QueueHandler(log_queue)]
+    set_log_level(level)
+
+    sys.stdout = LoggerStream(logging.getLogger("stdout"), logging.INFO)
+    sys.stderr = LoggerStream(logging.getLogger("stderr"), logging.ERROR)
+    return listener
+
+
+def set_log_level(level: str):
+    """Level by name from rhythm.toml, info when unknown"""
+    root = logging.getLogger()
+    if level.lower() not in LEVELS:
+        root.setLevel(logging.INFO)
+        logger.warning("Unknown log_level '%s', using info", level)
+        return
+    root.setLevel(LEVELS[level.lower()])
+
+
+class LoggedFlute:
+    """
+    A Flute whose play() times every command into the "play <action>" metrics, and
+    writes a record per command to the "liz.flute" logger, carrying action, code and
+    elapsed_ms as record attributes. Everything else is the Flute's own.
+    """
+
+    def __init__(self, flute: Flute):
+        self._flute = flute
+
+    def __getattr__(self, name):
+        return getattr(self._flute, name)
+
+    def play(self, cmd: LizCommand) -> BlueBirdResponse:
+        start = time.perf_counter()
+        response = self._flute.play(cmd)
+        elapsed = time.perf_counter() - start
+        metrics.record(f"play {cmd.action}", elapsed)
+        if not command_logger.isEnabledFor(logging.INFO):
+            return response
+        elapsed_ms = elapsed * 1000
+        code = "OK" if response.code == StateCode.OK else "ERR"
+        command_logger.info("play action=%s args=%d code=%s elapsed_ms=%.2f",
+                            cmd.action, len(cmd.args), code, elapsed_ms,
+                            extra={"action": cmd.action, "code": code, "elapsed_ms": elapsed_ms})
+        return response
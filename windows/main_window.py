@@ -1,20 +1,33 @@
 from PySide6.QtWidgets import (QWidget, QVBoxLayout, QPushButton, 
                               QLineEdit, QListView, QApplication,
                               QStyledItemDelegate, QStyleOptionViewItem, QStyle)
-from PySide6.QtCore import QAbstractListModel, QModelIndex, Qt, QSortFilterProxyModel, QTimer, QPoint, QRect, QEvent
-from PySide6.QtGui import QPainter, QFont, QTextOption, QPainterPath
-from notifypy import Notify
-from rapidfuzz.fuzz import partial_ratio
+from PySide6.QtCore import (QAbstractListModel, QModelIndex, Qt, QTimer, QPoint, QPointF,
+                            QRect, QSize, QEvent)
+from PySide6.QtGui import QPainter, QFont, QTextOption, QPainterPath, QStaticText, QTransform
 from bluebird import *
 from windows.signals import global_signal_bus
 
-import json
+from collections import OrderedDict
 from dataclasses import dataclass, field
-from typing import List
-from windows.base import Shortcut
+from typing import Dict, List, Optional
+from windows.base import RowMap, Shortcut, ShortcutChanges, apply_shortcut_changes
+from windows.filter_proxy import AppFilterProxy
+from windows.metrics import metrics
+from windows.search_index import SearchIndex
+from windows.search_engine import SearchEngine
+from windows.search_worker import SearchWorker
 
 
 class AppItemDelegate(QStyledItemDelegate):
+    """
+    Paints a launcher row: "application> description" on the left, the shortcut on the right.
+
+    The texts are laid out once into QStaticText and cached per shortcut and width, the
+    selection shape once per row size. Every row has the height of the first one
+    measured, so together with uniformItemSizes the view never measures rows again.
+    """
+    CACHE_SIZE = 512    # Laid out rows kept, a few screens worth
+
     def __init__(self):
         super().__init__()
         self.text_option_left = QTextOption(Qt.AlignLeft | Qt.AlignVCenter)
@@ -22,12 +35,67 @@ class AppItemDelegate(QStyledItemDelegate):
         self.text_option_right = QTextOption(Qt.AlignRight | Qt.AlignVCenter)
         self.text_option_right.setWrapMode(QTextOption.WordWrap)
 
+        self._font: Optional[QFont] = None
+        self._row_height = 0
+        # (shortcut id, width) -> (source strings, left text, right text)
+        self._texts: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._selection_paths: Dict[QSize, QPainterPath] = {}
+
+    def _check_font(self, font: QFont):
+        if font != self._font:
+            self._font = QFont(font)
+            self._row_height = 0
+            self._texts.clear()
+
+    def sizeHint(self, option: QStyleOptionViewItem, index):
+        self._check_font(option.font)
+        if not self._row_height:
+            self._row_height = super().sizeHint(option, index).height()
+        return QSize(option.rect.width(), self._row_height)
+
+    def _static_text(self, text: str, width: int, text_option: QTextOption) -> QStaticText:
+        static_text = QStaticText(text)
+        static_text.setTextFormat(Qt.PlainText)
+        static_text.setTextOption(text_option)
+        static_text.setTextWidth(width)
+        static_text.prepare(QTransform(), self._font)
+        return static_text
+
+    def _layout(self, item: Shortcut, width: int) -> tuple:
+        key = (item.id, width)
+        sources = (item.application, item.description, item.shortcut)
+        cached = self._texts.get(key)
+        if cached is not None and all(a is b for a, b in zip(cached[0], sources)):
+            self._texts.move_to_end(key)
+            return cached
+
+        left_width = int(width * 0.8)
+        cached = (
+            sources,
+            self._static_text(f"{item.application}> {item.description}", left_width, self.text_option_left),
+            self._static_text(item.shortcut, width - left_width, self.text_option_right),
+        )
+        self._texts[key] = cached
+        if len(self._texts) > self.CACHE_SIZE:
+            self._texts.popitem(last=False)
+        return cached
+
+    def _selection_path(self, size: QSize) -> QPainterPath:
+        path = self._selection_paths.get(size)
+        if path is None:
+            path = QPainterPath()
+            path.addRoundedRect(QRect(QPoint(0, 0), size).adjusted(2, 2, -2, -2), 8, 8)
+            self._selection_paths[size] = path
+        return path
+
     def paint(self, painter: QPainter, option: QStyleOptionViewItem, index):
         item = index.model().data(index, Qt.UserRole)
         if item is None:
             return super().paint(painter, option, index)
 
+        self._check_font(option.font)
         painter.save()
+        painter.setFont(self._font)     # The one the texts were prepared for
 
         # Draw selection background
         # if option.state & QStyle.State_MouseOver :
@@ -36,28 +104,37 @@ class AppItemDelegate(QStyledItemDelegate):
         #     painter.setRenderHint(QPainter.Antialiasing)
         #     painter.fillPath(path, option.palette.highlight())
         if option.state & QStyle.State_Selected:
-            path = QPainterPath()
-            path.addRoundedRect(option.rect.adjusted(2, 2, -2, -2), 8, 8)
             painter.setRenderHint(QPainter.Antialiasing)
-            painter.fillPath(path, option.palette.highlight())
+            painter.translate(option.rect.topLeft())
+            painter.fillPath(self._selection_path(option.rect.size()), option.palette.highlight())
+            painter.translate(-option.rect.topLeft())
 
         rect = option.rect.adjusted(5, 5, -5, -5)
+        _, left, right = self._layout(item, rect.width())
+        center_y = rect.top() + rect.height() / 2
 
-        left_rect = QRect(rect.left(), rect.top(), rect.width() * 0.8, rect.height())
         painter.setPen(option.palette.text().color())
-        painter.drawText(left_rect, f"{item.application}> {item.description}", self.text_option_left)
+        painter.drawStaticText(QPointF(rect.left(), center_y - left.size().height() / 2), left)
 
-        right_rect = QRect(left_rect.right(), rect.top(), rect.width() * 0.2, rect.height())
         painter.setPen(Qt.darkGray)
-        painter.drawText(right_rect, item.shortcut, self.text_option_right)
+        painter.drawStaticText(QPointF(rect.left() + left.textWidth(), center_y - right.size().height() / 2), right)
 
         painter.restore()
 
 
+class AppListView(QListView):
+    """The launcher list, timing each repaint of its rows as a whole (metric "paint list")"""
+
+    def paintEvent(self, event):
+        with metrics.timed("paint list"):
+            super().paintEvent(event)
+
+
 class AppListModel(QAbstractListModel):
     def __init__(self, items: List[Shortcut] = None):
         super().__init__()
         self._items = items or []
+        self._rows = RowMap(self)
 
     def rowCount(self, parent=QModelIndex()):
         return len(self._items)
@@ -79,40 +156,14 @@ class AppListModel(QAbstractListModel):
         self._items = items
         self.endResetModel()
 
-class AppFilterProxy(QSortFilterProxyModel):
-    def __init__(self):
-        super().__init__()
-        self._filter = ""
-
-    def setFilterString(self, text: str):
-        self._filter = text.lower()
-        self.invalidateFilter()
-        self.sort(0)
+    def items(self) -> List[Shortcut]:
+        return self._items
 
-    def filterAcceptsRow(self, source_row, source_parent):
-        if not self._filter:
-            return True
+    def row_of(self, shortcut_id: str) -> Optional[int]:
+        return self._rows.get(shortcut_id)
 
-        model = self.sourceModel()
-        index = model.index(source_row, 0, source_parent)
-        item = model.data(index, Qt.UserRole)
-        if not item:
-            return False
-
-        # Fuzzy matching score
-        score = partial_ratio(self._filter, item.searchable_text.lower())
-        return score > 80  # You can adjust this threshold
-
-    def lessThan(self, left_index, right_index):
-        model = self.sourceModel()
-        left_item = model.data(left_index, Qt.UserRole)
-        right_item = model.data(right_index, Qt.UserRole)
-
-        if not left_item or not right_item:
-            return False
-
-        # Sort descending by hit count
-        return left_item.hit_number > right_item.hit_number
+    def apply_changes(self, changes: ShortcutChanges):
+        apply_shortcut_changes(self, self._items, changes)
 
 
 class MainWindow(QWidget):
@@ -124,29 +175,25 @@ class MainWindow(QWidget):
         self.select_first_item()
         
     def fetch_data(self) -> List[Shortcut]:
-        cmd = LizCommand(action="get_shortcut_details", args=[])
-        resp: BlueBirdResponse = self.parent.flute.play(cmd)
-        if (resp.code != StateCode.OK):
-            self.show_notification("Liz Error", f"{resp.code}: {resp.results}")
-            return []
-        return [
-            Shortcut(**json.loads(item)) for item in resp.results
-        ]
+        return self.parent.store.items()
 
     def setup_sc_items_view(self):
         items = self.fetch_data()
+        self.search_worker = SearchWorker(SearchEngine(SearchIndex(items)),
+                                          self.parent.flute.get_search_debounce_ms(), self)
         self.model = AppListModel(items)
         self.proxy = AppFilterProxy()
         self.proxy.setSourceModel(self.model)
-        self.proxy.setDynamicSortFilter(True)
+        self.proxy.apply_result(self.search_worker.search_blocking(""))
 
-        self.view = QListView()
+        self.view = AppListView()
         self.view.setModel(self.proxy)
         self.view.setItemDelegate(AppItemDelegate())
         self.view.setMouseTracking(True)
 
         self.view.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy().ScrollBarAlwaysOff)
         self.view.setResizeMode(QListView.Adjust)  # Object inside to adjust to view's size
+        self.view.setUniformItemSizes(True)  # Rows are never measured one by one, see AppItemDelegate
         self.view.setSelectionMode(QListView.SingleSelection)
         self.view.setSelectionBehavior(QListView.SelectRows)
         self.view.setFocusPolicy(Qt.StrongFocus)  # Enables keyboard focus
@@ -169,7 +216,8 @@ class MainWindow(QWidget):
         layout.addWidget(self.view)
         
     def setup_connections(self):
-        self.search_bar.textChanged.connect(self.proxy.setFilterString)
+        self.search_bar.textChanged.connect(self.search_worker.request)
+        self.search_worker.finished.connect(self.proxy.apply_result)
         self.search_bar.installEventFilter(self)
 
         self.view.clicked.connect(self.on_item_clicked)
@@ -177,6 +225,9 @@ class MainWindow(QWidget):
 
         global_signal_bus.aboutToHide.connect(self.handle_about_to_hide)
         global_signal_bus.fetchAll.connect(self.handle_fetch_all)
+        global_signal_bus.shortcutsChanged.connect(self.handle_shortcuts_changed)
+        global_signal_bus.shortcutExecuted.connect(self.handle_shortcut_executed)
+        global_signal_bus.executeFailed.connect(self.handle_execute_failed)
 
     def select_first_item(self):
         # Select the first item
@@ -189,7 +240,17 @@ class MainWindow(QWidget):
         self.select_first_item()
 
     def handle_fetch_all(self):
-        self.model.reset_data(self.fetch_data())
+        self.parent.store.sync()    # Reports back through handle_shortcuts_changed
+
+    def handle_shortcuts_changed(self, changes: ShortcutChanges):
+        self.model.apply_changes(changes)
+        self.search_worker.apply_changes(changes)
+
+    def flush_search(self):
+        """Apply the pending query right away, e.g. when Enter beats the debounce"""
+        if self.search_worker.is_pending():
+            self.proxy.apply_result(self.search_worker.search_blocking(self.search_bar.text()))
+            self.select_first_item()
 
     def on_item_clicked(self, proxy_index):
         self.view.setCurrentIndex(proxy_index)
@@ -198,20 +259,22 @@ class MainWindow(QWidget):
         source_index = self.proxy.mapToSource(proxy_index)
         item = self.model.data(source_index, Qt.UserRole)
 
-        def play_command(proxy, item):
-            cmd = LizCommand(action="execute", args=[item.id])
-            resp: BlueBirdResponse = self.parent.flute.play(cmd)
-            if resp.code != StateCode.OK:
-                show_notification("Failed to Execute", resp.results)
-                return
-            item.hit_number = Shortcut(**json.loads(resp.results[0])).hit_number
-
-            proxy.invalidate()  # Reapply filter and sorting
-            proxy.sort(0)
-
         if item:
             self.parent.hide()
-            QTimer.singleShot(0, lambda: play_command(self.proxy, item))
+            # Let the hide settle before the keys are sent to the previous window
+            QTimer.singleShot(0, lambda: self.parent.executor.submit(item.id))
+
+    def handle_shortcut_executed(self, shortcut_id: str, hit_number: int, frecency: float):
+        item = self.parent.store.get(shortcut_id)
+        if item is None:
+            return
+        item.hit_number = hit_number
+        item.frecency = frecency
+        self.search_worker.note_hit(shortcut_id, frecency, self.proxy.result())
+        self.proxy.move_up(shortcut_id)
+
+    def handle_execute_failed(self, shortcut_id: str, message: str):
+        self.show_notification("Failed to Execute", message)
 
     def eventFilter(self, obj, event):
         if obj == self.search_bar and event.type() == QEvent.KeyPress:
@@ -230,6 +293,7 @@ class MainWindow(QWidget):
                 return True
 
             elif key in (Qt.Key_Return, Qt.Key_Enter):
+                self.flush_search()
                 # Optional: simulate click
                 self.on_item_doubleclicked(self.view.currentIndex())
                 return True
@@ -239,6 +303,7 @@ class MainWindow(QWidget):
 
     def show_notification(self, title, text):
         """System notification"""
+        from notifypy import Notify     # Slow to import and only needed on failures
         notification = Notify()
         notification.title = title
         notification.message = text
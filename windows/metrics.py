@@ -0,0 +1,113 @@
+import json
+import math
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, NamedTuple
+
+from bluebird import *
+
+# The same buckets as bluebird's metrics.rs: the first one ends at 1 µs, every next one is
+# 10% wider, so a percentile is off by less than 10% whatever the number of samples
+_MIN_US = 1.0
+_GROWTH = 1.1
+_LOG_GROWTH = math.log(_GROWTH)
+_BUCKETS = 210
+
+
+class TimingSummary(NamedTuple):
+    name: str
+    count: int
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    max_ms: float
+
+
+class LatencyHistogram:
+    """Latencies in log-scale buckets: constant memory and time whatever the number of samples"""
+
+    def __init__(self):
+        self.counts = [0] * _BUCKETS
+        self.count = 0
+        self.max_us = 0.0
+
+    def record(self, seconds: float):
+        us = seconds * 1e6
+        bucket = 0 if us < _MIN_US else int(math.log(us / _MIN_US) / _LOG_GROWTH) + 1
+        self.counts[min(bucket, _BUCKETS - 1)] += 1
+        self.count += 1
+        if us > self.max_us:
+            self.max_us = us
+
+    def percentile(self, p: float) -> float:
+        """The latency in ms under which a fraction p of the samples fall"""
+        rank = max(math.ceil(p * self.count), 1)
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                # Upper edge of the bucket, but never above what was measured
+                return min(_MIN_US * _GROWTH ** i, self.max_us) / 1000
+        return self.max_us / 1000
+
+    def summary(self, name: str) -> TimingSummary:
+        return TimingSummary(name, self.count, self.percentile(0.5), self.percentile(0.95),
+                             self.percentile(0.99), self.max_us / 1000)
+
+
+class Metrics:
+    """
+    Latency histograms of the Python side by name, e.g. "play execute" or "paint list".
+    Recording takes a lock, timings come from any thread.
+    """
+
+    def __init__(self):
+        self._histograms: Dict[str, LatencyHistogram] = {}
+        self._lock = threading.Lock()
+
+    def record(self, name: str, seconds: float):
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = LatencyHistogram()
+            histogram.record(seconds)
+
+    @contextmanager
+    def timed(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def summaries(self) -> List[TimingSummary]:
+        with self._lock:
+            return [histogram.summary(name) for name, histogram in sorted(self._histograms.items())]
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+
+metrics = Metrics()
+
+
+def bluebird_summaries(flute: Flute) -> List[TimingSummary]:
+    """The time bluebird spent in each command, without the Python call around it"""
+    return [TimingSummary(*timing) for timing in flute.get_command_timings()]
+
+
+def _as_dict(summary: TimingSummary) -> dict:
+    return {field: round(value, 3) if isinstance(value, float) else value
+            for field, value in summary._asdict().items()}
+
+
+def dump_metrics(flute: Flute) -> str:
+    """Both sides as JSON, to attach to a bug report"""
+    return json.dumps({
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": [_as_dict(summary) for summary in metrics.summaries()],
+        "bluebird": [_as_dict(summary) for summary in bluebird_summaries(flute)],
+    }, indent=2)
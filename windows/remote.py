@@ -0,0 +1,145 @@
+import getpass
+import json
+import os
+import socket
+import stat
+import sys
+import tempfile
+from typing import List, Optional, Tuple
+
+# One instance per user owns the Flute, later launches forward their command to it
+# through InstanceServer. Requests and replies are single JSON lines shaped like
+# LizCommand and BlueBirdResponse:
+#   {"action": "search", "args": ["chrome"]} -> {"code": "OK", "results": [...]}
+#
+# This side imports no Qt, so forwarding a command costs a Python start and a round trip.
+# On Windows the server is a named pipe, reached with QLocalSocket instead.
+
+
+def _runtime_dir() -> str:
+    """
+    Where the socket goes: $XDG_RUNTIME_DIR, else a directory of the temp dir only
+    this user can enter. A socket right in the shared /tmp could be put there first
+    by anybody, to read the commands of later launches or answer them.
+    """
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir and os.path.isdir(runtime_dir):
+        return runtime_dir
+    path = os.path.join(tempfile.gettempdir(), f"liz-desktop-{os.getuid()}")
+    try:
+        os.mkdir(path, 0o700)
+    except FileExistsError:
+        pass
+    info = os.lstat(path)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid():
+        sys.exit(f"{path} is not a directory of this user, remove it and start again")
+    if stat.S_IMODE(info.st_mode) != 0o700:
+        os.chmod(path, 0o700)
+    return path
+
+
+if os.name == "posix":
+    SERVER_NAME = os.path.join(_runtime_dir(), "liz-desktop.sock")
+else:
+    SERVER_NAME = f"liz-desktop-{getpass.getuser()}"
+
+ACTIONS = ["show", "search", "execute", "import", "diagnostics"]
+
+CONNECT_TIMEOUT_MS = 200
+REPLY_TIMEOUT_MS = 5000
+
+OK = "OK"
+ERROR = "ERR"
+
+
+def _request_line(action: str, args: List[str]) -> bytes:
+    return json.dumps({"action": action, "args": args}).encode() + b"\n"
+
+
+def _send_unix(line: bytes, reply_timeout_ms: int) -> Optional[bytes]:
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        client.settimeout(CONNECT_TIMEOUT_MS / 1000)
+        try:
+            client.connect(SERVER_NAME)
+        except OSError:
+            return None
+        client.settimeout(reply_timeout_ms / 1000)
+        client.sendall(line)
+        data = b""
+        while not data.endswith(b"\n"):
+            chunk = client.recv(65536)
+            if not chunk:
+                break
+            data += chunk
+        return data
+    finally:
+        client.close()
+
+
+def _send_qt(line: bytes, reply_timeout_ms: int) -> Optional[bytes]:
+    from PySide6.QtNetwork import QLocalSocket
+    client = QLocalSocket()
+    client.connectToServer(SERVER_NAME)
+    if not client.waitForConnected(CONNECT_TIMEOUT_MS):
+        return None
+    client.write(line)
+    client.waitForBytesWritten(CONNECT_TIMEOUT_MS)
+    data = b""
+    while not data.endswith(b"\n"):
+        if not client.waitForReadyRead(reply_timeout_ms):
+            raise TimeoutError(client.errorString())
+        data += client.readAll().data()
+    client.disconnectFromServer()
+    return data
+
+
+def send_request(action: str, args: List[str], reply_timeout_ms: int = REPLY_TIMEOUT_MS) -> Optional[dict]:
+    """
+    Forward a request to the running instance and wait for its reply.
+    None when no instance is listening, a reply that doesn't come is an ERROR.
+    """
+    line = _request_line(action, args)
+    try:
+        if os.name == "posix":
+            data = _send_unix(line, reply_timeout_ms)
+        else:
+            data = _send_qt(line, reply_timeout_ms)
+        if data is None:
+            return None
+        return json.loads(data)
+    except (OSError, ValueError) as e:  # socket.timeout and TimeoutError are OSErrors
+        return {"code": ERROR, "results": [f"No reply to '{action}': {e}"]}
+
+
+def parse_command(argv: List[str]) -> Tuple[str, List[str]]:
+    """
+    The command of "main.py [--flags] [show | search <query> | execute <id> | import <path>... | diagnostics]",
+    show when there is none
+    """
+    words = [arg for arg in argv if not arg.startswith("--")]
+    if not words:
+        return "show", []
+    action, args = words[0], words[1:]
+    if action == "search":
+        args = [" ".join(args)]
+    elif action == "import":
+        args = [os.path.abspath(path) for path in args]    # The instance runs elsewhere
+    return action, args
+
+
+def forward_command(argv: List[str]) -> Tuple[str, List[str]]:
+    """
+    Hand the command of argv to the running instance, print its reply and exit.
+    Returns the command when there is no instance, for this process to run it.
+    """
+    action, args = parse_command(argv)
+    if action not in ACTIONS:
+        sys.exit(f"Unknown command '{action}', expected one of: {', '.join(ACTIONS)}")
+    reply = send_request(action, args)
+    if reply is None:
+        return action, args
+    ok = reply.get("code") == OK
+    for line in reply.get("results", []):
+        print(line, file=sys.stdout if ok else sys.stderr)
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,116 @@
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+from rapidfuzz import fuzz, process
+
+from windows.search_index import SearchIndex, SCORE_CUTOFF
+from windows.search_result import HIT_WEIGHT, SearchResult
+
+# Number of recent query -> result pairs kept, so backspacing is instant
+CACHE_SIZE = 64
+
+
+def _grow_bound(bound: float, query_len: int, extra: int) -> float:
+    """
+    Upper bound of partial_ratio after appending `extra` characters to a query of
+    `query_len` characters that scored at most `bound` against a longer text.
+    Each appended character can add at most one aligned pair to the best window
+    while growing the normalizing length by one.
+    """
+    return (bound * query_len + 200 * extra) / (query_len + extra)
+
+
+def _keep_cutoff(query_len: int) -> float:
+    """Lowest score worth remembering: anything below can't survive one more character"""
+    return max(0.0, SCORE_CUTOFF - (200 - SCORE_CUTOFF) / query_len)
+
+
+class SearchEngine:
+    """
+    Scores every candidate of a query in one rapidfuzz call and ranks the accepted
+    rows by match score mixed with frecency. The proxy only looks results up.
+
+    When the query extends the previous one, rows whose previous score proves they
+    can't reach the cutoff are not scored again. Recent results are kept in an LRU,
+    call invalidate() whenever the indexed data changes and note_hit() when a shortcut
+    is hit.
+    """
+
+    def __init__(self, index: SearchIndex):
+        self.index = index
+        self._cache: OrderedDict[str, SearchResult] = OrderedDict()
+        self._bounds_query: Optional[str] = None
+        self._bounds = np.empty(0, dtype=np.float32)   # slot -> score upper bound, NaN if unknown
+
+    def invalidate(self):
+        self._cache.clear()
+        self._bounds_query = None
+
+    def note_hit(self, shortcut_id: str, frecency: float, *extra: SearchResult):
+        """Move the shortcut up in the cached results (and extra ones) without scoring again"""
+        results = list(self._cache.values())
+        results += [result for result in extra if all(result is not cached for cached in results)]
+        for result in results:
+            result.promote(shortcut_id, frecency)
+
+    def search(self, query: str) -> SearchResult:
+        query = query.lower()
+        result = self._cache.get(query)
+        if result is not None:
+            self._cache.move_to_end(query)
+            return result
+
+        result = self._score(query) if query else self._rank_by_frecency()
+        self._cache[query] = result
+        if len(self._cache) > CACHE_SIZE:
+            self._cache.popitem(last=False)
+        return result
+
+    def _rank_by_frecency(self) -> SearchResult:
+        slots = self.index.arrays().live
+        return self._ranked("", slots, np.zeros(len(slots), dtype=np.float32))
+
+    def _ranked(self, query: str, slots: np.ndarray, scores: np.ndarray) -> SearchResult:
+        """Order the slots by match score mixed with frecency, best first"""
+        arrays = self.index.arrays()
+        frecencies = np.fromiter((item.frecency for item in arrays.items[slots]),
+                                 dtype=np.float64, count=len(slots))
+        keys = scores + HIT_WEIGHT * np.log1p(np.maximum(frecencies, 0))
+        order = np.argsort(-keys, kind="stable")
+        return SearchResult(query, arrays.ids[slots[order]].tolist(),
+                            scores[order].tolist(), keys[order].tolist())
+
+    def _narrow(self, query: str, slots: np.ndarray, bounds: np.ndarray) -> np.ndarray:
+        """Drop the slots the previous query already rules out, carrying their bounds over"""
+        previous = self._bounds_query
+        if not previous or len(query) <= len(previous) or not query.startswith(previous):
+            return slots
+
+        grown = _grow_bound(self._bounds[slots], len(previous), len(query) - len(previous))
+        # Texts not longer than the query swap roles inside partial_ratio
+        ruled_out = (grown <= SCORE_CUTOFF) & (self.index.arrays().lengths[slots] > len(query))
+        bounds[slots[ruled_out]] = grown[ruled_out]
+        return slots[~ruled_out]
+
+    def _score(self, query: str) -> SearchResult:
+        arrays = self.index.arrays()
+        if len(self._bounds) != self.index.slot_count or self._bounds_query is None:
+            self._bounds = np.full(self.index.slot_count, np.nan, dtype=np.float32)
+        bounds = np.full(self.index.slot_count, np.nan, dtype=np.float32)
+        slots = self._narrow(query, self.index.candidates(query), bounds)
+
+        keep = _keep_cutoff(len(query))
+        scores = process.cdist(
+            [query],
+            arrays.texts[slots].tolist(),
+            scorer=fuzz.partial_ratio,
+            score_cutoff=keep,
+            dtype=np.float32,
+            workers=-1,
+        )[0] if len(slots) else np.empty(0, dtype=np.float32)
+        bounds[slots] = np.where(scores > 0, scores, keep)
+        self._bounds_query, self._bounds = query, bounds
+
+        accepted = np.flatnonzero(scores > SCORE_CUTOFF)
+        return self._ranked(query, slots[accepted], scores[accepted])
@@ -0,0 +1,180 @@
+from collections import Counter
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set
+
+import numpy as np
+
+from windows.base import Shortcut
+
+# Rows scoring above this partial_ratio are shown in the launcher
+SCORE_CUTOFF = 80
+
+
+def _grams(text: str) -> List[str]:
+    return [text[i:i + 2] for i in range(len(text) - 1)]
+
+
+def _min_shared_grams(query_len: int, cutoff: int = SCORE_CUTOFF) -> int:
+    """
+    Lower bound of query bigrams a row must contain to possibly score above cutoff.
+
+    partial_ratio compares the query with windows of the text (at most as long as
+    the query). For a window of length s sharing L aligned characters, the aligned
+    characters form at most (query_len + s - 2L + 1) contiguous pieces, so at least
+    3L - query_len - s - 1 query bigrams survive in the text. Taking the minimum over
+    every (s, L) that beats the cutoff keeps the filter lossless.
+    """
+    best = None
+    for s in range(1, query_len + 1):
+        for shared in range(s + 1):
+            if 200 * shared > cutoff * (query_len + s):
+                bound = 3 * shared - query_len - s - 1
+                best = bound if best is None else min(best, bound)
+    return max(best or 0, 0)
+
+
+class IndexArrays(NamedTuple):
+    """Slot-aligned views of the index, free slots hold None and length -1"""
+    ids: np.ndarray
+    texts: np.ndarray
+    items: np.ndarray
+    lengths: np.ndarray
+    live: np.ndarray    # slots currently holding a shortcut
+
+
+class SearchIndex:
+    """
+    In-memory bigram inverted index over Shortcut.searchable_text.
+
+    Every shortcut is tokenized once when added and keeps its slot until removed.
+    candidates() returns the slots that can still beat SCORE_CUTOFF for a query,
+    so the fuzzy scorer only has to look at those rows instead of the whole list.
+    """
+
+    def __init__(self, items: Iterable[Shortcut] = ()):
+        self._slots: Dict[str, int] = {}        # shortcut id -> slot
+        self._ids: List[Optional[str]] = []     # slot -> shortcut id
+        self._texts: List[Optional[str]] = []   # slot -> searchable text
+        self._items: List[Optional[Shortcut]] = []
+        self._free: List[int] = []
+        self._postings: Dict[str, Set[int]] = {}
+        self._min_shared: Dict[int, int] = {}
+        self._arrays: Optional[IndexArrays] = None
+        self.rebuild(items)
+
+    def __len__(self):
+        return len(self._slots)
+
+    def __contains__(self, shortcut_id: str):
+        return shortcut_id in self._slots
+
+    def rebuild(self, items: Iterable[Shortcut]):
+        self._slots.clear()
+        self._ids.clear()
+        self._texts.clear()
+        self._items.clear()
+        self._free.clear()
+        self._postings.clear()
+        self._arrays = None
+        for item in items:
+            self.add(item)
+
+    def sync(self, items: Iterable[Shortcut]):
+        """Bring the index in line with items, only re-tokenizing rows that changed"""
+        seen = set()
+        for item in items:
+            seen.add(item.id)
+            slot = self._slots.get(item.id)
+            if slot is None:
+                self.add(item)
+            elif self._texts[slot] != item.searchable_text:
+                self.remove(item.id)
+                self.add(item)
+            elif self._items[slot] is not item:
+                self._items[slot] = item
+                self._arrays = None
+        for shortcut_id in [i for i in self._slots if i not in seen]:
+            self.remove(shortcut_id)
+
+    def add(self, item: Shortcut):
+        if item.id in self._slots:
+            self.remove(item.id)
+        text = item.searchable_text
+        if self._free:
+            slot = self._free.pop()
+            self._ids[slot] = item.id
+            self._texts[slot] = text
+            self._items[slot] = item
+        else:
+            slot = len(self._ids)
+            self._ids.append(item.id)
+            self._texts.append(text)
+            self._items.append(item)
+        self._slots[item.id] = slot
+        for gram in set(_grams(text)):
+            self._postings.setdefault(gram, set()).add(slot)
+        self._arrays = None
+
+    def remove(self, shortcut_id: str):
+        slot = self._slots.pop(shortcut_id, None)
+        if slot is None:
+            return
+        text = self._texts[slot]
+        for gram in set(_grams(text)):
+            postings = self._postings.get(gram)
+            if postings is not None:
+                postings.discard(slot)
+                if not postings:
+                    del self._postings[gram]
+        self._ids[slot] = None
+        self._texts[slot] = None
+        self._items[slot] = None
+        self._free.append(slot)
+        self._arrays = None
+
+    @property
+    def slot_count(self) -> int:
+        return len(self._ids)
+
+    def text(self, shortcut_id: str) -> Optional[str]:
+        slot = self._slots.get(shortcut_id)
+        return None if slot is None else self._texts[slot]
+
+    def arrays(self) -> IndexArrays:
+        if self._arrays is None:
+            count = len(self._ids)
+            ids = np.empty(count, dtype=object)
+            ids[:] = self._ids
+            texts = np.empty(count, dtype=object)
+            texts[:] = self._texts
+            items = np.empty(count, dtype=object)
+            items[:] = self._items
+            lengths = np.fromiter((-1 if t is None else len(t) for t in self._texts), dtype=np.intp, count=count)
+            self._arrays = IndexArrays(ids, texts, items, lengths, np.flatnonzero(lengths >= 0))
+        return self._arrays
+
+    def candidates(self, query: str) -> np.ndarray:
+        """Slots of the shortcuts that may match the lowercased query"""
+        arrays = self.arrays()
+        query_len = len(query)
+        if query_len not in self._min_shared:
+            self._min_shared[query_len] = _min_shared_grams(query_len)
+        min_shared = self._min_shared[query_len]
+        if min_shared == 0:
+            return arrays.live
+
+        counts = Counter()
+        for gram, multiplicity in Counter(_grams(query)).items():
+            postings = self._postings.get(gram)
+            if not postings:
+                continue
+            if multiplicity == 1:
+                counts.update(postings)
+            else:
+                counts.update(dict.fromkeys(postings, multiplicity))
+
+        slots = np.fromiter(counts.keys(), dtype=np.intp, count=len(counts))
+        shared = np.fromiter(counts.values(), dtype=np.intp, count=len(counts))
+        # Texts shorter than the query swap roles with it inside partial_ratio,
+        # which the bound above does not cover, so always score them.
+        short = arrays.live[arrays.lengths[arrays.live] < query_len]
+        return np.union1d(slots[shared >= min_shared], short)
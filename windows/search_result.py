@@ -0,0 +1,47 @@
+import math
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+# How many match-score points one e-fold of frecency (recency weighted hits) is worth when ranking results
+HIT_WEIGHT = 5.0
+
+
+def _rank_key(score: float, frecency: float) -> float:
+    return score + HIT_WEIGHT * math.log1p(max(frecency, 0.0))
+
+
+@dataclass
+class SearchResult:
+    query: str
+    ids: List[str]                  # accepted shortcut ids, best first
+    scores: List[float] = field(default_factory=list)   # match score per id, without frecency
+    keys: List[float] = field(default_factory=list)     # ranking key per id, descending
+    rank: Dict[str, int] = field(init=False)
+
+    def __post_init__(self):
+        self.rank = {shortcut_id: pos for pos, shortcut_id in enumerate(self.ids)}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def accepts(self, shortcut_id: str) -> bool:
+        return shortcut_id in self.rank
+
+    def promote(self, shortcut_id: str, frecency: float) -> Optional[Tuple[int, int]]:
+        """
+        Re-rank one shortcut whose frecency went up by moving it in front of the
+        ids it outranks now, returns its (old, new) position or None if not here
+        """
+        pos = self.rank.get(shortcut_id)
+        if pos is None or not self.keys:
+            return None
+        key = _rank_key(self.scores[pos], frecency)
+        new_pos = pos
+        while new_pos > 0 and self.keys[new_pos - 1] < key:
+            new_pos -= 1
+        for values, value in ((self.ids, shortcut_id), (self.scores, self.scores[pos]), (self.keys, key)):
+            del values[pos]
+            values.insert(new_pos, value)
+        for moved in range(new_pos, pos + 1):
+            self.rank[self.ids[moved]] = moved
+        return pos, new_pos
@@ -0,0 +1,136 @@
+import threading
+from typing import TYPE_CHECKING, List
+
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, QTimer, Signal
+
+from windows.base import Shortcut, ShortcutChanges
+from windows.metrics import metrics
+from windows.search_result import SearchResult
+
+# Also drives the manager's TableFilter, which doesn't need numpy and rapidfuzz loaded
+if TYPE_CHECKING:
+    from windows.search_engine import SearchEngine
+
+
+class _SearchTask(QRunnable):
+    def __init__(self, worker: "SearchWorker", generation: int, query: str):
+        super().__init__()
+        self.worker = worker
+        self.generation = generation
+        self.query = query
+
+    def run(self):
+        worker = self.worker
+        if worker.is_stale(self.generation):
+            return
+        with worker.lock, metrics.timed(worker.metric):
+            result = worker.engine.search(self.query)
+        if not worker.is_stale(self.generation):
+            worker.resultReady.emit(self.generation, result)
+
+
+class SearchWorker(QObject):
+    """
+    Runs launcher searches on a background thread.
+
+    request() restarts a debounce timer; once typing pauses the query is handed to
+    a single-thread pool. Queued queries are dropped when a newer one arrives and a
+    result is only delivered (on the GUI thread) if no newer query was requested.
+    """
+    resultReady = Signal(int, object)
+    finished = Signal(object)   # SearchResult of the latest query
+
+    def __init__(self, engine: "SearchEngine", debounce_ms: int = 30, parent=None, metric: str = "search"):
+        super().__init__(parent)
+        self.engine = engine
+        self.metric = metric            # Name the search times are recorded under
+        self.lock = threading.Lock()    # Guards the engine and its index
+        self._generation = 0
+        self._delivered = 0
+        self._query = ""
+
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(1)
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(max(0, debounce_ms))
+        self._timer.timeout.connect(self._submit)
+
+        self.resultReady.connect(self._deliver)
+
+    def is_stale(self, generation: int) -> bool:
+        return generation != self._generation
+
+    def is_pending(self) -> bool:
+        """Whether the latest requested query has not been delivered yet"""
+        return self._delivered != self._generation
+
+    def request(self, query: str):
+        """Search for query once the debounce interval passes without a new request"""
+        self._query = query
+        self._generation += 1
+        self._timer.start()
+
+    def request_now(self, query: str):
+        self._query = query
+        self._generation += 1
+        self._timer.stop()
+        self._submit()
+
+    def sync(self, items: List[Shortcut]):
+        """Replace the searchable data, then re-run the current query"""
+        with self.lock:
+            self.engine.index.sync(items)
+            self.engine.invalidate()
+        self.request_now(self._query)
+
+    def apply_changes(self, changes: ShortcutChanges):
+        """Re-index only the changed shortcuts, then re-run the current query"""
+        with self.lock:
+            for shortcut_id in changes.deleted:
+                self.engine.index.remove(shortcut_id)
+            for item in changes.upserted:
+                self.engine.index.add(item)
+            self.engine.invalidate()
+        self.request_now(self._query)
+
+    def invalidate(self):
+        """Hit numbers changed, re-rank the current query"""
+        with self.lock:
+            self.engine.invalidate()
+        self.request_now(self._query)
+
+    def note_hit(self, shortcut_id: str, frecency: float, shown: SearchResult):
+        """One shortcut was hit, move it up in the known results including the shown one"""
+        with self.lock:
+            self.engine.note_hit(shortcut_id, frecency, shown)
+
+    def search_blocking(self, query: str) -> SearchResult:
+        self._query = query
+        self._generation += 1
+        self._timer.stop()
+        self._pool.clear()
+        self._delivered = self._generation
+        with self.lock, metrics.timed(self.metric):
+            return self.engine.search(query)
+
+    def search(self, query: str) -> SearchResult:
+        """Run a query for another caller, leaving the pending request of the view alone"""
+        with self.lock, metrics.timed(self.metric):
+            return self.engine.search(query)
+
+    def _submit(self):
+        self._pool.clear()  # Queued but not started queries are stale by now
+        self._pool.start(_SearchTask(self, self._generation, self._query))
+
+    def _deliver(self, generation: int, result: SearchResult):
+        if not self.is_stale(generation):
+            self._delivered = generation
+            self.finished.emit(result)
+
+    def shutdown(self):
+        self._timer.stop()
+        self._generation += 1
+        self._pool.clear()
+        self._pool.waitForDone()
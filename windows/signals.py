@@ -3,6 +3,9 @@ from PySide6.QtCore import QObject, Signal
 class SignalBus(QObject):
     aboutToHide = Signal()
     fetchAll = Signal()
+    shortcutExecuted = Signal(str, int, float)  # id, new hit_number, new frecency
+    executeFailed = Signal(str, str)        # id, error message
+    shortcutsChanged = Signal(object)       # ShortcutChanges applied to the ShortcutStore
 
 # Create a global instance
 global_signal_bus = SignalBus()
\ No newline at end of file
@@ -0,0 +1,120 @@
+import logging
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, List, NamedTuple, Optional
+
+from PySide6.QtCore import QObject, Signal
+
+from bluebird import *
+
+logger = logging.getLogger("liz.startup")
+
+
+class StartupPhase(NamedTuple):
+    name: str
+    thread: str
+    start: float    # Seconds since the process started
+    end: float
+
+
+class StartupProfiler:
+    """
+    Times the phases of the startup for --profile-startup.
+
+    Phases on the GUI thread follow each other and are closed with mark(), the ones
+    of the background loader overlap them and are timed with phase(). Does nothing
+    when disabled, so the calls can stay in place.
+    """
+
+    def __init__(self, enabled: bool, started_at: float):
+        self.enabled = enabled
+        self.started_at = started_at
+        self.phases: List[StartupPhase] = []
+        self._last = started_at
+        self._lock = threading.Lock()
+
+    def _add(self, name: str, start: float, end: float):
+        with self._lock:
+            self.phases.append(StartupPhase(name, threading.current_thread().name,
+                                            start - self.started_at, end - self.started_at))
+
+    def mark(self, name: str):
+        """Close the GUI thread phase running since the previous mark"""
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self._add(name, self._last, now)
+        self._last = now
+
+    @contextmanager
+    def phase(self, name: str):
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._add(name, start, time.perf_counter())
+
+    def report(self) -> str:
+        lines = ["Startup profile (ms since the process started):",
+                 f"  {'phase':<28}{'thread':<14}{'start':>9}{'took':>9}"]
+        for p in sorted(self.phases, key=lambda p: p.start):
+            lines.append(f"  {p.name:<28}{p.thread:<14}"
+                         f"{p.start * 1000:>9.1f}{(p.end - p.start) * 1000:>9.1f}")
+        return "\n".join(lines)
+
+    def print_report(self):
+        """To the console, stdout being redirected by then, and to the log"""
+        if not self.enabled:
+            return
+        report = self.report()
+        if sys.__stdout__ is not None:
+            sys.__stdout__.write(report + "\n")
+            sys.__stdout__.flush()
+        logger.info(report)
+
+
+class StartupLoader(QObject):
+    """
+    Loads what the launcher needs on a background thread once the tray is up: the
+    heavy modules (numpy, rapidfuzz, the window modules), the shortcuts and the theme.
+
+    loaded is delivered on the GUI thread, which then only has the widgets left to
+    build. wait() is for the GUI thread needing them before that.
+    """
+    loaded = Signal()
+
+    def __init__(self, flute: Flute, read_theme: Callable[[str], str], profiler: StartupProfiler):
+        super().__init__()
+        self.flute = flute
+        self.read_theme = read_theme
+        self.profiler = profiler
+        self.store = None
+        self.stylesheet = ""
+        self.error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._run, name="liz-startup", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def wait(self):
+        self._thread.join()
+        if self.error is not None:
+            raise self.error
+
+    def _run(self):
+        try:
+            with self.profiler.phase("import launcher modules"):
+                import windows.main_window
+            with self.profiler.phase("load shortcuts"):
+                from windows.store import ShortcutStore
+                self.store = ShortcutStore(self.flute)
+            with self.profiler.phase("read theme"):
+                self.stylesheet = self.read_theme(self.flute.get_theme())
+        except BaseException as e:
+            self.error = e  # Raised again on the GUI thread by wait()
+        self.loaded.emit()
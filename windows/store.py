@@ -0,0 +1,59 @@
+from typing import Dict, List, Optional
+
+from bluebird import *
+from windows.base import Shortcut, ShortcutChanges, ShortcutColumns
+from windows.signals import global_signal_bus
+
+
+class ShortcutStore:
+    """
+    The one copy of the shortcuts on the Python side.
+
+    AppListModel and AppTableModel keep lists of references to these records
+    instead of fetching their own. sync() pulls the backend changes, updates the
+    records in place and announces them through global_signal_bus.shortcutsChanged
+    so every open view can patch itself.
+    """
+
+    def __init__(self, flute: Flute):
+        self.flute = flute
+        self.revision = 0
+        self._records: Dict[str, Shortcut] = {}
+        self.reload()
+
+    def __len__(self):
+        return len(self._records)
+
+    def reload(self):
+        # Read the revision first, anything changing meanwhile is fetched again by sync()
+        self.revision = self.flute.get_revision()
+        items = ShortcutColumns(*self.flute.fetch_columns()).to_shortcuts()
+        self._records = {item.id: item for item in items}
+
+    def items(self) -> List[Shortcut]:
+        """A new list of the shared records, for a model to own"""
+        return list(self._records.values())
+
+    def get(self, shortcut_id: str) -> Optional[Shortcut]:
+        return self._records.get(shortcut_id)
+
+    def sync(self) -> ShortcutChanges:
+        changes = ShortcutChanges.fetch(self.flute, self.revision)
+        self.revision = changes.revision
+        if not changes:
+            return changes
+
+        for shortcut_id in changes.deleted:
+            self._records.pop(shortcut_id, None)
+        upserted = []
+        for item in changes.upserted:
+            record = self._records.get(item.id)
+            if record is None:
+                self._records[item.id] = record = item
+            else:
+                record.update(item)
+            upserted.append(record)
+
+        changes = changes._replace(upserted=upserted)
+        global_signal_bus.shortcutsChanged.emit(changes)
+        return changes
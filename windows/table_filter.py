@@ -0,0 +1,142 @@
+import shlex
+from bisect import bisect_right
+from itertools import accumulate
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from windows.base import Shortcut
+from windows.search_result import SearchResult
+
+# Query prefixes restricting a term to one column of the manager table
+FIELDS = {"app": 0, "desc": 1, "key": 2}
+ANY = len(FIELDS)   # Column of the blob holding every field, hits included
+
+# Separates rows inside a blob, and the fields of a row inside the ANY blob.
+# Typed queries never contain them, so a match can't span two rows or fields.
+_ROW_SEP = "\x00"
+_FIELD_SEP = "\x01"
+
+
+class FilterQuery(NamedTuple):
+    scoped: List[Tuple[int, str]]   # (field column, lowercase term)
+    text: str                       # the unscoped rest, matched against any field
+
+    def __bool__(self):
+        return bool(self.scoped or self.text)
+
+
+def parse_filter_query(query: str) -> FilterQuery:
+    """
+    Split "app:chrome desc:\"new tab\" reload" into terms for one field each and the
+    unscoped rest. The rest is matched as a whole, like the filter always did.
+    """
+    try:
+        tokens = shlex.split(query)
+    except ValueError:  # Unbalanced quote while typing
+        tokens = [token.strip("\"'") for token in query.split()]
+    scoped, rest = [], []
+    for token in tokens:
+        field, sep, term = token.partition(":")
+        if sep and field.lower() in FIELDS:
+            if term:
+                scoped.append((FIELDS[field.lower()], term.lower()))
+        else:
+            rest.append(token.lower())
+    return FilterQuery(scoped, " ".join(rest))
+
+
+class _Blob(NamedTuple):
+    text: str           # lowercase column values, each followed by _ROW_SEP
+    starts: List[int]   # row -> offset of its value in text
+
+
+class FilterIndex:
+    """
+    Substring index over the columns of the manager table.
+
+    Each column is lowercased once into a single string of all rows, so a term is
+    found with str.find scanning in C, jumping to the next row after every hit,
+    instead of lowercasing every cell of every row on each keystroke. The blobs are
+    built lazily on the first search after the rows changed.
+    """
+
+    def __init__(self, items: Iterable[Shortcut] = ()):
+        self._items: Dict[str, Shortcut] = {}
+        self._ids: List[str] = []
+        self._blobs: Optional[List[_Blob]] = None
+        self.sync(items)
+
+    def __len__(self):
+        return len(self._items)
+
+    def sync(self, items: Iterable[Shortcut]):
+        self._items = {item.id: item for item in items}
+        self._blobs = None
+
+    def add(self, item: Shortcut):
+        self._items[item.id] = item
+        self._blobs = None
+
+    def remove(self, shortcut_id: str):
+        if self._items.pop(shortcut_id, None) is not None:
+            self._blobs = None
+
+    def _build(self) -> List[_Blob]:
+        items = list(self._items.values())
+        self._ids = [item.id for item in items]
+        columns = [
+            [item.application.lower() for item in items],
+            [item.description.lower() for item in items],
+            [item.shortcut.lower() for item in items],
+        ]
+        columns.append([_FIELD_SEP.join(values) + f"{_FIELD_SEP}{item.hit_number}"
+                        for item, *values in zip(items, *columns)])
+        blobs = []
+        for values in columns:
+            starts = [0]
+            starts.extend(accumulate(len(value) + 1 for value in values))
+            blobs.append(_Blob(_ROW_SEP.join(values) + _ROW_SEP, starts))
+        return blobs
+
+    def _rows_containing(self, column: int, term: str) -> Set[int]:
+        blob = self._blobs[column]
+        rows = set()
+        pos = blob.text.find(term)
+        while pos >= 0:
+            row = bisect_right(blob.starts, pos) - 1
+            rows.add(row)
+            pos = blob.text.find(term, blob.starts[row + 1])
+        return rows
+
+    def match(self, query: FilterQuery) -> List[str]:
+        """Ids of the rows matching every term of query, in index order"""
+        if self._blobs is None:
+            self._blobs = self._build()
+        terms = query.scoped + ([(ANY, query.text)] if query.text else [])
+        rows = None
+        # Longest terms first, they tend to leave the fewest rows to intersect
+        for column, term in sorted(terms, key=lambda t: -len(t[1])):
+            found = self._rows_containing(column, term)
+            rows = found if rows is None else rows & found
+            if not rows:
+                return []
+        return [self._ids[row] for row in sorted(rows)]
+
+
+class TableFilter:
+    """
+    Filters the manager table with a FilterIndex. Has the interface SearchWorker
+    expects from an engine, so the filtering can run off the GUI thread.
+    """
+
+    def __init__(self, index: FilterIndex):
+        self.index = index
+
+    def invalidate(self):
+        pass    # Nothing cached besides the index, which tracks its own changes
+
+    def search(self, query: str) -> SearchResult:
+        """The result accepts the matching ids, an empty query accepts everything"""
+        parsed = parse_filter_query(query)
+        if not parsed:
+            return SearchResult("", [])
+        return SearchResult(query, self.index.match(parsed))